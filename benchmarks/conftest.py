@@ -0,0 +1,65 @@
+"""
+Shared setup for the afcharts benchmark suite.
+
+The benchmarks use pytest-benchmark and run without a display: matplotlib
+uses the Agg backend and no plotly figure is shown. Every run is saved to
+.benchmarks/<machine>/<counter>_<commit>_<date>.json so it can be compared
+with earlier runs:
+
+    pytest benchmarks --benchmark-compare --benchmark-compare-fail=median:10%
+
+.benchmarks/ is not committed, as timings depend on the machine. Save a
+named baseline on each release and compare later runs with it by name:
+
+    pytest benchmarks --benchmark-save=v1.2.0
+    pytest benchmarks --benchmark-compare='*_v1.2.0' --benchmark-compare-fail=median:10%
+"""
+
+import os
+import tracemalloc
+
+import numpy as np
+import pytest
+
+os.environ["MPLBACKEND"] = "Agg"
+
+SIZES = [1_000, 10_000, 100_000, 1_000_000]
+
+
+def pytest_configure(config):
+    # Save every run, as --benchmark-autosave does, under the plugin's tag of
+    # commit id and date, so regressions can be found with --benchmark-compare
+    if getattr(config.option, "benchmark_autosave", False) is None and not config.option.benchmark_save:
+        from pytest_benchmark.utils import get_tag
+
+        config.option.benchmark_autosave = get_tag()
+
+
+@pytest.fixture(scope="session")
+def random_data():
+    """
+    Return a function giving reproducible x and y arrays of n points.
+    """
+    generator = np.random.default_rng(0)
+    cache = {}
+
+    def make(n):
+        if n not in cache:
+            cache[n] = (np.arange(n, dtype="float64"), generator.standard_normal(n).cumsum())
+        return cache[n]
+
+    return make
+
+
+def record_peak_memory(benchmark, function, *args):
+    """
+    Run function once under tracemalloc and save its peak Python memory
+    allocation, in megabytes, with the benchmark results.
+    """
+    tracemalloc.start()
+    try:
+        function(*args)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    benchmark.extra_info["peak_memory_mb"] = round(peak / 2**20, 2)
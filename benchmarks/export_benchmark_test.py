@@ -0,0 +1,62 @@
+"""
+Benchmarks for writing afcharts styled charts to static files, with the
+peak memory of one export saved alongside the timings.
+"""
+
+import pytest
+from conftest import SIZES, record_peak_memory
+from figures_benchmark_test import build_matplotlib_chart, build_plotly_chart
+
+from afcharts.export import write_figure
+from afcharts.figure_factory import FigureFactory
+
+
+@pytest.mark.parametrize("n", SIZES)
+@pytest.mark.parametrize("suffix", [".png", ".svg"])
+def test_matplotlib_export(benchmark, random_data, tmp_path, suffix, n):
+    """
+    Time building and saving a styled matplotlib line chart.
+    """
+    path = tmp_path / f"chart{suffix}"
+
+    def export():
+        write_figure(build_matplotlib_chart("line", *random_data(n)), path)
+
+    benchmark.pedantic(export, rounds=5)
+    record_peak_memory(benchmark, export)
+
+
+@pytest.mark.parametrize("n", SIZES)
+def test_matplotlib_factory_export(benchmark, random_data, tmp_path, n):
+    """
+    Time building and saving a styled matplotlib line chart with a
+    FigureFactory, which reuses the canvas and render buffer.
+    """
+    factory = FigureFactory()
+    path = tmp_path / "chart.png"
+
+    def export():
+        with factory.figure() as fig:
+            fig.add_subplot().plot(*random_data(n))
+            factory.save(fig, path)
+
+    benchmark.pedantic(export, rounds=5)
+    record_peak_memory(benchmark, export)
+
+
+@pytest.mark.parametrize("n", SIZES)
+@pytest.mark.parametrize("suffix", [".png", ".html", ".json"])
+def test_plotly_export(benchmark, random_data, tmp_path, suffix, n):
+    """
+    Time building and writing a styled plotly line chart. Static images
+    need the kaleido package.
+    """
+    if suffix == ".png":
+        pytest.importorskip("kaleido")
+    path = tmp_path / f"chart{suffix}"
+
+    def export():
+        write_figure(build_plotly_chart("line", *random_data(n)), path)
+
+    benchmark.pedantic(export, rounds=5)
+    record_peak_memory(benchmark, export)
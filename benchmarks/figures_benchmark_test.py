@@ -0,0 +1,99 @@
+"""
+Benchmarks for building afcharts styled bar, line and scatter charts with
+plotly and matplotlib, from 1,000 to 1,000,000 points, annotated
+heatmaps, and density scatter charts of up to 10,000,000 points.
+"""
+
+import numpy as np
+import plotly.graph_objects as go
+import pytest
+from conftest import SIZES
+from matplotlib.figure import Figure
+
+from afcharts.charts import density_scatter, heatmap
+from afcharts.fast_figure import build_figure_dict
+from afcharts.mpl_style import afcharts_style
+from afcharts.pio_template import build_afcharts_template
+
+# A matplotlib bar chart draws one patch per bar, so 100,000 bars take about half a minute
+MATPLOTLIB_BAR_SIZES = SIZES[:2]
+
+
+def build_plotly_chart(kind, x, y):
+    if kind == "bar":
+        trace = go.Bar(x=x, y=y)
+    elif kind == "line":
+        trace = go.Scatter(x=x, y=y, mode="lines")
+    else:
+        trace = go.Scatter(x=x, y=y, mode="markers")
+    return go.Figure(trace, layout={"template": build_afcharts_template()})
+
+
+def build_matplotlib_chart(kind, x, y):
+    with afcharts_style():
+        fig = Figure()
+        ax = fig.add_subplot()
+        if kind == "bar":
+            ax.bar(x, y)
+        elif kind == "line":
+            ax.plot(x, y)
+        else:
+            ax.scatter(x, y)
+    return fig
+
+
+@pytest.mark.parametrize("n", SIZES)
+@pytest.mark.parametrize("kind", ["bar", "line", "scatter"])
+def test_plotly_chart(benchmark, random_data, kind, n):
+    """
+    Time building a styled plotly figure.
+    """
+    benchmark(build_plotly_chart, kind, *random_data(n))
+
+
+@pytest.mark.parametrize("n", SIZES)
+@pytest.mark.parametrize("kind", ["bar", "line", "scatter"])
+def test_plotly_figure_dict(benchmark, random_data, kind, n):
+    """
+    Time building a styled plotly figure dict without validation.
+    """
+    x, y = random_data(n)
+    trace = {"type": "bar"} if kind == "bar" else {"type": "scatter", "mode": "lines" if kind == "line" else "markers"}
+
+    benchmark(build_figure_dict, [{**trace, "x": x, "y": y}])
+
+
+@pytest.mark.parametrize(
+    "kind, n",
+    [("bar", n) for n in MATPLOTLIB_BAR_SIZES] + [(kind, n) for kind in ["line", "scatter"] for n in SIZES],
+)
+def test_matplotlib_chart(benchmark, random_data, kind, n):
+    """
+    Time building a styled matplotlib figure.
+    """
+    benchmark(build_matplotlib_chart, kind, *random_data(n))
+
+
+@pytest.mark.parametrize("cells", [20, 200])
+def test_matplotlib_heatmap(benchmark, cells):
+    """
+    Time building and rendering an annotated heatmap with every cell labelled.
+    """
+    values = np.random.default_rng(0).gamma(2, 30, (cells, cells))
+
+    def build_and_draw():
+        fig = heatmap(values, backend="matplotlib", size=(cells / 5, cells / 5), label_size=6)
+        fig.canvas.draw()
+
+    benchmark(build_and_draw)
+
+
+@pytest.mark.parametrize("n", [1_000_000, 10_000_000])
+@pytest.mark.parametrize("backend", ["plotly", "matplotlib"])
+def test_density_scatter(benchmark, backend, n):
+    """
+    Time binning points and building a density scatter chart.
+    """
+    x, y = np.random.default_rng(0).standard_normal((2, n))
+
+    benchmark(density_scatter, x, y, backend=backend)
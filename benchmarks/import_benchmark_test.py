@@ -0,0 +1,26 @@
+"""
+Benchmarks for importing afcharts, each in a fresh interpreter.
+
+The "pass" statement measures interpreter start-up, which is included in
+every other result.
+"""
+
+import subprocess
+import sys
+
+import pytest
+
+STATEMENTS = {
+    "pass": "pass",
+    "afcharts": "import afcharts",
+    "pio_template": "import afcharts.pio_template",
+    "pio_template_first_use": "import afcharts.pio_template; afcharts.pio_template.pio.templates['afcharts']",
+}
+
+
+@pytest.mark.parametrize("statement", STATEMENTS.values(), ids=STATEMENTS.keys())
+def test_import(benchmark, statement):
+    """
+    Time starting an interpreter and running an import statement.
+    """
+    benchmark.pedantic(subprocess.run, args=([sys.executable, "-c", statement],), kwargs={"check": True}, rounds=10)
@@ -0,0 +1,64 @@
+"""
+Import-time benchmark for afcharts.
+
+Each statement is timed in a fresh interpreter so nothing is cached between
+runs. The "first use" row builds the afcharts plotly template, which is what
+`import afcharts.pio_template` used to cost before the template was
+registered lazily.
+
+Run from the repository root with:
+
+    python benchmarks/import_time.py
+"""
+
+import argparse
+import statistics
+import subprocess
+import sys
+
+STATEMENTS = {
+    "import plotly.io (reference)": "import plotly.io",
+    "import afcharts": "import afcharts",
+    "import afcharts.af_colours": "import afcharts.af_colours",
+    "import afcharts.pio_template": "import afcharts.pio_template",
+    "import afcharts.pio_template + first use": (
+        "import afcharts.pio_template; afcharts.pio_template.pio.templates['afcharts']"
+    ),
+}
+
+TIMER = """
+import time
+start = time.perf_counter()
+{statement}
+print(time.perf_counter() - start)
+"""
+
+
+def time_statement(statement, repeat):
+    """
+    Return the median wall time in milliseconds of running `statement`
+    in `repeat` fresh interpreters.
+    """
+    timings = []
+    for _ in range(repeat):
+        output = subprocess.run(
+            [sys.executable, "-c", TIMER.format(statement=statement)],
+            check=True,
+            capture_output=True,
+            text=True,
+        ).stdout
+        timings.append(float(output) * 1000)
+    return statistics.median(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=10, help="number of fresh interpreters per statement")
+    args = parser.parse_args()
+
+    for label, statement in STATEMENTS.items():
+        print(f"{label:<45} {time_statement(statement, args.repeat):8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""
+Benchmarks for saving matplotlib charts of 1,000,000 points with the
+afcharts style and with the afcharts-large style and rasterised dense
+artists, with the file size saved alongside the timings.
+
+The afcharts-large runs are held to targets for our typical 1M-point
+charts: each must save in under a second, to a file under 1 MB.
+"""
+
+import io
+import time
+
+import numpy as np
+import pytest
+from matplotlib.figure import Figure
+
+from afcharts.mpl_style import afcharts_style, rasterise_dense_artists
+
+N = 1_000_000
+
+# Targets for the afcharts-large style with dense artists rasterised
+TARGET_SECONDS = 1.0
+TARGET_MEGABYTES = 1.0
+
+
+@pytest.fixture(scope="module")
+def noisy_data():
+    """
+    Return x and y arrays of N points of noise, the hardest case for path simplification.
+    """
+    generator = np.random.default_rng(0)
+    return np.arange(N, dtype="float64"), generator.standard_normal(N)
+
+
+def save_chart(kind, x, y, suffix, large):
+    with afcharts_style(large=large):
+        fig = Figure()
+        ax = fig.add_subplot()
+        if kind == "line":
+            ax.plot(x, y)
+        else:
+            ax.scatter(x, y, s=1)
+        if large:
+            rasterise_dense_artists(fig)
+        buffer = io.BytesIO()
+        fig.savefig(buffer, format=suffix)
+    return buffer.getbuffer().nbytes
+
+
+@pytest.mark.parametrize("suffix", ["png", "svg", "pdf"])
+@pytest.mark.parametrize("kind", ["line", "scatter"])
+@pytest.mark.parametrize("large", [False, True], ids=["afcharts", "afcharts-large"])
+def test_save_million_points(benchmark, noisy_data, kind, suffix, large):
+    """
+    Time building and saving a styled chart of 1,000,000 points, and
+    check the afcharts-large style meets the time and size targets.
+    Vector files of a million markers take several seconds with the
+    afcharts style, so it is run once.
+    """
+    x, y = noisy_data
+    start = time.perf_counter()
+    size = save_chart(kind, x, y, suffix, large)
+    seconds = time.perf_counter() - start
+    benchmark.extra_info["file_size_mb"] = round(size / 2**20, 3)
+
+    benchmark.pedantic(save_chart, (kind, x, y, suffix, large), rounds=5 if large else 1)
+
+    if large:
+        assert seconds < TARGET_SECONDS
+        assert size / 2**20 < TARGET_MEGABYTES
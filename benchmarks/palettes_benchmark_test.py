@@ -0,0 +1,63 @@
+"""
+Benchmarks for reading palettes and converting colours in `af_colours`, and
+classifying values onto palette colours in `classify`.
+"""
+
+import numpy as np
+import pytest
+
+from afcharts.af_colours import clear_palette_cache, colours_to_rgb_array, get_af_colours, hex_to_rgb
+from afcharts.classify import CLASSIFICATION_METHODS, classify
+
+
+@pytest.mark.parametrize("colour_format", ["hex", "rgb"])
+def test_get_af_colours(benchmark, colour_format):
+    """
+    Time get_af_colours() once the palette config has been loaded.
+    """
+    get_af_colours("categorical", colour_format, 6)
+
+    benchmark(get_af_colours, "categorical", colour_format, 6)
+
+
+def test_get_af_colours_first_call(benchmark):
+    """
+    Time get_af_colours() when the palette config has to be read from disk.
+    """
+
+    def first_call():
+        clear_palette_cache()
+        return get_af_colours("categorical", "hex", 6)
+
+    benchmark(first_call)
+
+
+@pytest.mark.parametrize("n", [1_000, 100_000])
+def test_hex_to_rgb(benchmark, n):
+    """
+    Time converting a list of n hex colours to RGB tuples.
+    """
+    colours = list(np.resize(get_af_colours("categorical", "hex", 6), n))
+
+    benchmark(hex_to_rgb, colours)
+
+
+@pytest.mark.parametrize("n", [1_000, 100_000, 1_000_000])
+def test_colours_to_rgb_array(benchmark, n):
+    """
+    Time converting an array of n hex colours to an RGB array.
+    """
+    colours = np.resize(np.array(get_af_colours("categorical", "hex", 6)), n)
+
+    benchmark(colours_to_rgb_array, colours)
+
+
+@pytest.mark.parametrize("n", [1_000, 300_000])
+@pytest.mark.parametrize("method", CLASSIFICATION_METHODS)
+def test_classify(benchmark, method, n):
+    """
+    Time classifying n skewed values, such as rates for small areas, into five coloured classes.
+    """
+    values = np.random.default_rng(0).lognormal(size=n)
+
+    benchmark(classify, values, 5, method)
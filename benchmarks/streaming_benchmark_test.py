@@ -0,0 +1,57 @@
+"""
+Benchmarks for streaming updates to afcharts charts, with histories from
+1,000 to 1,000,000 points. The time of an update should not grow with the
+history.
+"""
+
+import itertools
+
+import numpy as np
+import pytest
+from conftest import SIZES
+from figures_benchmark_test import build_matplotlib_chart, build_plotly_chart
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+from afcharts.streaming import MatplotlibStream, PlotlyStream
+
+WINDOW = 1_000
+BATCH = 10
+
+
+def new_points(n):
+    """
+    Return a function giving the next batch of points after a history of n points.
+    """
+    batches = itertools.count()
+    y = np.zeros(BATCH)
+
+    def next_batch():
+        start = n + BATCH * next(batches)
+        return np.arange(start, start + BATCH, dtype="float64"), y
+
+    return next_batch
+
+
+@pytest.mark.parametrize("n", SIZES)
+def test_plotly_stream_update(benchmark, random_data, n):
+    """
+    Time appending a batch of points to a streaming plotly figure.
+    """
+    stream = PlotlyStream(build_plotly_chart("line", *random_data(n)), window=WINDOW)
+    next_batch = new_points(n)
+
+    benchmark(lambda: stream.extend({0: next_batch()}).extend_data())
+
+
+@pytest.mark.parametrize("n", SIZES)
+def test_matplotlib_stream_update(benchmark, random_data, n):
+    """
+    Time appending a batch of points to a streaming matplotlib line and
+    redrawing it, including the occasional full redraw when the x axis moves.
+    """
+    fig = build_matplotlib_chart("line", *random_data(n))
+    FigureCanvasAgg(fig)
+    stream = MatplotlibStream(fig.axes[0].lines, window=WINDOW)
+    next_batch = new_points(n)
+
+    benchmark(lambda: stream.extend({0: next_batch()}))
@@ -1 +1,41 @@
+"""
+afcharts: charts following UK Government Analysis Function guidance.
 
+Submodules are imported on first attribute access, so `import afcharts`
+does not pull in plotly, matplotlib or PyYAML until they are needed.
+"""
+
+import importlib
+
+__all__ = [
+    "af_colourmaps",
+    "af_colours",
+    "aggregate",
+    "async_export",
+    "charts",
+    "classify",
+    "colour_audit",
+    "downsample",
+    "export",
+    "fast_figure",
+    "figure_factory",
+    "instrument",
+    "margins",
+    "mpl_style",
+    "pio_template",
+    "render_cache",
+    "report",
+    "serialise",
+    "streaming",
+    "theme",
+]
+
+
+def __getattr__(name):
+    if name in __all__:
+        return importlib.import_module(f"{__name__}.{name}")
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def __dir__():
+    return sorted(list(globals()) + __all__)
@@ -0,0 +1,219 @@
+# Continuous colour maps built from the Analysis Function (AF) palettes
+# Palette stops are interpolated in the OKLab colour space so lightness
+# changes evenly along each map.
+# Reference: https://bottosson.github.io/posts/oklab/
+
+import functools
+
+import numpy as np
+
+from afcharts.af_colours import (
+    colours_to_rgb_array,
+    get_af_colours,
+    linear_to_srgb,
+    rgb_array_to_hex,
+    srgb_to_linear,
+)
+
+COLOURMAP_NAMES = (
+    "afcharts_sequential",
+    "afcharts_sequential_r",
+    "afcharts_diverging",
+    "afcharts_diverging_r",
+)
+
+# Light neutral used as the midpoint of the diverging colour map
+diverging_midpoint_colour = "#F2F2F2"
+
+# Matrices from Björn Ottosson's OKLab definition
+_LINEAR_RGB_TO_LMS = np.array(
+    [
+        [0.4122214708, 0.5363325363, 0.0514459929],
+        [0.2119034982, 0.6806995451, 0.1073969566],
+        [0.0883024619, 0.2817188376, 0.6299787005],
+    ]
+)
+_LMS_TO_OKLAB = np.array(
+    [
+        [0.2104542553, 0.7936177850, -0.0040720468],
+        [1.9779984951, -2.4285922050, 0.4505937099],
+        [0.0259040371, 0.7827717662, -0.8086757660],
+    ]
+)
+_OKLAB_TO_LMS = np.linalg.inv(_LMS_TO_OKLAB)
+_LMS_TO_LINEAR_RGB = np.linalg.inv(_LINEAR_RGB_TO_LMS)
+
+
+def get_af_colour_lut(name="afcharts_sequential", n=256):
+    """
+    Return the lookup table for an afcharts colour map. The table is
+    computed the first time it is requested and cached afterwards, until
+    the palette colours it is built from change.
+
+    Parameters
+    ----------
+    name : string, optional
+        One of "afcharts_sequential", "afcharts_sequential_r",
+        "afcharts_diverging" or "afcharts_diverging_r". The sequential
+        map runs from the lightest to the darkest sequential colour, so
+        high values are dark. The diverging map runs from the first duo
+        colour through a light neutral to the second duo colour.
+
+    n : int, optional
+        Number of entries in the table. Defaults to 256.
+
+    Raises
+    ------
+    ValueError
+        If name is not a known colour map or n is less than 2.
+
+    Returns
+    -------
+    numpy.ndarray
+        Read-only float array of shape (n, 3) with values between 0 and 1.
+
+    """
+    check_colourmap_name(name)
+    if n < 2:
+        raise ValueError("n must be at least 2.")
+
+    return _build_lut(_colourmap_stops(name), name.endswith("_r"), n)
+
+
+def get_af_cmap(name="afcharts_sequential"):
+    """
+    Return an afcharts colour map as a matplotlib colormap built from
+    its 256 entry lookup table.
+
+    Parameters
+    ----------
+    name : string, optional
+        Name of the colour map, see get_af_colour_lut().
+
+    Raises
+    ------
+    ValueError
+        If name is not a known colour map.
+
+    Returns
+    -------
+    matplotlib.colors.ListedColormap
+        The colour map, cached between calls.
+
+    """
+    check_colourmap_name(name)
+    return _build_cmap(name, _colourmap_stops(name))
+
+
+def register_af_cmaps():
+    """
+    Register every afcharts colour map with matplotlib, so they can be
+    used by name, for example `plt.imshow(data, cmap="afcharts_sequential")`.
+    Colour maps that are already registered are left unchanged.
+    """
+    import matplotlib
+
+    for name in COLOURMAP_NAMES:
+        if name not in matplotlib.colormaps:
+            matplotlib.colormaps.register(get_af_cmap(name))
+
+
+def get_af_colorscale(name="afcharts_sequential", n=11):
+    """
+    Return an afcharts colour map as a plotly colorscale. Stops are
+    sampled evenly from the colour map, so plotly's linear interpolation
+    between them closely follows the perceptual interpolation.
+
+    Parameters
+    ----------
+    name : string, optional
+        Name of the colour map, see get_af_colour_lut().
+
+    n : int, optional
+        Number of stops in the colorscale. Defaults to 11.
+
+    Raises
+    ------
+    ValueError
+        If name is not a known colour map or n is less than 2.
+
+    Returns
+    -------
+    tuple
+        Tuple of (position, hex colour) pairs for plotly's colorscale
+        properties.
+
+    """
+    check_colourmap_name(name)
+    if n < 2:
+        raise ValueError("n must be at least 2.")
+
+    return _build_colorscale(_colourmap_stops(name), name.endswith("_r"), n)
+
+
+def check_colourmap_name(name):
+    """
+    Check name is one of COLOURMAP_NAMES.
+
+    Raises
+    ------
+    ValueError
+        If name is not a known colour map.
+
+    """
+    if name not in COLOURMAP_NAMES:
+        raise ValueError(f"name must be one of {', '.join(COLOURMAP_NAMES)}, not {name}.")
+
+
+def _colourmap_stops(name):
+    """
+    Return the palette colours a colour map interpolates between, read
+    from the palette config so changes to it are picked up.
+    """
+    if name.startswith("afcharts_sequential"):
+        return get_af_colours("sequential")[::-1]
+    duo = get_af_colours("duo")
+    return (duo[0], diverging_midpoint_colour, duo[1])
+
+
+# The caches below are keyed on the palette colours, so colour maps are rebuilt
+# when the palette config changes
+
+
+@functools.cache
+def _build_lut(stops, reverse, n):
+    """
+    Interpolate the palette stops of a colour map in OKLab.
+    """
+    oklab = _linear_rgb_to_oklab(srgb_to_linear(colours_to_rgb_array(stops, dtype="float64")))
+    positions = np.linspace(0, 1, len(stops))
+    samples = np.linspace(0, 1, n)
+    interpolated = np.column_stack([np.interp(samples, positions, oklab[:, i]) for i in range(3)])
+
+    lut = np.clip(linear_to_srgb(_oklab_to_linear_rgb(interpolated)), 0, 1)
+    if reverse:
+        lut = lut[::-1].copy()
+    lut.setflags(write=False)
+    return lut
+
+
+@functools.cache
+def _build_cmap(name, stops):
+    from matplotlib.colors import ListedColormap
+
+    return ListedColormap(_build_lut(stops, name.endswith("_r"), 256), name=name)
+
+
+@functools.cache
+def _build_colorscale(stops, reverse, n):
+    positions = np.linspace(0, 1, n).round(6).tolist()
+    colours = rgb_array_to_hex(_build_lut(stops, reverse, n)).tolist()
+    return tuple(zip(positions, colours, strict=True))
+
+
+def _linear_rgb_to_oklab(rgb):
+    return np.cbrt(rgb @ _LINEAR_RGB_TO_LMS.T) @ _LMS_TO_OKLAB.T
+
+
+def _oklab_to_linear_rgb(oklab):
+    return ((oklab @ _OKLAB_TO_LMS.T) ** 3) @ _LMS_TO_LINEAR_RGB.T
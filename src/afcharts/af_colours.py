@@ -3,10 +3,38 @@
 #   data-visualisation-colours-in-charts/
 # Py-af-colours source: https://github.com/best-practice-and-impact/py-af-colours
 
+import os
+import re
+import threading
 from pathlib import Path
+from types import MappingProxyType
 
+import numpy as np
 import yaml
 
+from afcharts.instrument import stage
+
+PALETTE_NAMES = ("categorical", "duo", "sequential", "focus")
+
+_DEFAULT_CONFIG_PATH = Path(__file__).parent.joinpath("config", "af_colours.yaml")
+
+# Parsed palette configs keyed by resolved config path. Each entry holds the
+# file's modification time alongside the palettes so edits to the YAML are
+# picked up on the next call.
+_palette_cache: dict[str, tuple[int, MappingProxyType]] = {}
+_palette_cache_lock = threading.Lock()
+
+# Lookup tables between ASCII codes and hex digit values. Invalid characters map to -1.
+_HEX_CHARS = np.frombuffer(b"0123456789ABCDEF", dtype=np.uint8)
+_HEX_VALUES = np.full(256, -1, dtype=np.int16)
+_HEX_VALUES[_HEX_CHARS] = np.arange(16)
+_HEX_VALUES[np.frombuffer(b"abcdef", dtype=np.uint8)] = np.arange(10, 16)
+
+_CSS_COLOUR = re.compile(
+    r"rgba?\(\s*([\d.]+%?)\s*,\s*([\d.]+%?)\s*,\s*([\d.]+%?)\s*(?:,\s*([\d.]+%?)\s*)?\)",
+    re.IGNORECASE,
+)
+
 
 def get_af_colours(palette: str, colour_format="hex", number_of_colours=6, config_path=None):
     """
@@ -15,6 +43,9 @@ def get_af_colours(palette: str, colour_format="hex", number_of_colours=6, confi
     For the categorical palette, this can be a chosen number of colours
     up to 6.
 
+    Palettes are read from the config through load_palettes(), so the
+    YAML file is only parsed again when it changes on disk.
+
     Parameters
     ----------
     palette : string
@@ -43,23 +74,14 @@ def get_af_colours(palette: str, colour_format="hex", number_of_colours=6, confi
 
     Returns
     -------
-    list
-        chosen_colours_list
+    tuple
+        chosen_colours_list, an immutable tuple of hex strings or rgb
+        tuples.
 
     """
-    if config_path is None:
-        parent_dir = Path(__file__).parent
-        config_path = parent_dir.joinpath("config", "af_colours.yaml")
-
-    with open(config_path) as file:
-        config = yaml.load(file, Loader=yaml.BaseLoader)
+    palettes = load_palettes(config_path)
 
-    categorical_hex_list = config["categorical_hex_list"]
-    duo_hex_list = config["duo_hex_list"]
-    sequential_hex_list = config["sequential_hex_list"]
-    focus_hex_list = config["focus_hex_list"]
-
-    if palette not in ["categorical", "duo", "sequential", "focus"]:
+    if palette not in PALETTE_NAMES:
         raise ValueError("palette must be one of 'categorical', 'duo', 'sequential' " + f"or 'focus', not {palette}.")
     if colour_format not in ["hex", "rgb"]:
         raise ValueError(f"colour_format must be 'hex' or 'rgb', not {colour_format}.")
@@ -67,19 +89,79 @@ def get_af_colours(palette: str, colour_format="hex", number_of_colours=6, confi
     if number_of_colours < 1:
         raise ValueError("number_of_colours must be greater than 0.")
 
-    elif palette == "sequential":
-        chosen_colours_list = sequential_colours(sequential_hex_list, colour_format)
+    elif palette == "categorical":
+        if number_of_colours > 6:
+            raise ValueError("number_of_colours must not be more than 6 for the categorical palette.")
+        if number_of_colours == 2:
+            chosen_colours_list = palettes[colour_format]["duo"]
+        else:
+            chosen_colours_list = palettes[colour_format]["categorical"][0:number_of_colours]
 
-    elif palette == "focus":
-        chosen_colours_list = focus_colours(focus_hex_list, colour_format)
+    else:
+        chosen_colours_list = palettes[colour_format][palette]
 
-    elif palette == "duo":
-        chosen_colours_list = duo_colours(duo_hex_list, colour_format)
+    return chosen_colours_list
 
-    elif palette == "categorical":
-        chosen_colours_list = categorical_colours(categorical_hex_list, duo_hex_list, colour_format, number_of_colours)
 
-    return chosen_colours_list
+def load_palettes(config_path=None):
+    """
+    Return every palette in the colour config, in both hex and rgb
+    format. The config is parsed once per path and cached in memory.
+    The cached entry is replaced when the file's modification time
+    changes.
+
+    Parameters
+    ----------
+    config_path : NoneType, str or Path, optional
+        Path to the colour config. Defaults to the af_colours.yaml
+        shipped with afcharts.
+
+    Returns
+    -------
+    mappingproxy
+        Read-only mapping of colour format ("hex" or "rgb") to a
+        read-only mapping of palette name to a tuple of colours.
+
+    """
+    if config_path is None:
+        config_path = _DEFAULT_CONFIG_PATH
+
+    cache_key = os.path.abspath(config_path)
+    mtime = os.stat(cache_key).st_mtime_ns
+
+    cached = _palette_cache.get(cache_key)
+    if cached is not None and cached[0] == mtime:
+        return cached[1]
+
+    with _palette_cache_lock:
+        cached = _palette_cache.get(cache_key)
+        if cached is not None and cached[0] == mtime:
+            return cached[1]
+
+        with stage("palette_load"):
+            with open(cache_key) as file:
+                config = yaml.load(file, Loader=yaml.BaseLoader)
+
+            hex_palettes = {name: tuple(config[f"{name}_hex_list"]) for name in PALETTE_NAMES}
+            rgb_palettes = {name: tuple(hex_to_rgb(colours)) for name, colours in hex_palettes.items()}
+            palettes = MappingProxyType(
+                {
+                    "hex": MappingProxyType(hex_palettes),
+                    "rgb": MappingProxyType(rgb_palettes),
+                }
+            )
+        _palette_cache[cache_key] = (mtime, palettes)
+
+    return palettes
+
+
+def clear_palette_cache():
+    """
+    Remove every parsed colour config from the in-memory cache, so the
+    next call to get_af_colours() or load_palettes() reads from disk.
+    """
+    with _palette_cache_lock:
+        _palette_cache.clear()
 
 
 def categorical_colours(categorical_hex_list, duo_hex_list, colour_format="hex", number_of_colours=2):
@@ -235,14 +317,14 @@ def hex_to_rgb(hex_colours):
 
     Parameters
     ----------
-    hex_colours : list
+    hex_colours : list or tuple
         The hex colours to be converted as a list of strings, with or
         without # at the beginning.
 
     Raises
     ------
     TypeError
-        If hex_colours is not a list.
+        If hex_colours is not a list or tuple.
 
     Returns
     -------
@@ -250,10 +332,398 @@ def hex_to_rgb(hex_colours):
         converted_list
 
     """
-    if type(hex_colours) is not list:
-        raise TypeError("hex_colours must be a list.")
+    if not isinstance(hex_colours, (list, tuple)):
+        raise TypeError("hex_colours must be a list or tuple.")
 
-    hex_colours_new = [i.lstrip("#") for i in hex_colours]
-
-    converted_list = [(tuple(int(value[i : i + 2], 16) for i in (0, 2, 4))) for value in hex_colours_new]
+    converted_list = [tuple(rgb) for rgb in colours_to_rgb_array(hex_colours).tolist()]
     return converted_list
+
+
+def colours_to_rgb_array(colours, alpha=False, dtype="uint8"):
+    """
+    Convert a batch of colour strings to an array of rgb(a) values in a
+    single vectorised pass. Accepts 3, 4, 6 and 8 digit hex codes (with
+    or without a leading #) and CSS "rgb()" / "rgba()" strings.
+
+    Parameters
+    ----------
+    colours : list, tuple, pandas.Series or numpy.ndarray
+        One-dimensional collection of colour strings.
+
+    alpha : bool, optional
+        If True, return an alpha channel as a fourth column. Colours
+        without an alpha component are fully opaque.
+
+    dtype : string or numpy dtype, optional
+        "uint8" (default) returns values between 0 and 255. A float
+        dtype returns values between 0 and 1, as used by matplotlib.
+
+    Raises
+    ------
+    TypeError
+        If colours is a single string or does not contain strings.
+    ValueError
+        If colours is not one-dimensional or any colour cannot be parsed.
+
+    Returns
+    -------
+    numpy.ndarray
+        C-contiguous array of shape (N, 3), or (N, 4) if alpha is True.
+
+    """
+    strings = _as_colour_strings(colours)
+
+    # Work on a (N, width) matrix of unicode code points, padded with zeros
+    width = max(strings.dtype.itemsize // 4, 9)
+    codes = np.zeros((len(strings), width), dtype=np.uint32)
+    if strings.size and strings.dtype.itemsize:
+        codes[:, : strings.dtype.itemsize // 4] = strings.view(np.uint32).reshape(len(strings), -1)
+
+    rgba = np.empty((len(strings), 4), dtype=np.uint8)
+    is_css = ((codes[:, 0] | 32) == ord("r")) & ((codes[:, 1] | 32) == ord("g")) & ((codes[:, 2] | 32) == ord("b"))
+    if not is_css.all():
+        rgba[~is_css] = _parse_hex_codes(codes[~is_css], strings[~is_css])
+    for index in np.flatnonzero(is_css):
+        rgba[index] = _parse_css_colour(str(strings[index]))
+
+    channels = rgba if alpha else rgba[:, :3]
+    dtype = np.dtype(dtype)
+    if dtype.kind == "f":
+        return np.ascontiguousarray(channels, dtype=dtype) / np.asarray(255, dtype=dtype)
+    return np.ascontiguousarray(channels, dtype=dtype)
+
+
+def rgb_array_to_hex(rgb):
+    """
+    Convert an array of rgb(a) values to hex codes in a single
+    vectorised pass. This is the inverse of colours_to_rgb_array().
+
+    Parameters
+    ----------
+    rgb : numpy.ndarray or sequence
+        Array of shape (N, 3) or (N, 4). Integer values are read as
+        0 to 255 and float values as 0 to 1.
+
+    Raises
+    ------
+    TypeError
+        If rgb is not numeric.
+    ValueError
+        If rgb has the wrong shape or values are out of range.
+
+    Returns
+    -------
+    numpy.ndarray
+        Array of N upper-case hex strings, "#RRGGBB" or "#RRGGBBAA"
+        when an alpha column is given.
+
+    """
+    values = np.asarray(rgb)
+    if values.ndim != 2 or values.shape[1] not in (3, 4):
+        raise ValueError(f"rgb must have shape (N, 3) or (N, 4), not {values.shape}.")
+
+    if values.dtype.kind == "f":
+        if ((values < 0) | (values > 1)).any():
+            raise ValueError("float rgb values must be between 0 and 1.")
+        values = np.rint(values * 255)
+    elif values.dtype.kind in "iu":
+        if ((values < 0) | (values > 255)).any():
+            raise ValueError("integer rgb values must be between 0 and 255.")
+    else:
+        raise TypeError(f"rgb must be numeric, not {values.dtype}.")
+    values = values.astype(np.uint8)
+
+    width = 1 + 2 * values.shape[1]
+    chars = np.empty((len(values), width), dtype=np.uint8)
+    chars[:, 0] = ord("#")
+    chars[:, 1::2] = _HEX_CHARS[values >> 4]
+    chars[:, 2::2] = _HEX_CHARS[values & 15]
+    return chars.view(f"S{width}").ravel().astype(f"U{width}")
+
+
+def srgb_to_linear(rgb):
+    """
+    Convert sRGB values to linear light, undoing the sRGB transfer
+    function.
+
+    Parameters
+    ----------
+    rgb : numpy.ndarray
+        Float sRGB values between 0 and 1, of any shape.
+
+    Returns
+    -------
+    numpy.ndarray
+        Linear rgb values of the same shape.
+
+    """
+    return np.where(rgb <= 0.04045, rgb / 12.92, ((rgb + 0.055) / 1.055) ** 2.4)
+
+
+def linear_to_srgb(rgb):
+    """
+    Convert linear light values to sRGB. This is the inverse of
+    srgb_to_linear(). Negative values are clipped to 0.
+
+    Parameters
+    ----------
+    rgb : numpy.ndarray
+        Float linear rgb values, of any shape.
+
+    Returns
+    -------
+    numpy.ndarray
+        sRGB values of the same shape.
+
+    """
+    rgb = np.clip(rgb, 0, None)
+    return np.where(rgb <= 0.0031308, rgb * 12.92, 1.055 * rgb ** (1 / 2.4) - 0.055)
+
+
+def map_af_colours(
+    values,
+    kind="auto",
+    colour_format="rgba",
+    palette=None,
+    categories=None,
+    vmin=None,
+    vmax=None,
+    nan_colour="#FFFFFF00",
+):
+    """
+    Map an array of categories or numbers to colours in one vectorised
+    pass, for example to colour scatter or map markers point by point.
+
+    Categorical values are factorised once and each category is given a
+    colour from the palette. Numerical values are normalised between vmin
+    and vmax and looked up in a 256 entry afcharts colour map. Missing
+    values (NaN or None) are given nan_colour.
+
+    Parameters
+    ----------
+    values : list, pandas.Series or numpy.ndarray
+        One-dimensional values to colour. A pandas Series with a
+        "category" dtype reuses its existing category codes.
+
+    kind : string, optional
+        "categorical", "continuous" or "auto" (default). Auto treats
+        numerical values as continuous and anything else as categorical.
+
+    colour_format : string, optional
+        "rgba" (default) returns an (N, 4) float array between 0 and 1,
+        for matplotlib's `c`, `color` or `facecolors`. "hex" returns an
+        array of hex strings for plotly's `marker.color`.
+
+    palette : string or sequence, optional
+        For categorical values, an AF palette name or a sequence of
+        colours. Defaults to the categorical palette with as many colours
+        as there are categories. For continuous values, the name of an
+        afcharts colour map. Defaults to "afcharts_sequential".
+
+    categories : sequence, optional
+        Categorical values only. The categories in palette order. Defaults
+        to the categories of a pandas categorical, otherwise the sorted
+        unique values.
+
+    vmin, vmax : float, optional
+        Continuous values only. The values mapped to either end of the
+        colour map. Default to the smallest and largest finite value.
+        Values outside the range, including infinite values, get the
+        colour at the nearest end of the colour map.
+
+    nan_colour : string, optional
+        Colour for missing values. Defaults to fully transparent.
+
+    Raises
+    ------
+    ValueError
+        If kind or colour_format are not recognised, values contain a
+        category missing from categories, or there are more categories
+        than palette colours.
+
+    Returns
+    -------
+    numpy.ndarray
+        (N, 4) float array or array of N hex strings.
+
+    """
+    # Imported here as af_colourmaps itself depends on this module
+    from afcharts.af_colourmaps import get_af_colour_lut
+
+    if kind not in ["auto", "categorical", "continuous"]:
+        raise ValueError(f"kind must be 'auto', 'categorical' or 'continuous', not {kind}.")
+    if colour_format not in ["rgba", "hex"]:
+        raise ValueError(f"colour_format must be 'rgba' or 'hex', not {colour_format}.")
+
+    if hasattr(values, "cat"):
+        # pandas categorical data is already factorised
+        array = values
+        kind = "categorical" if kind == "auto" else kind
+    else:
+        array = np.asarray(values)
+        if array.ndim != 1:
+            raise ValueError(f"values must be one-dimensional, not {array.ndim}-dimensional.")
+        if kind == "auto":
+            kind = "continuous" if array.dtype.kind in "iuf" else "categorical"
+
+    if kind == "categorical":
+        codes, categories = _factorise(values, categories)
+        if palette is None or isinstance(palette, str):
+            table = colours_to_rgb_array(
+                get_af_colours(palette or "categorical", number_of_colours=max(len(categories), 1)), dtype="float64"
+            )
+        else:
+            table = colours_to_rgb_array(palette, dtype="float64")
+        if len(categories) > len(table):
+            raise ValueError(f"values have {len(categories)} categories but the palette only has {len(table)} colours.")
+    else:
+        numbers = np.asarray(array, dtype="float64")
+        codes = _normalise_to_lut_index(numbers, vmin, vmax)
+        table = get_af_colour_lut(palette or "afcharts_sequential")
+
+    # Append the missing value colour to the table so a single take() colours every point
+    nan_rgba = colours_to_rgb_array([nan_colour], alpha=True, dtype="float64")
+    codes = np.where(codes < 0, len(table), codes)
+
+    if colour_format == "hex":
+        hex_nan = rgb_array_to_hex(nan_rgba[:, :3] if nan_rgba[0, 3] == 1 else nan_rgba)
+        return np.concatenate([rgb_array_to_hex(table), hex_nan]).take(codes)
+
+    rgba_table = np.ones((len(table) + 1, 4))
+    rgba_table[:-1, :3] = table
+    rgba_table[-1] = nan_rgba[0]
+    return rgba_table.take(codes, axis=0)
+
+
+def _as_colour_strings(colours):
+    """
+    Validate a collection of colour strings and return it as a stripped
+    one-dimensional numpy unicode array.
+    """
+    if isinstance(colours, (str, bytes)):
+        raise TypeError("colours must be a collection of colour strings, not a single string.")
+
+    strings = np.asarray(colours)
+    if strings.ndim != 1:
+        raise ValueError(f"colours must be one-dimensional, not {strings.ndim}-dimensional.")
+    if strings.size == 0:
+        return strings.astype(str)
+    if strings.dtype.kind == "O":
+        if not all(isinstance(colour, str) for colour in strings):
+            raise TypeError("colours must only contain strings.")
+    elif strings.dtype.kind not in "US":
+        raise TypeError(f"colours must only contain strings, not {strings.dtype}.")
+
+    return np.char.strip(strings.astype(str))
+
+
+def _parse_hex_codes(codes, strings):
+    """
+    Parse a (N, width) matrix of code points holding hex codes into an
+    (N, 4) array. strings holds the original codes for error messages.
+    """
+    has_hash = codes[:, 0] == ord("#")
+    lengths = np.count_nonzero(codes, axis=1) - has_hash
+    invalid = ~np.isin(lengths, (3, 4, 6, 8))
+    if invalid.any():
+        raise ValueError(f"invalid hex colour: {str(strings[invalid][0])!r}.")
+
+    # Look up the value of up to 8 digits per code, skipping any leading #.
+    # Code points outside ASCII are clipped onto an invalid table entry.
+    positions = np.arange(8) + has_hash[:, None]
+    digits = _HEX_VALUES[np.minimum(np.take_along_axis(codes, positions, axis=1), 255)]
+
+    invalid = ((digits < 0) & (np.arange(8) < lengths[:, None])).any(axis=1)
+    if invalid.any():
+        raise ValueError(f"invalid hex colour: {str(strings[invalid][0])!r}.")
+
+    long_form = digits[:, 0::2] * 16 + digits[:, 1::2]
+    short_form = digits[:, :4] * 17
+    rgba = np.where((lengths >= 6)[:, None], long_form, short_form)
+    rgba[(lengths == 3) | (lengths == 6), 3] = 255
+    return rgba
+
+
+def _factorise(values, categories=None):
+    """
+    Return an integer code per value, -1 for missing values, and the
+    categories the codes refer to.
+    """
+    if hasattr(values, "cat") and categories is None:
+        return np.asarray(values.cat.codes), list(values.cat.categories)
+
+    if hasattr(values, "to_numpy") and categories is None:
+        # pandas is already imported if values is a pandas object, and its hash based
+        # factorize is much faster than sorting an object array
+        import pandas as pd
+
+        codes, uniques = pd.factorize(values, sort=True)
+        return codes, uniques.tolist()
+
+    array = np.asarray(values)
+    if array.dtype.kind == "f":
+        missing = np.isnan(array)
+    elif array.dtype.kind == "O":
+        missing = np.equal(array, np.array(None, dtype=object)) | (array != array)
+    else:
+        missing = np.zeros(len(array), dtype=bool)
+
+    uniques, inverse = np.unique(array[~missing], return_inverse=True)
+    if categories is None:
+        categories = uniques.tolist()
+        lookup = np.arange(len(uniques))
+    else:
+        categories = list(categories)
+        positions = {category: position for position, category in enumerate(categories)}
+        unknown = [unique for unique in uniques.tolist() if unique not in positions]
+        if unknown:
+            raise ValueError(f"values contain categories missing from categories: {unknown}.")
+        lookup = np.array([positions[unique] for unique in uniques.tolist()], dtype=np.intp)
+
+    codes = np.full(len(array), -1, dtype=np.intp)
+    codes[~missing] = lookup[inverse]
+    return codes, categories
+
+
+def _normalise_to_lut_index(numbers, vmin=None, vmax=None, n=256):
+    """
+    Return the colour map table index of each number, -1 for NaN.
+    The default range is taken from the finite numbers.
+    """
+    missing = np.isnan(numbers)
+    if missing.all():
+        return np.full(len(numbers), -1, dtype=np.intp)
+
+    finite = numbers[np.isfinite(numbers)]
+    vmin = (finite.min() if len(finite) else 0.0) if vmin is None else vmin
+    vmax = (finite.max() if len(finite) else 0.0) if vmax is None else vmax
+    scale = (n - 1) / (vmax - vmin) if vmax != vmin else 0
+    with np.errstate(invalid="ignore"):
+        indices = np.clip(np.rint((numbers - vmin) * scale), 0, n - 1)
+    # Infinite values go to the ends of the colour map, even when the scale is 0
+    indices[numbers == np.inf] = n - 1
+    indices[numbers == -np.inf] = 0
+    indices[missing] = -1
+    return indices.astype(np.intp)
+
+
+def _parse_css_colour(colour):
+    """
+    Parse a CSS "rgb()" or "rgba()" string into an (r, g, b, a) tuple of 0 to 255 values.
+    """
+    match = _CSS_COLOUR.fullmatch(colour)
+    if match is None:
+        raise ValueError(f"invalid CSS colour: {colour!r}.")
+
+    red, green, blue, alpha = match.groups()
+    channels = [float(value[:-1]) * 255 / 100 if value.endswith("%") else float(value) for value in (red, green, blue)]
+    if alpha is None:
+        channels.append(255)
+    elif alpha.endswith("%"):
+        channels.append(float(alpha[:-1]) * 255 / 100)
+    else:
+        channels.append(float(alpha) * 255)
+
+    if any(channel < 0 or channel > 255.0001 for channel in channels):
+        raise ValueError(f"invalid CSS colour: {colour!r}.")
+    return tuple(round(channel) for channel in channels)
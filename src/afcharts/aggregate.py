@@ -0,0 +1,124 @@
+# Aggregation of large point clouds onto a grid of pixel-sized bins
+# A scatter chart of millions of points draws every marker, so its cost grows
+# with the data and most markers are hidden under others. Here the points are
+# counted, averaged or maximised per bin with np.bincount, reading the data
+# in chunks so memory stays bounded, and the grid is drawn as a single image.
+# The cost of drawing then depends on the size of the chart only.
+
+import numpy as np
+
+REDUCTIONS = ("count", "mean", "max")
+
+# Number of points binned at once, so temporary arrays stay small
+_CHUNK_SIZE = 2**20
+
+
+def bin_points(x, y, values=None, reduction="count", bins=(500, 300), x_range=None, y_range=None):
+    """
+    Aggregate points onto a regular grid of bins, for example one bin per
+    pixel of a chart.
+
+    Parameters
+    ----------
+    x, y : array_like
+        One-dimensional coordinates of the points. Points with a missing
+        coordinate are left out.
+
+    values : array_like, optional
+        A value for each point, reduced by "mean" and "max". Points with
+        a missing value are left out.
+
+    reduction : string, optional
+        "count" (default) counts the points in each bin. "mean" and "max"
+        give the mean and largest value of the points in each bin.
+
+    bins : int or tuple of int, optional
+        Number of bins across and up, or one number for both. Defaults to
+        (500, 300).
+
+    x_range, y_range : tuple of float, optional
+        Lowest and highest coordinates binned. Points outside are left
+        out. Default to the smallest and largest coordinates.
+
+    Raises
+    ------
+    ValueError
+        If reduction is not recognised, values are missing for "mean" or
+        "max", the arrays have different lengths, or bins is less than 1.
+
+    Returns
+    -------
+    grid : numpy.ndarray
+        Array of shape (bins up, bins across), with row 0 at the lowest
+        y, as `imshow(origin="lower")` expects. Counts are integers.
+        Means and maxima are floats, NaN for empty bins.
+
+    x_edges, y_edges : numpy.ndarray
+        Edges of the bins, one more than the number of bins.
+
+    """
+    if reduction not in REDUCTIONS:
+        raise ValueError(f"reduction must be one of {', '.join(REDUCTIONS)}, not {reduction}.")
+    if values is None and reduction != "count":
+        raise ValueError(f"values must be given for reduction {reduction}.")
+    width, height = np.broadcast_to(bins, 2).tolist()
+    if width < 1 or height < 1:
+        raise ValueError("bins must be at least 1.")
+
+    x, y = np.asarray(x, dtype="float64"), np.asarray(y, dtype="float64")
+    values = None if values is None or reduction == "count" else np.asarray(values, dtype="float64")
+    if len(x) != len(y) or (values is not None and len(values) != len(x)):
+        raise ValueError("x, y and values must have the same length.")
+
+    x_low, x_high = _data_range(x) if x_range is None else x_range
+    y_low, y_high = _data_range(y) if y_range is None else y_range
+    x_scale = width / ((x_high - x_low) or 1)
+    y_scale = height / ((y_high - y_low) or 1)
+
+    size = width * height
+    counts = np.zeros(size, dtype=np.int64)
+    totals = np.zeros(size) if reduction == "mean" else None
+    peaks = np.full(size, -np.inf) if reduction == "max" else None
+    for start in range(0, len(x), _CHUNK_SIZE):
+        chunk = slice(start, start + _CHUNK_SIZE)
+        chunk_x, chunk_y = x[chunk], y[chunk]
+        # Comparisons with NaN are False, so missing coordinates are left out here
+        keep = (chunk_x >= x_low) & (chunk_x <= x_high) & (chunk_y >= y_low) & (chunk_y <= y_high)
+        chunk_values = None if values is None else values[chunk]
+        if chunk_values is not None:
+            keep &= ~np.isnan(chunk_values)
+            chunk_values = chunk_values[keep]
+        # Points on the upper edge of the range go in the last bin
+        index = np.minimum(np.floor((chunk_y[keep] - y_low) * y_scale), height - 1).astype(np.intp) * width
+        index += np.minimum(np.floor((chunk_x[keep] - x_low) * x_scale), width - 1).astype(np.intp)
+
+        counts += np.bincount(index, minlength=size)
+        if totals is not None:
+            totals += np.bincount(index, weights=chunk_values, minlength=size)
+        if peaks is not None and chunk_values is not None:
+            np.maximum.at(peaks, index, chunk_values)
+
+    grid = _reduce(counts, totals, peaks).reshape(height, width)
+    return grid, np.linspace(x_low, x_high, width + 1), np.linspace(y_low, y_high, height + 1)
+
+
+def _reduce(counts, totals, peaks):
+    """
+    Return the counts, means or maxima of the bins, with NaN for empty
+    bins of means and maxima.
+    """
+    if totals is not None:
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return totals / counts
+    if peaks is not None:
+        return np.where(counts > 0, peaks, np.nan)
+    return counts
+
+
+def _data_range(coordinates):
+    finite = np.isfinite(coordinates)
+    if not finite.any():
+        return 0.0, 1.0
+    return float(np.min(coordinates, where=finite, initial=np.inf)), float(
+        np.max(coordinates, where=finite, initial=-np.inf)
+    )
@@ -0,0 +1,337 @@
+# Rendering afcharts charts from asyncio applications
+# Rendering a static image with kaleido or Agg blocks for tens to hundreds of
+# milliseconds, so it is run on an executor while the event loop carries on
+# serving requests. A semaphore bounds the number of charts rendering at once
+# and callers beyond that wait their turn, or are turned away once too many
+# are waiting, so a burst of requests cannot build an unbounded queue.
+
+import asyncio
+import io
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from afcharts.export import ExportResult, initialise_worker, register_afcharts_names, run_export_job
+from afcharts.instrument import forward_events, is_recording
+
+EXECUTOR_KINDS = ("process", "thread")
+
+
+class RenderQueueFull(RuntimeError):
+    """
+    Raised when a chart is submitted while the most callers allowed are
+    already waiting to render, so a service can reply "try again later"
+    instead of queueing without limit.
+    """
+
+
+class AsyncExporter:
+    """
+    Renders and exports charts from asyncio code without blocking the
+    event loop. Use as an async context manager, so the executor is shut
+    down at the end:
+
+        async with AsyncExporter(max_concurrency=8) as exporter:
+            png = await exporter.render(fig, "png", timeout=10)
+
+    At most max_concurrency charts render at once. Further calls wait
+    for a free slot, which slows callers down when the service is busy.
+    If max_waiting callers are already waiting, further calls raise
+    RenderQueueFull straight away.
+
+    A call that times out or is cancelled stops waiting at once. A
+    chart that has not started rendering is dropped. A chart that is
+    already rendering cannot be interrupted: it finishes in the
+    background and keeps its slot until it does, so timeouts never let
+    more than max_concurrency charts render at once.
+
+    Parameters
+    ----------
+    max_concurrency : int, optional
+        Number of charts rendered at once, and the size of the executor.
+        Defaults to the number of CPUs.
+
+    executor : string, optional
+        "process" (default) renders on worker processes prepared by
+        afcharts.export.initialise_worker(), so charts render in
+        parallel. Figures and results are sent between processes, so
+        they must be picklable. "thread" renders on threads in this
+        process, which avoids copying figures but runs one chart's
+        Python code at a time. Threads share this process's settings,
+        so only the afcharts colour maps and styles are registered; the
+        backend, default plotly template and rcParams are left as they
+        are, and figures should be built with the afcharts template or
+        style applied.
+
+    max_waiting : int, optional
+        Largest number of calls waiting for a slot before further calls
+        raise RenderQueueFull. Defaults to no limit.
+
+    timeout : float, optional
+        Default number of seconds a call may take, including time spent
+        waiting for a slot. Defaults to no limit.
+
+    Raises
+    ------
+    ValueError
+        If max_concurrency is less than 1 or executor is not recognised.
+
+    """
+
+    def __init__(self, max_concurrency=None, executor="process", max_waiting=None, timeout=None):
+        max_concurrency = max_concurrency or os.cpu_count() or 1
+        if max_concurrency < 1:
+            raise ValueError("max_concurrency must be at least 1.")
+        if executor not in EXECUTOR_KINDS:
+            raise ValueError(f"executor must be one of {', '.join(EXECUTOR_KINDS)}, not {executor}.")
+        self.max_concurrency = max_concurrency
+        self.executor_kind = executor
+        self.max_waiting = max_waiting
+        self.timeout = timeout
+        self.waiting = 0
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._executor = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self.aclose()
+        return False
+
+    async def render(self, figure, format="png", timeout=None, **kwargs):
+        """
+        Render a figure to bytes, for example to send in an HTTP response.
+
+        Parameters
+        ----------
+        figure : plotly.graph_objects.Figure, dict or matplotlib.figure.Figure
+            Figure to render.
+
+        format : string, optional
+            Output format, such as "png" (default), "svg", "pdf", or
+            "html" and "json" for plotly figures.
+
+        timeout : float, optional
+            Seconds the call may take. Defaults to the exporter's
+            timeout.
+
+        **kwargs
+            Passed to `to_image`, `to_html`, `to_json` or `savefig`.
+
+        Raises
+        ------
+        RenderQueueFull
+            If max_waiting calls are already waiting for a slot.
+
+        TimeoutError
+            If rendering takes longer than timeout.
+
+        Returns
+        -------
+        bytes
+            The rendered chart.
+
+        """
+        return await self._run(render_figure, figure, format, kwargs, timeout=timeout)
+
+    async def export(self, job, timeout=None):
+        """
+        Build and write the chart for an ExportJob.
+
+        Parameters
+        ----------
+        job : afcharts.export.ExportJob
+            The chart to export.
+
+        timeout : float, optional
+            Seconds the call may take. Defaults to the exporter's
+            timeout.
+
+        Raises
+        ------
+        RenderQueueFull
+            If max_waiting calls are already waiting for a slot.
+
+        Returns
+        -------
+        afcharts.export.ExportResult
+            Result of the job. A job that fails or times out has its
+            error set rather than raising.
+
+        """
+        return await self._export(job, timeout)
+
+    async def _export(self, job, timeout=None, queue_limit=True):
+        start = time.perf_counter()
+        try:
+            result = await self._run(
+                run_export_job, job, None, is_recording(), timeout=timeout, queue_limit=queue_limit
+            )
+        except asyncio.TimeoutError:
+            timeout = self.timeout if timeout is None else timeout
+            return ExportResult(str(job.path), f"Timed out after {timeout} seconds.", time.perf_counter() - start)
+        forward_events(result.events)
+        return result
+
+    async def export_many(self, jobs, timeout=None):
+        """
+        Export charts, yielding a result for each job as soon as it
+        finishes. Jobs are read from the iterable lazily, so only about
+        twice max_concurrency jobs are held at once. The batch bounds its
+        own queue this way, so its jobs do not count towards max_waiting
+        and never raise RenderQueueFull.
+
+        Parameters
+        ----------
+        jobs : iterable or async iterable of afcharts.export.ExportJob
+            Charts to export. May be a generator.
+
+        timeout : float, optional
+            Seconds each job may take. Defaults to the exporter's
+            timeout.
+
+        Yields
+        ------
+        afcharts.export.ExportResult
+            Results in the order the jobs finish.
+
+        """
+        max_pending = 2 * self.max_concurrency
+        pending: set[asyncio.Task] = set()
+        try:
+            async for job in _aiter(jobs):
+                if len(pending) >= max_pending:
+                    done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                    for task in done:
+                        yield task.result()
+                pending.add(asyncio.ensure_future(self._export(job, timeout, queue_limit=False)))
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    yield task.result()
+        finally:
+            for task in pending:
+                task.cancel()
+
+    def close(self):
+        """
+        Shut down the executor, cancelling charts that have not started.
+        Charts already rendering finish in the background.
+        """
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    async def aclose(self):
+        """
+        Shut down the executor, cancelling charts that have not started
+        and waiting for charts already rendering to finish, without
+        blocking the event loop.
+        """
+        executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+            await asyncio.get_running_loop().run_in_executor(None, executor.shutdown)
+
+    async def _run(self, function, *args, timeout=None, queue_limit=True):
+        """
+        Run function on the executor once a slot is free, holding the slot
+        until the function has finished, even if the caller stops waiting.
+        Calls with queue_limit False wait without counting towards
+        max_waiting.
+        """
+        timeout = self.timeout if timeout is None else timeout
+        return await asyncio.wait_for(self._submit(function, *args, queue_limit=queue_limit), timeout)
+
+    async def _submit(self, function, *args, queue_limit=True):
+        if not queue_limit:
+            await self._semaphore.acquire()
+        else:
+            if self.max_waiting is not None and self._semaphore.locked() and self.waiting >= self.max_waiting:
+                raise RenderQueueFull(f"{self.waiting} charts are already waiting to render.")
+            self.waiting += 1
+            try:
+                await self._semaphore.acquire()
+            finally:
+                self.waiting -= 1
+
+        loop = asyncio.get_running_loop()
+        try:
+            future = self._get_executor().submit(function, *args)
+        except BaseException:
+            self._semaphore.release()
+            raise
+        future.add_done_callback(lambda _: _call_soon(loop, self._semaphore.release))
+        return await asyncio.wrap_future(future)
+
+    def _get_executor(self):
+        if self._executor is None:
+            if self.executor_kind == "process":
+                self._executor = ProcessPoolExecutor(self.max_concurrency, initializer=initialise_worker)
+            else:
+                register_afcharts_names()
+                self._executor = ThreadPoolExecutor(self.max_concurrency, thread_name_prefix="afcharts-render")
+        return self._executor
+
+
+def render_figure(figure, format="png", kwargs=None):
+    """
+    Render a plotly or matplotlib figure to bytes.
+
+    Parameters
+    ----------
+    figure : plotly.graph_objects.Figure, dict or matplotlib.figure.Figure
+        Figure to render.
+
+    format : string, optional
+        Output format, such as "png" (default), "svg", "pdf", or "html"
+        and "json" for plotly figures.
+
+    kwargs : mapping, optional
+        Passed to `to_image`, `to_html`, `to_json` or `savefig`.
+
+    Raises
+    ------
+    TypeError
+        If figure is not a plotly or matplotlib figure.
+
+    Returns
+    -------
+    bytes
+        The rendered chart.
+
+    """
+    kwargs = kwargs or {}
+    if hasattr(figure, "savefig"):
+        buffer = io.BytesIO()
+        figure.savefig(buffer, format=format, **kwargs)
+        return buffer.getvalue()
+
+    if isinstance(figure, dict) or hasattr(figure, "to_plotly_json"):
+        import plotly.io as pio
+
+        if format == "html":
+            return pio.to_html(figure, **kwargs).encode("utf-8")
+        if format == "json":
+            return pio.to_json(figure, **kwargs).encode("utf-8")
+        return pio.to_image(figure, format=format, **kwargs)
+
+    raise TypeError(f"figure must be a plotly or matplotlib figure, not {type(figure).__name__}.")
+
+
+def _call_soon(loop, callback):
+    # The loop may have been closed while a timed out chart finished rendering
+    try:
+        loop.call_soon_threadsafe(callback)
+    except RuntimeError:
+        pass
+
+
+async def _aiter(items):
+    if hasattr(items, "__aiter__"):
+        async for item in items:
+            yield item
+    else:
+        for item in items:
+            yield item
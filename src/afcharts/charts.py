@@ -0,0 +1,598 @@
+# Chart helpers that apply the afcharts plotly template or matplotlib style
+
+import functools
+
+import numpy as np
+
+from afcharts.aggregate import bin_points
+from afcharts.downsample import downsample
+from afcharts.instrument import stage
+
+# Heatmap label colours, chosen per cell for the higher contrast with the fill
+_LABEL_COLOURS = ("#000000", "#FFFFFF")
+
+# Fraction of a heatmap cell a label may fill and still be readable
+_LABEL_FILL = 0.9
+
+# Most categories labelled individually on a heatmap axis
+_MAX_TICK_LABELS = 50
+
+# Size of plotly figures without an explicit width and height, in pixels,
+# and an estimate of the space taken by the colour bar
+_PLOTLY_DEFAULT_SIZE = (700, 450)
+_PLOTLY_COLOURBAR_WIDTH = 100
+
+# Average width of a digit as a fraction of the font size, used to estimate
+# whether plotly heatmap labels fit their cells
+_PLOTLY_CHARACTER_WIDTH = 0.6
+
+# Colour bar titles of density scatter charts
+_REDUCTION_TITLES = {"count": "Number of points", "mean": "Mean", "max": "Maximum"}
+
+
+def line_chart(data, backend="plotly", max_points=2000, method="lttb", title=None):
+    """
+    Draw a line chart in the afcharts style, with one line per column.
+    Long series are downsampled to about max_points points per line
+    before they are passed to plotly or matplotlib, so the size of the
+    chart does not grow with the length of the data.
+
+    Parameters
+    ----------
+    data : pandas.Series or pandas.DataFrame
+        The series to plot. The index is used as the x axis and may be a
+        datetime index. Each DataFrame column is drawn as a line.
+
+    backend : string, optional
+        "plotly" (default) or "matplotlib".
+
+    max_points : int or NoneType, optional
+        Target number of points per line. Defaults to 2000, enough for
+        about two points per pixel on a wide chart. None turns off
+        downsampling.
+
+    method : string, optional
+        Downsampling method, "lttb" (default) or "minmax". See
+        afcharts.downsample.downsample().
+
+    title : string, optional
+        Chart title.
+
+    Raises
+    ------
+    ValueError
+        If backend is not "plotly" or "matplotlib".
+
+    Returns
+    -------
+    plotly.graph_objects.Figure or matplotlib.figure.Figure
+        The styled chart.
+
+    """
+    if backend not in ["plotly", "matplotlib"]:
+        raise ValueError(f"backend must be 'plotly' or 'matplotlib', not {backend}.")
+
+    if max_points is not None:
+        with stage("downsample"):
+            data = downsample(data, max_points, method)
+    frame = data.to_frame() if data.ndim == 1 else data
+
+    if backend == "plotly":
+        return _plotly_line_chart(frame, title)
+    return _matplotlib_line_chart(frame, title)
+
+
+def _plotly_line_chart(frame, title):
+    import plotly.graph_objects as go
+
+    from afcharts.pio_template import apply_afcharts_template
+
+    with stage("figure_build"):
+        fig = go.Figure()
+        for column in frame.columns:
+            fig.add_trace(go.Scatter(x=frame.index, y=frame[column], mode="lines", name=str(column)))
+        with stage("layout"):
+            fig.update_layout(title=title, showlegend=len(frame.columns) > 1)
+    return apply_afcharts_template(fig)
+
+
+def _matplotlib_line_chart(frame, title):
+    from matplotlib.figure import Figure
+
+    from afcharts.mpl_style import afcharts_style
+
+    with afcharts_style(), stage("figure_build"):
+        fig = Figure()
+        ax = fig.add_subplot()
+        for column in frame.columns:
+            ax.plot(frame.index, frame[column], label=str(column))
+        if title is not None:
+            ax.set_title(title)
+        if len(frame.columns) > 1:
+            ax.legend()
+    return fig
+
+
+def heatmap(
+    data,
+    backend="plotly",
+    colourmap="afcharts_sequential",
+    vmin=None,
+    vmax=None,
+    labels=True,
+    label_format=",.0f",
+    label_size=10,
+    title=None,
+    size=None,
+):
+    """
+    Draw a heatmap in the afcharts style, with each cell labelled with
+    its value in black or white, whichever contrasts more with the cell.
+
+    Label colours are looked up from the colour map for all cells at
+    once. Labels too wide or tall for their cells at the size the chart
+    is built are left out. With matplotlib, the labels are drawn as one
+    collection of glyph outlines per character rather than one text
+    artist per cell, so a 200 x 200 heatmap draws in a fraction of a
+    second.
+
+    Parameters
+    ----------
+    data : pandas.DataFrame or array_like
+        Two dimensional numeric data, drawn with the first row at the
+        top. The index and columns of a DataFrame label the axes.
+        Missing values are left blank.
+
+    backend : string, optional
+        "plotly" (default) or "matplotlib".
+
+    colourmap : string, optional
+        Name of an afcharts colour map, see
+        afcharts.af_colourmaps.get_af_colour_lut(). Defaults to
+        "afcharts_sequential".
+
+    vmin, vmax : float, optional
+        Values at the ends of the colour map. Default to the smallest and
+        largest values in data.
+
+    labels : bool, optional
+        If True (default), label each cell that is large enough with its
+        value.
+
+    label_format : string, optional
+        Format specification for labels, as used by `format()`. Defaults
+        to ",.0f".
+
+    label_size : float, optional
+        Label font size in points. Defaults to 10.
+
+    title : string, optional
+        Chart title.
+
+    size : tuple of float, optional
+        Figure (width, height), in inches for matplotlib and pixels for
+        plotly. Large heatmaps need a large figure for their labels to
+        fit. Defaults to the style's figure size.
+
+    Raises
+    ------
+    ValueError
+        If backend is not "plotly" or "matplotlib", colourmap is not an
+        afcharts colour map or data is not two dimensional.
+
+    Returns
+    -------
+    plotly.graph_objects.Figure or matplotlib.figure.Figure
+        The styled chart. Matplotlib labels are laid out for the figure
+        size when the chart is built, so resize the figure by rebuilding
+        it rather than with `set_size_inches()`.
+
+    """
+    from afcharts.af_colourmaps import check_colourmap_name
+
+    if backend not in ["plotly", "matplotlib"]:
+        raise ValueError(f"backend must be 'plotly' or 'matplotlib', not {backend}.")
+    check_colourmap_name(colourmap)
+
+    values = np.asarray(data, dtype="float64")
+    if values.ndim != 2:
+        raise ValueError(f"data must be two dimensional, not {values.ndim} dimensional.")
+    finite = np.isfinite(values)
+    vmin = float(np.min(values, initial=np.inf, where=finite)) if vmin is None else vmin
+    vmax = float(np.max(values, initial=-np.inf, where=finite)) if vmax is None else vmax
+    row_labels = list(data.index) if hasattr(data, "index") else None
+    column_labels = list(data.columns) if hasattr(data, "columns") else None
+
+    text = label_colours = None
+    if labels:
+        text = _format_labels(values, finite, label_format)
+        label_colours = _label_colour_index(colourmap)[_colour_index(values, vmin, vmax)]
+
+    axis_labels = (row_labels, column_labels)
+    cells = (values, colourmap, vmin, vmax)
+    if backend == "plotly":
+        return _plotly_heatmap(cells, axis_labels, text, label_colours, label_size, title, size)
+    return _matplotlib_heatmap(cells, axis_labels, text, label_colours, label_size, title, size)
+
+
+def _colour_index(values, vmin, vmax, n=256):
+    """
+    Return the colour map entry of each value, as matplotlib chooses it.
+    """
+    scaled = (values - vmin) / ((vmax - vmin) or 1) * n
+    return np.clip(np.nan_to_num(scaled), 0, n - 1).astype(np.intp)
+
+
+def _label_colour_index(colourmap, n=256):
+    """
+    Return, for each colour map entry, the index in _LABEL_COLOURS of the
+    label colour with the higher contrast against it.
+    """
+    from afcharts.af_colourmaps import get_af_colour_lut
+
+    # Keyed on the table itself, so a change to the palette config is picked up
+    return _lut_label_colour_index(get_af_colour_lut(colourmap, n).tobytes())
+
+
+@functools.lru_cache(maxsize=16)
+def _lut_label_colour_index(lut_bytes):
+    from afcharts.colour_audit import contrast_ratio
+
+    lut = np.frombuffer(lut_bytes, dtype="float64").reshape(-1, 3)
+    index = contrast_ratio(lut, _LABEL_COLOURS).argmax(axis=1)
+    index.setflags(write=False)
+    return index
+
+
+def _format_labels(values, finite, label_format):
+    """
+    Format each distinct value once and return an array of labels, with
+    empty labels for missing values.
+    """
+    unique, inverse = np.unique(values[finite], return_inverse=True)
+    formatted = np.array([format(value, label_format) for value in unique.tolist()], dtype=str)
+    text = np.zeros(values.shape, dtype=formatted.dtype if len(formatted) else "U1")
+    text[finite] = formatted[inverse]
+    return text
+
+
+def _plotly_heatmap(cells, axis_labels, text, label_colours, label_size, title, size):
+    import plotly.graph_objects as go
+
+    from afcharts.af_colourmaps import get_af_colorscale
+    from afcharts.pio_template import apply_afcharts_template, half_line
+
+    values, colourmap, vmin, vmax = cells
+    row_labels, column_labels = axis_labels
+    rows, columns = values.shape
+    width, height = size or _PLOTLY_DEFAULT_SIZE
+    x = list(range(columns)) if column_labels is None else column_labels
+    y = list(range(rows)) if row_labels is None else row_labels
+
+    with stage("figure_build"):
+        fig = go.Figure(
+            go.Heatmap(
+                z=values,
+                x=x,
+                y=y,
+                colorscale=get_af_colorscale(colourmap),
+                zmin=vmin,
+                zmax=vmax,
+                hoverongaps=False,
+            )
+        )
+        with stage("layout"):
+            fig.update_layout(title=title, yaxis={"autorange": "reversed"})
+            if size is not None:
+                fig.update_layout(width=width, height=height)
+
+        if text is not None:
+            # Points to pixels, as in the afcharts template
+            font_size = label_size * 1.33
+            cell_width = (width - 2 * half_line - _PLOTLY_COLOURBAR_WIDTH) / columns
+            cell_height = (height - 2 * half_line) / rows
+            readable = (np.char.str_len(text) * _PLOTLY_CHARACTER_WIDTH * font_size <= _LABEL_FILL * cell_width) & (
+                font_size <= _LABEL_FILL * cell_height
+            )
+            row_index, column_index = np.nonzero(readable & (text != ""))
+            fig.add_trace(
+                go.Scatter(
+                    x=np.asarray(x, dtype=object)[column_index],
+                    y=np.asarray(y, dtype=object)[row_index],
+                    mode="text",
+                    text=text[row_index, column_index],
+                    textfont={
+                        "size": font_size,
+                        "color": np.asarray(_LABEL_COLOURS)[label_colours[row_index, column_index]],
+                    },
+                    hoverinfo="skip",
+                    showlegend=False,
+                )
+            )
+    return apply_afcharts_template(fig)
+
+
+def _matplotlib_heatmap(cells, axis_labels, text, label_colours, label_size, title, size):
+    from matplotlib.figure import Figure
+
+    from afcharts.af_colourmaps import get_af_cmap
+    from afcharts.mpl_style import afcharts_style
+
+    values, colourmap, vmin, vmax = cells
+    row_labels, column_labels = axis_labels
+    with afcharts_style(), stage("figure_build"):
+        fig = Figure(figsize=size)
+        ax = fig.add_subplot()
+        image = ax.imshow(
+            values, cmap=get_af_cmap(colourmap), vmin=vmin, vmax=vmax, aspect="auto", interpolation="nearest"
+        )
+        ax.grid(False)
+        for axis, tick_labels in ((ax.xaxis, column_labels), (ax.yaxis, row_labels)):
+            if tick_labels is not None and len(tick_labels) <= _MAX_TICK_LABELS:
+                axis.set_ticks(range(len(tick_labels)), [str(label) for label in tick_labels])
+        fig.colorbar(image, ax=ax)
+        if title is not None:
+            ax.set_title(title)
+        if text is not None:
+            _draw_matplotlib_labels(ax, text, label_colours, label_size)
+    return fig
+
+
+def _draw_matplotlib_labels(ax, text, label_colours, label_size):
+    """
+    Draw heatmap labels that fit their cells as one PathCollection per
+    character, each holding one glyph outline drawn at many offsets.
+    """
+    from matplotlib.collections import PathCollection
+    from matplotlib.colors import to_rgba_array
+    from matplotlib.font_manager import FontProperties
+    from matplotlib.textpath import TextPath, text_to_path
+    from matplotlib.transforms import Affine2D
+
+    rows, columns = text.shape
+    fig = ax.figure
+    position = ax.get_position()
+    fig_width, fig_height = fig.get_size_inches() * 72
+    cell_width = position.width * fig_width / columns
+    cell_height = position.height * fig_height / rows
+
+    prop = FontProperties(size=label_size)
+    digit_height = text_to_path.get_text_width_height_descent("0", prop, ismath=False)[1]
+
+    # Unicode code points of each label, one row per cell, zero padded
+    flat = text.ravel()
+    width = max(flat.dtype.itemsize // 4, 1)
+    codes = np.ascontiguousarray(flat, dtype=f"U{width}").view(np.uint32).reshape(len(flat), width)
+    characters = np.unique(codes[codes > 0])
+    if not len(characters):
+        return
+    advances = np.array(
+        [0.0] + [text_to_path.get_text_width_height_descent(chr(code), prop, ismath=False)[0] for code in characters]
+    )
+    advance = advances[np.searchsorted(characters, codes) + 1]
+    advance[codes == 0] = 0
+
+    label_width = advance.sum(axis=1)
+    readable = (label_width > 0) & (label_width <= _LABEL_FILL * cell_width)
+    if digit_height > _LABEL_FILL * cell_height or not readable.any():
+        return
+
+    # Left edge of each character relative to the cell centre, in data units
+    starts = (np.cumsum(advance, axis=1) - advance - label_width[:, None] / 2) / cell_width
+    cell_colours = to_rgba_array(_LABEL_COLOURS)[label_colours.ravel()]
+    points_to_display = Affine2D().scale(1 / 72) + fig.dpi_scale_trans
+
+    for code in characters.tolist():
+        glyph = TextPath((0, -digit_height / 2), chr(code), prop=prop, usetex=False)
+        if not len(glyph.vertices):
+            continue
+        cell, position_in_label = np.nonzero((codes == code) & readable[:, None])
+        offsets = np.column_stack(
+            [cell % columns + starts[cell, position_in_label], cell // columns],
+        )
+        collection = PathCollection(
+            [glyph],
+            offsets=offsets,
+            offset_transform=ax.transData,
+            facecolors=cell_colours[cell],
+            edgecolors="none",
+            linewidths=0,
+        )
+        collection.set_transform(points_to_display)
+        ax.add_collection(collection, autolim=False)
+
+
+def density_scatter(
+    x,
+    y,
+    values=None,
+    reduction="count",
+    backend="plotly",
+    bins=None,
+    x_range=None,
+    y_range=None,
+    colourmap="afcharts_sequential",
+    log=None,
+    title=None,
+    size=None,
+):
+    """
+    Draw a scatter chart of many points as a density image in the
+    afcharts style. The points are binned into about one bin per pixel
+    of the plot area, and the bins are coloured through an afcharts
+    colour map and drawn as a single heatmap or image. Drawing then costs
+    the same for 5,000 or 50 million points.
+
+    Empty bins are left blank, so the chart keeps the afcharts
+    background and gridlines where there is no data.
+
+    Parameters
+    ----------
+    x, y : array_like
+        One-dimensional numeric coordinates of the points.
+
+    values : array_like, optional
+        A value for each point, for the "mean" and "max" reductions.
+
+    reduction : string, optional
+        "count" (default) colours each bin by the number of points in it.
+        "mean" and "max" colour it by the mean or largest value of its
+        points. See afcharts.aggregate.bin_points().
+
+    backend : string, optional
+        "plotly" (default) or "matplotlib".
+
+    bins : int or tuple of int, optional
+        Number of bins across and up. Defaults to about one bin per pixel
+        of the plot area at the figure size.
+
+    x_range, y_range : tuple of float, optional
+        Axis ranges. Points outside are left out. Default to the range of
+        the data.
+
+    colourmap : string, optional
+        Name of an afcharts colour map, see
+        afcharts.af_colourmaps.get_af_colour_lut(). Defaults to
+        "afcharts_sequential", so dense areas are dark.
+
+    log : bool, optional
+        If True, colour on a log scale, so sparse areas stay visible next
+        to dense ones. Bins with values of zero or less are left blank.
+        Defaults to True for "count" and False otherwise.
+
+    title : string, optional
+        Chart title.
+
+    size : tuple of float, optional
+        Figure (width, height), in inches for matplotlib and pixels for
+        plotly. Defaults to the style's figure size.
+
+    Raises
+    ------
+    ValueError
+        If backend is not "plotly" or "matplotlib", colourmap is not an
+        afcharts colour map, or the points cannot be binned.
+
+    Returns
+    -------
+    plotly.graph_objects.Figure or matplotlib.figure.Figure
+        The styled chart.
+
+    """
+    from afcharts.af_colourmaps import check_colourmap_name
+
+    if backend not in ["plotly", "matplotlib"]:
+        raise ValueError(f"backend must be 'plotly' or 'matplotlib', not {backend}.")
+    check_colourmap_name(colourmap)
+    log = reduction == "count" if log is None else log
+    if bins is None:
+        bins = _plotly_plot_area(size) if backend == "plotly" else _matplotlib_plot_area(size)
+
+    with stage("aggregate"):
+        grid, x_edges, y_edges = bin_points(x, y, values, reduction, bins, x_range, y_range)
+    # Empty bins are drawn blank, as are bins that have no logarithm
+    grid = grid.astype("float64")
+    if log:
+        grid[~(grid > 0)] = np.nan
+    elif reduction == "count":
+        grid[grid == 0] = np.nan
+
+    density = (grid, x_edges, y_edges, colourmap, log, _REDUCTION_TITLES[reduction])
+    if backend == "plotly":
+        return _plotly_density_scatter(density, title, size)
+    return _matplotlib_density_scatter(density, title, size)
+
+
+def _plotly_plot_area(size):
+    from afcharts.pio_template import half_line
+
+    width, height = size or _PLOTLY_DEFAULT_SIZE
+    return max(int(width - 2 * half_line - _PLOTLY_COLOURBAR_WIDTH), 1), max(int(height - 2 * half_line), 1)
+
+
+def _matplotlib_plot_area(size):
+    import matplotlib
+
+    from afcharts.mpl_style import get_afcharts_rc_params
+
+    rc_params = get_afcharts_rc_params()
+    width, height = size or rc_params.get("figure.figsize", matplotlib.rcParams["figure.figsize"])
+    dpi = rc_params.get("figure.dpi", matplotlib.rcParams["figure.dpi"])
+    # The default subplot fills about three quarters of the figure
+    return max(int(0.75 * width * dpi), 1), max(int(0.75 * height * dpi), 1)
+
+
+def _plotly_density_scatter(density, title, size):
+    import plotly.graph_objects as go
+
+    from afcharts.af_colourmaps import get_af_colorscale
+    from afcharts.pio_template import apply_afcharts_template
+
+    grid, x_edges, y_edges, colourmap, log, colourbar_title = density
+    colourbar = {"title": {"text": colourbar_title}}
+    if log:
+        with np.errstate(divide="ignore", invalid="ignore"):
+            grid = np.log10(grid)
+        colourbar.update(_log_colourbar_ticks(grid))
+
+    with stage("figure_build"):
+        fig = go.Figure(
+            go.Heatmap(
+                z=grid,
+                x0=(x_edges[0] + x_edges[1]) / 2,
+                dx=x_edges[1] - x_edges[0],
+                y0=(y_edges[0] + y_edges[1]) / 2,
+                dy=y_edges[1] - y_edges[0],
+                colorscale=get_af_colorscale(colourmap),
+                colorbar=colourbar,
+                hoverongaps=False,
+            )
+        )
+        with stage("layout"):
+            fig.update_layout(title=title)
+            if size is not None:
+                fig.update_layout(width=size[0], height=size[1])
+    return apply_afcharts_template(fig)
+
+
+def _log_colourbar_ticks(log_grid):
+    """
+    Return colour bar ticks at powers of ten for a grid of log10 values.
+    """
+    finite = np.isfinite(log_grid)
+    if not finite.any():
+        return {}
+    low = np.floor(np.min(log_grid, where=finite, initial=np.inf))
+    high = np.ceil(np.max(log_grid, where=finite, initial=-np.inf))
+    powers = np.arange(low, high + 1)
+    return {"tickvals": powers.tolist(), "ticktext": [f"{10**power:,g}" for power in powers.tolist()]}
+
+
+def _matplotlib_density_scatter(density, title, size):
+    from matplotlib.colors import LogNorm, Normalize
+    from matplotlib.figure import Figure
+
+    from afcharts.af_colourmaps import get_af_cmap
+    from afcharts.mpl_style import afcharts_style
+
+    grid, x_edges, y_edges, colourmap, log, colourbar_title = density
+    norm = LogNorm() if log else Normalize()
+    if not np.isfinite(grid).any():
+        # With no points there is nothing to scale the colours to
+        norm = Normalize(0, 1)
+    with afcharts_style(), stage("figure_build"):
+        fig = Figure(figsize=size)
+        ax = fig.add_subplot()
+        image = ax.imshow(
+            grid,
+            cmap=get_af_cmap(colourmap),
+            norm=norm,
+            origin="lower",
+            extent=(x_edges[0], x_edges[-1], y_edges[0], y_edges[-1]),
+            aspect="auto",
+            interpolation="nearest",
+        )
+        fig.colorbar(image, ax=ax, label=colourbar_title)
+        if title is not None:
+            ax.set_title(title)
+    return fig
@@ -0,0 +1,364 @@
+# Classification of continuous values into coloured classes, for choropleths
+# Values are binned by quantile, equal interval or Jenks natural breaks, and
+# each class is given a colour from an afcharts colour map, so the sequential
+# palette and interpolated versions of it can be used with any number of
+# classes. Jenks natural breaks are found with Fisher's exact dynamic
+# programme over the distinct values, vectorised with NumPy over blocks of
+# class ends. Large inputs are first reduced to values at evenly spaced ranks,
+# and the breaks found from them are then moved to their best place among all
+# the values.
+# References:
+# Fisher, W. D. (1958) On grouping for maximum homogeneity. Journal of the
+# American Statistical Association 53(284), 789-798.
+# Jenks, G. F. (1977) Optimal data classification for choropleth maps.
+# University of Kansas Occasional Paper 2.
+
+import dataclasses
+import itertools
+
+import numpy as np
+
+from afcharts.af_colours import colours_to_rgb_array, rgb_array_to_hex
+
+CLASSIFICATION_METHODS = ("quantile", "equal_interval", "jenks")
+
+# Number of values Jenks natural breaks are computed from. Larger inputs are
+# sampled at evenly spaced ranks, which keeps the shape of the distribution.
+default_jenks_sample_size = 5_000
+
+# Largest number of distinct values Jenks natural breaks are computed from.
+# The time grows with the square of this number, about a second at the limit.
+max_jenks_values = 20_000
+
+# Largest number of elements in the block of candidate costs computed at once
+_BLOCK_ELEMENTS = 2**21
+
+
+@dataclasses.dataclass(frozen=True)
+class Classification:
+    """
+    Values binned into classes, with a colour and legend label for each
+    class.
+
+    Class i holds the values above breaks[i] and up to and including
+    breaks[i + 1]. The first class also holds breaks[0], the smallest
+    value.
+
+    Attributes
+    ----------
+    method : string
+        The classification method, one of CLASSIFICATION_METHODS.
+
+    breaks : numpy.ndarray
+        Class boundaries, from the smallest to the largest value. One
+        more than the number of classes.
+
+    classes : numpy.ndarray
+        Class index of each value, or -1 for missing values.
+
+    colours : tuple of string
+        Hex colour of each class, from the lowest to the highest.
+
+    labels : tuple of string
+        Legend label of each class, such as "10 to 20".
+
+    counts : numpy.ndarray
+        Number of values in each class.
+
+    """
+
+    method: str
+    breaks: np.ndarray
+    classes: np.ndarray
+    colours: tuple
+    labels: tuple
+    counts: np.ndarray
+
+    def value_colours(self, colour_format="hex", nan_colour="#FFFFFF00"):
+        """
+        Return the colour of each value's class, for plotly's
+        `marker.color` or matplotlib's `color` and `facecolor`.
+
+        Parameters
+        ----------
+        colour_format : string, optional
+            "hex" (default) returns an array of hex strings. "rgba"
+            returns an (N, 4) float array between 0 and 1.
+
+        nan_colour : string, optional
+            Colour for missing values. Defaults to fully transparent.
+
+        Raises
+        ------
+        ValueError
+            If colour_format is not recognised.
+
+        Returns
+        -------
+        numpy.ndarray
+            Array of N hex strings or (N, 4) float array.
+
+        """
+        if colour_format not in ["rgba", "hex"]:
+            raise ValueError(f"colour_format must be 'rgba' or 'hex', not {colour_format}.")
+
+        # The missing value colour goes last in the table, where class -1 finds it
+        table = colours_to_rgb_array([*self.colours, nan_colour], alpha=True, dtype="float64")
+        if colour_format == "rgba":
+            return table.take(self.classes, axis=0)
+        hex_codes = rgb_array_to_hex(table[:, :3])
+        if table[-1, 3] < 1:
+            hex_codes = np.concatenate([hex_codes[:-1], rgb_array_to_hex(table[-1:])])
+        return hex_codes.take(self.classes)
+
+    def value_labels(self, nan_label="No data"):
+        """
+        Return the legend label of each value's class, for example for the
+        `color` of a plotly express choropleth with color_map() as its
+        `color_discrete_map`.
+
+        Parameters
+        ----------
+        nan_label : string, optional
+            Label for missing values. Defaults to "No data".
+
+        Returns
+        -------
+        numpy.ndarray
+            Array of N label strings.
+
+        """
+        return np.array([*self.labels, nan_label]).take(self.classes)
+
+    def colour_map(self):
+        """
+        Return the colour of each class keyed by its legend label, in
+        class order.
+        """
+        return dict(zip(self.labels, self.colours, strict=True))
+
+    def legend_handles(self):
+        """
+        Return a matplotlib legend entry for each class, for
+        `ax.legend(handles=classification.legend_handles())`.
+        """
+        from matplotlib.patches import Patch
+
+        return [Patch(facecolor=colour, label=label) for label, colour in self.colour_map().items()]
+
+
+def classify(
+    values,
+    number_of_classes=3,
+    method="quantile",
+    colourmap="afcharts_sequential",
+    label_format=",.0f",
+    sample_size=None,
+):
+    """
+    Bin continuous values into classes and give each class a colour and
+    legend label, for example to colour the areas of a choropleth.
+
+    Parameters
+    ----------
+    values : list, pandas.Series or numpy.ndarray
+        One-dimensional numbers. Missing values (NaN) are given class -1.
+
+    number_of_classes : int, optional
+        Number of classes. Defaults to 3, the number of colours in the
+        AF sequential palette.
+
+    method : string, optional
+        "quantile" (default) puts about the same number of values in each
+        class. "equal_interval" divides the range of the values into
+        classes of equal width. "jenks" finds natural breaks, which
+        minimise the spread of values within each class.
+
+    colourmap : string or sequence, optional
+        Name of an afcharts colour map, sampled at number_of_classes
+        evenly spaced points from its low to its high end, or a sequence
+        of one colour per class. Defaults to "afcharts_sequential", whose
+        three colours are the AF sequential palette, so high values are
+        dark.
+
+    label_format : string, optional
+        Format specification for the numbers in legend labels. Defaults
+        to ",.0f".
+
+    sample_size : int, optional
+        Jenks only. Number of values the breaks are computed from.
+        Defaults to default_jenks_sample_size. Pass 0 to use every value,
+        which is allowed for up to max_jenks_values distinct values.
+
+    Raises
+    ------
+    ValueError
+        If method is not recognised, number_of_classes is less than 1,
+        values are not one-dimensional or have no non-missing values,
+        colourmap has the wrong number of colours, or Jenks breaks would
+        be computed from more than max_jenks_values distinct values.
+
+    Returns
+    -------
+    Classification
+        Breaks, class of each value, and colours and labels of the
+        classes.
+
+    """
+    # Imported here as af_colourmaps itself depends on af_colours
+    from afcharts.af_colourmaps import get_af_colour_lut
+
+    if method not in CLASSIFICATION_METHODS:
+        raise ValueError(f"method must be one of {', '.join(CLASSIFICATION_METHODS)}, not {method}.")
+    if number_of_classes < 1:
+        raise ValueError("number_of_classes must be at least 1.")
+    numbers = np.asarray(values, dtype="float64")
+    if numbers.ndim != 1:
+        raise ValueError(f"values must be one-dimensional, not {numbers.ndim}-dimensional.")
+    missing = np.isnan(numbers)
+    finite = numbers[~missing]
+    if not len(finite):
+        raise ValueError("values must include at least one number.")
+
+    if isinstance(colourmap, str):
+        colours = rgb_array_to_hex(get_af_colour_lut(colourmap, n=max(number_of_classes, 2)))
+        colours = colours[-1:] if number_of_classes == 1 else colours
+    else:
+        colours = rgb_array_to_hex(colours_to_rgb_array(colourmap))
+        if len(colours) != number_of_classes:
+            raise ValueError(f"colourmap has {len(colours)} colours but there are {number_of_classes} classes.")
+
+    if method == "quantile":
+        breaks = np.quantile(finite, np.linspace(0, 1, number_of_classes + 1))
+    elif method == "equal_interval":
+        breaks = np.linspace(finite.min(), finite.max(), number_of_classes + 1)
+    else:
+        sample_size = default_jenks_sample_size if sample_size is None else sample_size
+        breaks = jenks_breaks(finite, number_of_classes, sample_size)
+
+    classes = np.searchsorted(breaks[1:-1], numbers, side="left")
+    classes[missing] = -1
+    counts = np.bincount(classes[~missing], minlength=number_of_classes)
+    labels = tuple(f"{low:{label_format}} to {high:{label_format}}" for low, high in itertools.pairwise(breaks))
+    return Classification(method, breaks, classes, tuple(colours.tolist()), labels, counts)
+
+
+def jenks_breaks(values, number_of_classes, sample_size=0):
+    """
+    Return the Jenks natural breaks of values: the class boundaries that
+    minimise the sum of squared deviations of values from their class
+    means.
+
+    Parameters
+    ----------
+    values : numpy.ndarray
+        One-dimensional numbers without missing values.
+
+    number_of_classes : int
+        Number of classes.
+
+    sample_size : int, optional
+        If more than this many values are given, the breaks are computed
+        from this many values at evenly spaced ranks. Defaults to 0, which
+        uses every value.
+
+    Raises
+    ------
+    ValueError
+        If the breaks would be computed from more than max_jenks_values
+        distinct values.
+
+    Returns
+    -------
+    numpy.ndarray
+        number_of_classes + 1 class boundaries, from the smallest to the
+        largest value. If there are fewer distinct values than classes,
+        the last boundaries repeat the largest value.
+
+    """
+    values = np.sort(np.asarray(values, dtype="float64"))
+    sample = values
+    if sample_size and len(values) > sample_size:
+        sample = values[np.linspace(0, len(values) - 1, sample_size).round().astype(np.intp)]
+
+    unique, counts = np.unique(sample, return_counts=True)
+    if len(unique) > max_jenks_values:
+        raise ValueError(
+            f"Jenks breaks can be computed from at most {max_jenks_values:,} distinct values, not {len(unique):,}. "
+            f"Pass a sample_size of at most {max_jenks_values:,}, such as {default_jenks_sample_size:,}."
+        )
+    ends = _fisher_class_ends(unique, counts, min(number_of_classes, len(unique)))
+    if sample is values:
+        breaks = np.concatenate([unique[:1], unique[ends - 1]])
+    else:
+        breaks = np.concatenate([values[:1], values[_refine_splits(values, unique, ends) - 1]])
+    return np.concatenate([breaks, np.repeat(breaks[-1:], number_of_classes + 1 - len(breaks))])
+
+
+def _fisher_class_ends(unique, counts, number_of_classes):
+    """
+    Return the index after the last distinct value in each class of the
+    optimal grouping, found by dynamic programming over weighted values.
+    The cost of ending class j at each value is the least cost of ending
+    class j - 1 at an earlier value, plus the sum of squared deviations of
+    the values between the two.
+    """
+    size = len(unique)
+    centred = unique - np.average(unique, weights=counts)
+    weights = np.concatenate([[0], np.cumsum(counts, dtype="float64")])
+    sums = np.concatenate([[0], np.cumsum(counts * centred)])
+    squares = np.concatenate([[0], np.cumsum(counts * centred**2)])
+
+    def deviation(start, end):
+        with np.errstate(divide="ignore", invalid="ignore"):
+            return squares[end] - squares[start] - (sums[end] - sums[start]) ** 2 / (weights[end] - weights[start])
+
+    cost = deviation(0, np.arange(size + 1))
+    previous_end = np.zeros((number_of_classes, size + 1), dtype=np.intp)
+    for klass in range(1, number_of_classes):
+        new_cost = np.full(size + 1, np.inf)
+        # The best end of the previous class never moves back as this class ends later
+        lowest_start = klass
+        block = max(1, _BLOCK_ELEMENTS // size)
+        for first in range(klass + 1, size + 1, block):
+            ends = np.arange(first, min(first + block, size + 1))
+            starts = np.arange(lowest_start, ends[-1])
+            total = cost[starts] + deviation(starts[None, :], ends[:, None])
+            total[starts[None, :] >= ends[:, None]] = np.inf
+            best = total.argmin(axis=1)
+            new_cost[ends] = total[np.arange(len(ends)), best]
+            previous_end[klass, ends] = starts[best]
+            lowest_start = starts[best[-1]]
+        cost = new_cost
+
+    class_ends = [size]
+    for klass in range(number_of_classes - 1, 0, -1):
+        class_ends.append(previous_end[klass, class_ends[-1]])
+    return np.array(class_ends[::-1], dtype=np.intp)
+
+
+def _refine_splits(values, unique, ends):
+    """
+    Move each split between classes found from a sample to its best place
+    among all the values between the sample values either side of it,
+    with the neighbouring splits fixed, and return the number of values
+    up to each split.
+    """
+    centred = values - values.mean()
+    sums = np.concatenate([[0], np.cumsum(centred)])
+    squares = np.concatenate([[0], np.cumsum(centred**2)])
+
+    def deviation(start, end):
+        return squares[end] - squares[start] - (sums[end] - sums[start]) ** 2 / (end - start)
+
+    splits = [0, *np.searchsorted(values, unique[ends[:-1] - 1], side="right"), len(values)]
+    for index in range(1, len(splits) - 1):
+        end = ends[index - 1]
+        low = np.searchsorted(values, unique[end - 2], side="right") if end >= 2 else 1
+        high = np.searchsorted(values, unique[end], side="left")
+        candidates = np.arange(max(low, splits[index - 1] + 1), min(high, splits[index + 1] - 1) + 1)
+        # A split must fall between two different values
+        candidates = candidates[values[candidates - 1] < values[candidates]]
+        cost = deviation(splits[index - 1], candidates) + deviation(candidates, splits[index + 1])
+        splits[index] = candidates[cost.argmin()]
+    return np.array(splits[1:], dtype=np.intp)
@@ -0,0 +1,446 @@
+# Accessibility audit of palettes and rendered charts
+# Simulates colour vision deficiency (CVD), measures how far apart colours are
+# with the CIEDE2000 colour difference, and checks WCAG contrast ratios. All
+# functions work on whole arrays, so a rendered chart can be audited in a few
+# tens of milliseconds.
+# CVD references: Machado, Oliveira and Fernandes (2009), "A Physiologically-
+#   based Model for Simulation of Color Vision Deficiency", full severity.
+# CIEDE2000 reference: Sharma, Wu and Dalal (2005), "The CIEDE2000
+#   Color-Difference Formula: Implementation Notes".
+# Contrast reference: https://www.w3.org/TR/WCAG21/#dfn-contrast-ratio
+
+import dataclasses
+
+import numpy as np
+
+from afcharts.af_colours import colours_to_rgb_array, linear_to_srgb, rgb_array_to_hex, srgb_to_linear
+
+CVD_TYPES = ("protan", "deutan", "tritan")
+
+# Linear RGB transforms for protanopia, deuteranopia and tritanopia
+_CVD_MATRICES = {
+    "protan": np.array(
+        [
+            [0.152286, 1.052583, -0.204868],
+            [0.114503, 0.786281, 0.099216],
+            [-0.003882, -0.048116, 1.051998],
+        ]
+    ),
+    "deutan": np.array(
+        [
+            [0.367322, 0.860646, -0.227968],
+            [0.280085, 0.672501, 0.047413],
+            [-0.011820, 0.042940, 0.968881],
+        ]
+    ),
+    "tritan": np.array(
+        [
+            [1.255528, -0.076749, -0.178779],
+            [-0.078411, 0.930809, 0.147602],
+            [0.004733, 0.691367, 0.303900],
+        ]
+    ),
+}
+
+# Linear sRGB to CIE XYZ, D65 white point
+_LINEAR_RGB_TO_XYZ = np.array(
+    [
+        [0.4124564, 0.3575761, 0.1804375],
+        [0.2126729, 0.7151522, 0.0721750],
+        [0.0193339, 0.1191920, 0.9503041],
+    ]
+)
+_D65_WHITE = np.array([0.95047, 1.0, 1.08883])
+
+# sRGB to linear for each 8-bit value, used for images
+_SRGB_TO_LINEAR_LUT = srgb_to_linear(np.arange(256) / 255)
+
+# Minimum colour difference between chart colours, a clear difference for
+# areas the size of lines and bars, and minimum contrast of a chart colour
+# against its background (WCAG 2.1 non-text contrast)
+default_min_delta_e = 5.0
+default_min_contrast = 3.0
+
+# Colours of the background, gridlines, axes and text of afcharts matplotlib
+# charts, left out when auditing a rendered chart
+_CHART_FURNITURE = ("#FFFFFF", "#CCCCCC", "#1A1A1A", "#000000")
+
+
+@dataclasses.dataclass(frozen=True)
+class PaletteAudit:
+    """
+    Accessibility measures for a set of chart colours.
+
+    Attributes
+    ----------
+    colours : tuple of string
+        Audited colours as hex codes.
+
+    delta_e : dict
+        Pairwise CIEDE2000 colour difference matrix of the colours as
+        seen with "normal" vision and with each of CVD_TYPES.
+
+    contrast : numpy.ndarray
+        WCAG contrast ratio of each colour (rows) against each
+        background (columns).
+
+    backgrounds : tuple of string
+        Background colours as hex codes.
+
+    issues : tuple of string
+        Description of each failed check. Empty if every check passed.
+
+    """
+
+    colours: tuple
+    delta_e: dict
+    contrast: np.ndarray
+    backgrounds: tuple
+    issues: tuple
+
+    @property
+    def passed(self):
+        return not self.issues
+
+    def min_delta_e(self):
+        """
+        Return the smallest difference between two colours for each vision type.
+        """
+        return {vision: _min_off_diagonal(matrix) for vision, matrix in self.delta_e.items()}
+
+
+def simulate_cvd(colours, cvd_type="deutan", severity=1.0):
+    """
+    Simulate how colours look with a colour vision deficiency.
+
+    Parameters
+    ----------
+    colours : list of string or numpy.ndarray
+        Colour strings, or an RGB or RGBA array with colour channels in
+        the last axis, such as an image of shape (height, width, 4).
+        Integer arrays are read as 0 to 255, float arrays as 0 to 1.
+
+    cvd_type : string, optional
+        "protan", "deutan" (default) or "tritan".
+
+    severity : float, optional
+        From 0 (normal vision) to 1 (default, dichromacy). Partial
+        severities blend linearly between the two.
+
+    Raises
+    ------
+    ValueError
+        If cvd_type is not recognised or severity is outside 0 to 1.
+
+    Returns
+    -------
+    numpy.ndarray
+        Simulated colours with the same shape as the input and the same
+        dtype, or uint8 RGB for colour strings. Alpha is unchanged.
+
+    """
+    if cvd_type not in CVD_TYPES:
+        raise ValueError(f"cvd_type must be one of {', '.join(CVD_TYPES)}, not {cvd_type}.")
+    if not 0 <= severity <= 1:
+        raise ValueError("severity must be between 0 and 1.")
+
+    rgb = _as_rgb_array(colours)
+    matrix = (1 - severity) * np.eye(3) + severity * _CVD_MATRICES[cvd_type]
+
+    if rgb.dtype.kind in "ui":
+        linear = _SRGB_TO_LINEAR_LUT.astype("float32")[rgb[..., :3]]
+        simulated = np.rint(linear_to_srgb(np.clip(linear @ matrix.T.astype("float32"), 0, 1)) * 255)
+    else:
+        linear = srgb_to_linear(rgb[..., :3])
+        simulated = np.clip(linear_to_srgb(np.clip(linear @ matrix.T, 0, 1)), 0, 1)
+
+    result = rgb.copy()
+    result[..., :3] = simulated
+    return result
+
+
+def delta_e_matrix(colours):
+    """
+    Return the CIEDE2000 colour difference between every pair of colours.
+    A difference of about 2 is just noticeable; chart colours that must
+    be told apart should differ by much more.
+
+    Parameters
+    ----------
+    colours : list of string or numpy.ndarray
+        Colour strings, or an (n, 3) RGB array.
+
+    Returns
+    -------
+    numpy.ndarray
+        Symmetric (n, n) float array with zeros on the diagonal.
+
+    """
+    lab = _rgb_to_lab(_as_rgb_array(colours)[..., :3])
+    return ciede2000(lab[:, None, :], lab[None, :, :])
+
+
+def contrast_ratio(colours, backgrounds):
+    """
+    Return the WCAG contrast ratio of each colour against each background.
+
+    Parameters
+    ----------
+    colours, backgrounds : list of string or numpy.ndarray
+        Colour strings, or RGB arrays.
+
+    Returns
+    -------
+    numpy.ndarray
+        (n_colours, n_backgrounds) array of ratios from 1 to 21.
+
+    """
+    foreground = _relative_luminance(_as_rgb_array(colours))[:, None]
+    background = _relative_luminance(_as_rgb_array(backgrounds))[None, :]
+    return (np.maximum(foreground, background) + 0.05) / (np.minimum(foreground, background) + 0.05)
+
+
+def audit_palette(colours, backgrounds=None, min_delta_e=None, min_contrast=None):
+    """
+    Check that chart colours can be told apart from each other with
+    normal vision and with each colour vision deficiency, and that they
+    stand out against the chart backgrounds.
+
+    Parameters
+    ----------
+    colours : list of string or numpy.ndarray
+        Chart colours, such as get_af_colours("categorical").
+
+    backgrounds : list of string, optional
+        Colours the chart colours are drawn against. Defaults to white
+        and af_chart_feature_colour, the colour of gridlines and axes.
+
+    min_delta_e : float, optional
+        Smallest CIEDE2000 difference allowed between two colours.
+        Defaults to default_min_delta_e.
+
+    min_contrast : float, optional
+        Smallest WCAG contrast ratio allowed against the first
+        background. Defaults to default_min_contrast, the WCAG 2.1
+        minimum for graphical objects. Contrast against the other
+        backgrounds is reported but not checked.
+
+    Returns
+    -------
+    PaletteAudit
+        Measures and failed checks.
+
+    """
+    if backgrounds is None:
+        from afcharts.pio_template import af_chart_feature_colour
+
+        backgrounds = ["#FFFFFF", af_chart_feature_colour]
+    min_delta_e = default_min_delta_e if min_delta_e is None else min_delta_e
+    min_contrast = default_min_contrast if min_contrast is None else min_contrast
+
+    rgb = _as_rgb_array(colours)[..., :3]
+    hex_colours = tuple(str(colour) for colour in rgb_array_to_hex(rgb))
+    hex_backgrounds = tuple(str(colour) for colour in rgb_array_to_hex(_as_rgb_array(backgrounds)[..., :3]))
+
+    delta_e = {"normal": delta_e_matrix(rgb)}
+    for cvd_type in CVD_TYPES:
+        delta_e[cvd_type] = delta_e_matrix(simulate_cvd(rgb, cvd_type))
+    contrast = contrast_ratio(rgb, backgrounds)
+
+    issues = []
+    for vision, matrix in delta_e.items():
+        first, second = np.nonzero(np.triu(matrix < min_delta_e, k=1))
+        for i, j in zip(first, second, strict=True):
+            issues.append(
+                f"{hex_colours[i]} and {hex_colours[j]} differ by {matrix[i, j]:.1f} with {vision} vision, "
+                f"less than {min_delta_e}."
+            )
+    for i in np.flatnonzero(contrast[:, 0] < min_contrast):
+        issues.append(
+            f"{hex_colours[i]} has contrast {contrast[i, 0]:.2f} against {hex_backgrounds[0]}, "
+            f"less than {min_contrast}."
+        )
+
+    return PaletteAudit(hex_colours, delta_e, contrast, hex_backgrounds, tuple(issues))
+
+
+def chart_colours(image, min_fraction=0.002, ignore=None, ignore_delta_e=3.0):
+    """
+    Return the colours covering a meaningful part of a rendered chart,
+    ignoring anti-aliased edge pixels, the background, gridlines, axes
+    and text.
+
+    Parameters
+    ----------
+    image : numpy.ndarray, str or Path
+        RGB or RGBA image array, or the path of a PNG file. Fully
+        transparent pixels are ignored.
+
+    min_fraction : float, optional
+        Smallest fraction of the pixels a colour must cover. Defaults to
+        0.002, so a colour needs 2,000 pixels of a 1000 x 1000 chart.
+
+    ignore : iterable of string, optional
+        Colours to leave out. Defaults to the background, gridline, axis
+        and text colours of afcharts charts, including
+        af_chart_feature_colour.
+
+    ignore_delta_e : float, optional
+        Colours within this CIEDE2000 difference of an ignored colour
+        are also left out. Defaults to 3.0.
+
+    Returns
+    -------
+    numpy.ndarray
+        (n, 3) uint8 RGB array of colours, most common first.
+
+    """
+    if not isinstance(image, np.ndarray):
+        import matplotlib.image
+
+        image = matplotlib.image.imread(image)
+    rgba = _as_rgb_array(image)
+    if rgba.dtype.kind == "f":
+        rgba = np.rint(rgba * 255).astype("uint8")
+
+    pixels = rgba.reshape(-1, rgba.shape[-1])
+    if pixels.shape[1] == 4:
+        pixels = pixels[pixels[:, 3] > 0]
+    packed = (pixels[:, 0].astype("uint32") << 16) | (pixels[:, 1].astype("uint32") << 8) | pixels[:, 2]
+
+    values, counts = np.unique(packed, return_counts=True)
+    keep = counts >= min_fraction * len(packed)
+    values, counts = values[keep], counts[keep]
+    colours = np.stack([(values >> 16) & 255, (values >> 8) & 255, values & 255], axis=-1).astype("uint8")
+
+    if ignore is None:
+        from afcharts.pio_template import af_chart_feature_colour
+
+        ignore = (*_CHART_FURNITURE, af_chart_feature_colour)
+    ignore = list(ignore)
+    if ignore and len(colours):
+        distances = ciede2000(_rgb_to_lab(colours)[:, None, :], _rgb_to_lab(colours_to_rgb_array(ignore))[None, :, :])
+        keep = distances.min(axis=1) >= ignore_delta_e
+        colours, counts = colours[keep], counts[keep]
+
+    return colours[np.argsort(-counts, kind="stable")]
+
+
+def audit_image(image, min_fraction=0.002, ignore=None, **kwargs):
+    """
+    Audit the colours of a rendered chart, see chart_colours() and
+    audit_palette().
+
+    Parameters
+    ----------
+    image : numpy.ndarray, str or Path
+        RGB or RGBA image array, or the path of a PNG file.
+
+    min_fraction : float, optional
+        Smallest fraction of the pixels a colour must cover to be
+        audited. Defaults to 0.002.
+
+    ignore : iterable of string, optional
+        Colours to leave out, see chart_colours().
+
+    **kwargs
+        Passed to audit_palette().
+
+    Returns
+    -------
+    PaletteAudit
+        Measures and failed checks for the chart's colours.
+
+    """
+    return audit_palette(chart_colours(image, min_fraction, ignore), **kwargs)
+
+
+def ciede2000(lab1, lab2):
+    """
+    Return the CIEDE2000 colour difference between CIELAB colours.
+
+    Parameters
+    ----------
+    lab1, lab2 : numpy.ndarray
+        CIELAB colours in the last axis. The arrays are broadcast
+        together.
+
+    Returns
+    -------
+    numpy.ndarray
+        Colour differences.
+
+    """
+    l1, a1, b1 = np.moveaxis(np.asarray(lab1, dtype="float64"), -1, 0)
+    l2, a2, b2 = np.moveaxis(np.asarray(lab2, dtype="float64"), -1, 0)
+
+    mean_c = (np.hypot(a1, b1) + np.hypot(a2, b2)) / 2
+    g = 0.5 * (1 - np.sqrt(mean_c**7 / (mean_c**7 + 25.0**7)))
+    a1, a2 = a1 * (1 + g), a2 * (1 + g)
+    c1, c2 = np.hypot(a1, b1), np.hypot(a2, b2)
+    h1 = np.degrees(np.arctan2(b1, a1)) % 360
+    h2 = np.degrees(np.arctan2(b2, a2)) % 360
+
+    delta_l = l2 - l1
+    delta_c = c2 - c1
+    hue_difference = h2 - h1
+    hue_difference = np.where(hue_difference > 180, hue_difference - 360, hue_difference)
+    hue_difference = np.where(hue_difference < -180, hue_difference + 360, hue_difference)
+    hue_difference = np.where(c1 * c2 == 0, 0, hue_difference)
+    delta_h = 2 * np.sqrt(c1 * c2) * np.sin(np.radians(hue_difference) / 2)
+
+    mean_l = (l1 + l2) / 2
+    mean_c = (c1 + c2) / 2
+    hue_sum = h1 + h2
+    mean_h = np.where(np.abs(h1 - h2) > 180, (hue_sum + 360) / 2, hue_sum / 2) % 360
+    mean_h = np.where(c1 * c2 == 0, hue_sum, mean_h)
+
+    t = (
+        1
+        - 0.17 * np.cos(np.radians(mean_h - 30))
+        + 0.24 * np.cos(np.radians(2 * mean_h))
+        + 0.32 * np.cos(np.radians(3 * mean_h + 6))
+        - 0.20 * np.cos(np.radians(4 * mean_h - 63))
+    )
+    s_l = 1 + 0.015 * (mean_l - 50) ** 2 / np.sqrt(20 + (mean_l - 50) ** 2)
+    s_c = 1 + 0.045 * mean_c
+    s_h = 1 + 0.015 * mean_c * t
+    r_t = (
+        -2 * np.sqrt(mean_c**7 / (mean_c**7 + 25.0**7)) * np.sin(np.radians(60 * np.exp(-(((mean_h - 275) / 25) ** 2))))
+    )
+
+    return np.sqrt(
+        (delta_l / s_l) ** 2 + (delta_c / s_c) ** 2 + (delta_h / s_h) ** 2 + r_t * (delta_c / s_c) * (delta_h / s_h)
+    )
+
+
+def _as_rgb_array(colours):
+    """
+    Return colour strings as a uint8 RGB array and other input as an array.
+    """
+    array = np.asarray(colours)
+    if array.dtype.kind in "USO":
+        return colours_to_rgb_array(array)
+    return array
+
+
+def _rgb_to_lab(rgb):
+    """
+    Convert sRGB (0 to 255 integers or 0 to 1 floats) to CIELAB.
+    """
+    rgb = rgb / 255 if rgb.dtype.kind in "ui" else rgb
+    xyz = (srgb_to_linear(rgb) @ _LINEAR_RGB_TO_XYZ.T) / _D65_WHITE
+    f = np.where(xyz > (6 / 29) ** 3, np.cbrt(xyz), xyz / (3 * (6 / 29) ** 2) + 4 / 29)
+    return np.stack([116 * f[..., 1] - 16, 500 * (f[..., 0] - f[..., 1]), 200 * (f[..., 1] - f[..., 2])], axis=-1)
+
+
+def _relative_luminance(rgb):
+    rgb = rgb[..., :3]
+    rgb = rgb / 255 if rgb.dtype.kind in "ui" else rgb
+    return srgb_to_linear(rgb) @ np.array([0.2126, 0.7152, 0.0722])
+
+
+def _min_off_diagonal(matrix):
+    if len(matrix) < 2:
+        return float("inf")
+    return float(matrix[~np.eye(len(matrix), dtype=bool)].min())
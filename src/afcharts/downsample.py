@@ -0,0 +1,203 @@
+# Shape-preserving downsampling for line charts
+# A chart is only a few hundred pixels wide, so long series can be reduced to
+# a few thousand points before they reach plotly or matplotlib without
+# visibly changing the line.
+# Largest-Triangle-Three-Buckets reference: Sveinn Steinarsson (2013),
+# "Downsampling Time Series for Visual Representation".
+
+import numpy as np
+
+DOWNSAMPLE_METHODS = ("lttb", "minmax")
+
+
+def downsample(data, n_out=2000, method="lttb"):
+    """
+    Reduce a series to about n_out points while keeping the shape of the
+    line. Data with n_out points or fewer is returned unchanged. Points
+    with missing y values are never selected.
+
+    Parameters
+    ----------
+    data : pandas.Series, pandas.DataFrame or tuple
+        A Series or DataFrame uses its index as x, which may be a
+        datetime index. For a DataFrame, the rows selected for any column
+        are kept, so every column keeps its shape. A tuple of (x, y)
+        arrays is also accepted.
+
+    n_out : int, optional
+        Target number of points per series. Defaults to 2000.
+
+    method : string, optional
+        "lttb" (default) for Largest-Triangle-Three-Buckets, or "minmax"
+        to keep the lowest and highest point in each of n_out / 2 equal
+        width x intervals.
+
+    Raises
+    ------
+    ValueError
+        If method is not recognised or n_out is less than 3.
+
+    Returns
+    -------
+    pandas.Series, pandas.DataFrame or tuple
+        The selected rows, in the same type as data.
+
+    """
+    if isinstance(data, tuple):
+        x, y = (np.asarray(values) for values in data)
+        indices = downsample_indices(x, y, n_out, method)
+        return x[indices], y[indices]
+
+    x = _index_to_numbers(data.index)
+    columns = [data] if data.ndim == 1 else [data[column] for column in data.columns]
+    indices = [downsample_indices(x, np.asarray(column, dtype="float64"), n_out, method) for column in columns]
+    return data.iloc[np.unique(np.concatenate(indices))]
+
+
+def downsample_indices(x, y, n_out=2000, method="lttb"):
+    """
+    Return the positions of the points to keep when downsampling a
+    series to about n_out points.
+
+    Parameters
+    ----------
+    x : numpy.ndarray
+        Numerical or datetime64 x values, in ascending order.
+
+    y : numpy.ndarray
+        Numerical y values.
+
+    n_out : int, optional
+        Target number of points. Defaults to 2000.
+
+    method : string, optional
+        "lttb" (default) or "minmax", see downsample().
+
+    Raises
+    ------
+    ValueError
+        If method is not recognised or n_out is less than 3.
+
+    Returns
+    -------
+    numpy.ndarray
+        Sorted integer positions into x and y.
+
+    """
+    if method not in DOWNSAMPLE_METHODS:
+        raise ValueError(f"method must be one of {', '.join(DOWNSAMPLE_METHODS)}, not {method}.")
+    if n_out < 3:
+        raise ValueError("n_out must be at least 3.")
+
+    x = _index_to_numbers(x)
+    y = np.asarray(y, dtype="float64")
+    positions = np.flatnonzero(~np.isnan(y))
+    if len(positions) <= n_out:
+        return positions
+
+    if method == "lttb":
+        selected = lttb_indices(x[positions], y[positions], n_out)
+    else:
+        selected = minmax_indices(x[positions], y[positions], n_out)
+    return positions[selected]
+
+
+def lttb_indices(x, y, n_out):
+    """
+    Select n_out points with Largest-Triangle-Three-Buckets. The first
+    and last points are always kept. The rest are split into n_out - 2
+    buckets, and from each bucket the point forming the largest triangle
+    with the previously selected point and the mean of the next bucket is
+    kept.
+
+    Parameters
+    ----------
+    x, y : numpy.ndarray
+        Float x and y values without missing values, x in ascending order.
+
+    n_out : int
+        Number of points to select, less than the number of points.
+
+    Returns
+    -------
+    numpy.ndarray
+        Sorted integer positions of the selected points.
+
+    """
+    n = len(x)
+    # Shift x to start at zero, so large values such as nanosecond timestamps keep their precision
+    x = x - x[0]
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.intp)
+
+    # Mean point of every bucket, used as the third vertex of the triangle for the bucket before
+    sizes = np.diff(edges)
+    mean_x = np.add.reduceat(x[: n - 1], edges[:-1]) / sizes
+    mean_y = np.add.reduceat(y[: n - 1], edges[:-1]) / sizes
+    mean_x = np.append(mean_x, x[-1])
+    mean_y = np.append(mean_y, y[-1])
+
+    selected = np.empty(n_out, dtype=np.intp)
+    selected[0] = 0
+    selected[-1] = n - 1
+    previous = 0
+    for bucket in range(n_out - 2):
+        start, stop = edges[bucket], edges[bucket + 1]
+        # Twice the triangle area; the constant factor does not change the arg max
+        areas = np.abs(
+            (x[previous] - mean_x[bucket + 1]) * (y[start:stop] - y[previous])
+            - (x[previous] - x[start:stop]) * (mean_y[bucket + 1] - y[previous])
+        )
+        previous = start + int(np.argmax(areas))
+        selected[bucket + 1] = previous
+    return selected
+
+
+def minmax_indices(x, y, n_out):
+    """
+    Select the lowest and highest point in each of n_out / 2 equal width
+    x intervals, plus the first and last points. This keeps the full
+    vertical envelope of the line at each pixel column.
+
+    Parameters
+    ----------
+    x, y : numpy.ndarray
+        Float x and y values without missing values, x in ascending order.
+
+    n_out : int
+        Target number of points to select.
+
+    Returns
+    -------
+    numpy.ndarray
+        Sorted integer positions of the selected points.
+
+    """
+    n_bins = max((n_out - 2) // 2, 1)
+    edges = np.linspace(x[0], x[-1], n_bins + 1)
+    starts = np.unique(np.searchsorted(x, edges[:-1], side="left"))
+    starts = starts[starts < len(x)]
+    bins = np.repeat(np.arange(len(starts)), np.diff(np.append(starts, len(x))))
+
+    lowest = np.minimum.reduceat(y, starts)
+    highest = np.maximum.reduceat(y, starts)
+    # The first point in each bin equal to its lowest and highest values
+    _, first_low = np.unique(bins[y == lowest[bins]], return_index=True)
+    _, first_high = np.unique(bins[y == highest[bins]], return_index=True)
+    low_positions = np.flatnonzero(y == lowest[bins])[first_low]
+    high_positions = np.flatnonzero(y == highest[bins])[first_high]
+
+    return np.unique(np.concatenate([[0, len(x) - 1], low_positions, high_positions]))
+
+
+def _index_to_numbers(index):
+    """
+    Return x values as a float array, converting datetimes to nanoseconds.
+    """
+    if hasattr(index, "asi8") and index.asi8 is not None:
+        # pandas datetime index, including timezone aware indexes
+        return index.asi8.astype("float64")
+
+    values = np.asarray(index)
+    if values.dtype.kind in "mM":
+        values = values.astype("datetime64[ns]" if values.dtype.kind == "M" else "timedelta64[ns]").view("int64")
+    return values.astype("float64")
@@ -0,0 +1,379 @@
+# Parallel batch export of afcharts styled charts
+# Charts are built and written on a pool of worker processes. Each worker
+# imports plotly and matplotlib, registers the afcharts template and applies
+# afcharts.mplstyle once when it starts, rather than once per chart.
+
+import dataclasses
+import os
+import time
+import traceback
+from collections.abc import Callable, Iterable, Iterator, Mapping
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
+from typing import Any
+
+from afcharts.instrument import forward_events, is_recording, record_stages, stage
+
+
+@dataclasses.dataclass(frozen=True)
+class ExportJob:
+    """
+    A chart to build and write to disk.
+
+    Either `build` or `figure` must be given. Building charts inside the
+    workers with `build` avoids sending large figures between processes.
+
+    Attributes
+    ----------
+    path : str or Path
+        Output file. The format is taken from the suffix, for example
+        ".png", ".svg", ".pdf", or ".html" and ".json" for plotly figures.
+
+    build : callable, optional
+        Module-level function returning a plotly or matplotlib figure.
+        It must be importable by the worker processes.
+
+    args, kwargs : tuple and mapping, optional
+        Arguments passed to `build`.
+
+    figure : plotly.graph_objects.Figure, dict or matplotlib.figure.Figure, optional
+        A figure that has already been built.
+
+    write_kwargs : mapping, optional
+        Extra arguments for `write_image`, `write_html` or `savefig`.
+
+    cache_key : object, optional
+        Value identifying the chart in a RenderCache, used instead of
+        hashing the figure's data and layout. With a cache_key, `build`
+        is only called when the chart is not in the cache. Needed to
+        cache a matplotlib figure, which cannot be hashed by content.
+
+    """
+
+    path: str | os.PathLike
+    build: Callable[..., Any] | None = None
+    args: tuple = ()
+    kwargs: Mapping[str, Any] = dataclasses.field(default_factory=dict)
+    figure: Any = None
+    write_kwargs: Mapping[str, Any] = dataclasses.field(default_factory=dict)
+    cache_key: Any = None
+
+
+@dataclasses.dataclass(frozen=True)
+class ExportResult:
+    """
+    Outcome of an ExportJob.
+
+    Attributes
+    ----------
+    path : str
+        Output file of the job.
+
+    error : string or NoneType
+        Formatted traceback if the job failed, otherwise None.
+
+    elapsed : float
+        Seconds spent building and writing the chart in the worker.
+
+    cached : bool
+        True if the chart was copied from a RenderCache instead of being
+        rendered.
+
+    events : tuple of afcharts.instrument.StageEvent
+        Timings of the stages of the job, when stages were being
+        recorded.
+
+    """
+
+    path: str
+    error: str | None = None
+    elapsed: float = 0.0
+    cached: bool = False
+    events: tuple = ()
+
+    @property
+    def ok(self):
+        return self.error is None
+
+
+def export_charts(
+    jobs: Iterable[ExportJob],
+    max_workers: int | None = None,
+    max_pending: int | None = None,
+    mp_context=None,
+    cache=None,
+) -> Iterator[ExportResult]:
+    """
+    Build and write charts on a pool of worker processes, yielding a
+    result for each job as soon as it finishes.
+
+    Jobs are read from the iterable lazily and at most max_pending jobs
+    are in flight at once, so a generator of thousands of jobs is never
+    held in memory. A failing job does not stop the run; its result
+    holds the traceback instead.
+
+    Parameters
+    ----------
+    jobs : iterable of ExportJob
+        Charts to export. May be a generator.
+
+    max_workers : int, optional
+        Number of worker processes. Defaults to the number of CPUs.
+
+    max_pending : int, optional
+        Maximum number of jobs submitted but not yet finished. Defaults
+        to twice the number of workers.
+
+    mp_context : multiprocessing context, optional
+        Context used to start the workers, for example
+        `multiprocessing.get_context("spawn")`.
+
+    cache : afcharts.render_cache.RenderCache, optional
+        Cache of rendered charts. Jobs whose figure content and output
+        format match a cached chart are copied from the cache instead of
+        being rendered. Build jobs are built first so their figure can be
+        hashed, unless they have a cache_key. The cache statistics are
+        updated as results arrive and the cache is trimmed to its size
+        limit as it grows.
+
+    When called inside afcharts.instrument.record_stages(), the stages
+    of every job are timed in the workers and passed to the recorder as
+    each result arrives.
+
+    Returns
+    -------
+    iterator of ExportResult
+        Results in the order the jobs finish.
+
+    """
+    max_workers = max_workers or os.cpu_count() or 1
+    max_pending = max_pending or 2 * max_workers
+    record = is_recording()
+
+    with ProcessPoolExecutor(max_workers, mp_context=mp_context, initializer=initialise_worker) as executor:
+        pending: dict[Any, ExportJob] = {}
+        for job in jobs:
+            if len(pending) >= max_pending:
+                yield from _record(_collect(pending, return_when=FIRST_COMPLETED), cache)
+            try:
+                future = executor.submit(run_export_job, job, cache, record)
+            except BrokenProcessPool as error:
+                # A worker process died, so the pool takes no more jobs. The job is
+                # reported as failed by _collect, like the jobs that were running.
+                future = Future()
+                future.set_exception(error)
+            pending[future] = job
+        while pending:
+            yield from _record(_collect(pending, return_when=FIRST_COMPLETED), cache)
+
+    if cache is not None:
+        cache.evict()
+
+
+def initialise_worker():
+    """
+    Prepare a worker process for rendering afcharts charts: select the
+    non-interactive Agg backend, register the afcharts plotly template
+    as the default and apply afcharts.mplstyle.
+    """
+    import matplotlib
+
+    matplotlib.use("Agg")
+
+    import matplotlib.style
+
+    from afcharts.mpl_style import style_name
+    from afcharts.pio_template import pio
+
+    pio.templates.default = "afcharts"
+    register_afcharts_names()
+    matplotlib.style.use(style_name)
+
+
+def register_afcharts_names():
+    """
+    Register the afcharts colour maps and matplotlib styles by name,
+    without changing the backend, the default template or rcParams. Used
+    where charts render in a process whose settings belong to someone
+    else, such as the threads of AsyncExporter(executor="thread").
+    """
+    from afcharts.af_colourmaps import register_af_cmaps
+    from afcharts.mpl_style import register_afcharts_style
+
+    register_afcharts_style()
+    register_af_cmaps()
+
+
+def run_export_job(job: ExportJob, cache=None, record=False) -> ExportResult:
+    """
+    Build and write the chart for a single job, capturing any error.
+
+    Parameters
+    ----------
+    job : ExportJob
+        The chart to export.
+
+    cache : afcharts.render_cache.RenderCache, optional
+        If given, the chart is copied from the cache when it is already
+        there, and added to the cache after it is rendered.
+
+    record : bool, optional
+        If True, the timings of each stage of the job are returned in
+        the result's events. Defaults to False.
+
+    Returns
+    -------
+    ExportResult
+        Result of the job.
+
+    """
+    if record:
+        with record_stages() as events:
+            result = run_export_job(job, cache)
+        return dataclasses.replace(result, events=tuple(events))
+
+    start = time.perf_counter()
+    try:
+        with stage("export", chart=str(job.path)):
+            cached = _export(job, cache)
+    except Exception:
+        return ExportResult(str(job.path), traceback.format_exc(), time.perf_counter() - start)
+    return ExportResult(str(job.path), None, time.perf_counter() - start, cached)
+
+
+def _export(job, cache):
+    """
+    Export a job, returning True if it was copied from the cache.
+    """
+    if job.build is None and job.figure is None:
+        raise ValueError("ExportJob needs either build or figure.")
+
+    figure = job.figure
+    if job.build is not None and (cache is None or job.cache_key is None):
+        # Built before the cache lookup, so the key covers what the function draws now
+        figure = _build(job)
+
+    key = None
+    if cache is not None:
+        with stage("cache_lookup"):
+            content = _cache_content(job, figure)
+            if content is not None:
+                key = cache.key(content, Path(job.path).suffix)
+                Path(job.path).parent.mkdir(parents=True, exist_ok=True)
+                if cache.restore(key, job.path):
+                    return True
+
+    if figure is None:
+        figure = _build(job)
+    with stage("write"):
+        write_figure(figure, job.path, **job.write_kwargs)
+    if key is not None:
+        with stage("cache_store"):
+            cache.store(key, job.path)
+    return False
+
+
+def _build(job):
+    with stage("build"):
+        return job.build(*job.args, **job.kwargs)
+
+
+def write_figure(figure, path, **kwargs):
+    """
+    Write a plotly or matplotlib figure to path, creating the parent
+    directory if needed. Matplotlib figures created through pyplot are
+    closed afterwards so their memory is released.
+
+    Parameters
+    ----------
+    figure : plotly.graph_objects.Figure, dict or matplotlib.figure.Figure
+        Figure to write.
+
+    path : str or Path
+        Output file. The format is taken from the suffix.
+
+    **kwargs
+        Passed to `write_image`, `write_html`, `write_json` or `savefig`.
+
+    Raises
+    ------
+    TypeError
+        If figure is not a plotly or matplotlib figure.
+
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+
+    if hasattr(figure, "savefig"):
+        try:
+            figure.savefig(path, **kwargs)
+        finally:
+            if getattr(figure.canvas, "manager", None) is not None:
+                import matplotlib.pyplot as plt
+
+                plt.close(figure)
+        return
+
+    if isinstance(figure, dict) or hasattr(figure, "to_plotly_json"):
+        import plotly.io as pio
+
+        if path.suffix == ".html":
+            pio.write_html(figure, path, **kwargs)
+        elif path.suffix == ".json":
+            pio.write_json(figure, path, **kwargs)
+        else:
+            pio.write_image(figure, path, **kwargs)
+        return
+
+    raise TypeError(f"figure must be a plotly or matplotlib figure, not {type(figure).__name__}.")
+
+
+def _cache_content(job, figure):
+    """
+    Return what identifies the output of a job in a RenderCache, or None
+    if a built figure cannot be cached.
+    """
+    if job.cache_key is not None:
+        content = job.cache_key
+    elif hasattr(figure, "savefig"):
+        if job.build is not None:
+            # Rendered every time, as a matplotlib figure cannot be hashed by content
+            return None
+        raise TypeError("Matplotlib figures cannot be hashed by content; set ExportJob.cache_key to cache them.")
+    else:
+        content = figure
+    return (content, job.write_kwargs)
+
+
+def _record(results, cache, evict_every=64):
+    """
+    Pass on recorded stages and count cache hits and misses as results
+    arrive, trimming the cache after every evict_every newly rendered
+    charts.
+    """
+    for result in results:
+        forward_events(result.events)
+        if cache is not None and result.ok:
+            if result.cached:
+                cache.stats.hits += 1
+            else:
+                cache.stats.misses += 1
+                if cache.stats.misses % evict_every == 0:
+                    cache.evict()
+        yield result
+
+
+def _collect(pending, return_when):
+    """
+    Wait for pending jobs and yield the results of those that finished.
+    """
+    done, _ = wait(pending, return_when=return_when)
+    for future in done:
+        job = pending.pop(future)
+        try:
+            yield future.result()
+        except Exception:
+            # Errors outside the job itself, such as a job that cannot be pickled
+            # or a worker process that died
+            yield ExportResult(str(job.path), traceback.format_exc())
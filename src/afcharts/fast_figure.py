@@ -0,0 +1,138 @@
+# Fast construction of afcharts styled plotly figures as plain dicts
+# go.Figure validates every property and deep-copies the template each time a
+# figure is built. Here the afcharts template is validated and converted to
+# plain dicts once, then merged into each figure the way plotly.js applies a
+# template, so building a figure costs little more than copying a dict.
+
+import functools
+import re
+
+# Layout keys such as "xaxis2" take their defaults from the template's "xaxis"
+_NUMBERED_KEY = re.compile(r"^([a-z]+?)(\d+)$")
+
+# Template layout keys only used to style items such as annotations
+_ITEM_DEFAULTS_SUFFIX = "defaults"
+
+
+def build_figure_dict(data=(), layout=None, template="afcharts"):
+    """
+    Build a plotly figure as a plain dict with an afcharts template
+    baked in, skipping plotly's property validation.
+
+    The template's layout is merged under layout, including extra axes
+    such as "xaxis2" and items such as annotations, and the template's
+    trace styles are merged under each trace, cycling through the styles
+    for each trace type as plotly.js does. The result renders the same
+    as a go.Figure using the template and can be passed to Dash,
+    `plotly.io` functions or `go.Figure()`.
+
+    Parameters
+    ----------
+    data : iterable of dict, optional
+        Trace dicts, such as {"type": "bar", "x": x, "y": y}. Traces
+        without a "type" are scatter traces.
+
+    layout : dict, optional
+        Layout properties as nested dicts. Plotly's underscore shorthand,
+        such as "xaxis_title", is not expanded. A string title is turned
+        into {"text": title}.
+
+    template : string, optional
+        Name of a registered plotly template. Defaults to "afcharts".
+
+    Returns
+    -------
+    dict
+        Figure dict with "data" and "layout" keys. Property values are
+        not validated, so mistakes only show up when the figure is drawn.
+
+    """
+    layout_defaults, item_defaults, trace_defaults = _baked_template(template)
+    layout = layout or {}
+
+    traces = []
+    type_counts: dict[str, int] = {}
+    for trace in data:
+        trace_type = trace.get("type", "scatter")
+        styles = trace_defaults.get(trace_type)
+        if styles:
+            index = type_counts.get(trace_type, 0)
+            type_counts[trace_type] = index + 1
+            traces.append(_merge(styles[index % len(styles)], trace))
+        else:
+            traces.append(_merge({}, trace))
+
+    merged_layout = _merge(layout_defaults, layout)
+    for key, value in layout.items():
+        match = _NUMBERED_KEY.match(key)
+        if match and isinstance(value, dict) and isinstance(layout_defaults.get(match[1]), dict):
+            merged_layout[key] = _merge(layout_defaults[match[1]], value)
+        item_style = item_defaults.get(key[:-1] + _ITEM_DEFAULTS_SUFFIX)
+        if isinstance(value, (list, tuple)) and item_style is not None:
+            merged_layout[key] = [_merge(item_style, item) for item in value]
+
+    # Axes only referred to by traces are created by plotly.js with the template's axis style
+    for trace in traces:
+        for axis in ("xaxis", "yaxis"):
+            reference = trace.get(axis)
+            if isinstance(reference, str) and len(reference) > 1:
+                name = axis + reference[1:]
+                if name not in merged_layout and isinstance(layout_defaults.get(axis), dict):
+                    merged_layout[name] = _merge(layout_defaults[axis], {})
+
+    # An explicit empty template stops plotly.py applying its default template to the dict
+    merged_layout.setdefault("template", {})
+    return {"data": traces, "layout": merged_layout}
+
+
+@functools.cache
+def _baked_template(name):
+    """
+    Return a registered template's layout, layout item styles (such as
+    "annotationdefaults") and trace styles as plain dicts, validated by
+    plotly once. Lists are frozen into tuples, so figures can share them
+    safely.
+    """
+    import plotly.io as pio
+
+    import afcharts.pio_template  # noqa: F401  Registers the afcharts templates
+
+    template = pio.templates[name].to_plotly_json()
+    layout = {
+        key: _freeze(value)
+        for key, value in template.get("layout", {}).items()
+        if not key.endswith(_ITEM_DEFAULTS_SUFFIX)
+    }
+    item_defaults = {
+        key: _freeze(value) for key, value in template.get("layout", {}).items() if key.endswith(_ITEM_DEFAULTS_SUFFIX)
+    }
+    traces = {
+        trace_type: tuple(_freeze(style) for style in styles) for trace_type, styles in template.get("data", {}).items()
+    }
+    return layout, item_defaults, traces
+
+
+def _freeze(value):
+    if isinstance(value, dict):
+        return {key: _freeze(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return tuple(_freeze(item) for item in value)
+    return value
+
+
+def _merge(defaults, overrides):
+    """
+    Return defaults with overrides merged in. Nested dicts are merged and
+    copied, so the result never shares a dict with defaults; other values
+    are used as they are.
+    """
+    merged = {}
+    for key, value in defaults.items():
+        if key not in overrides:
+            merged[key] = _merge(value, {}) if isinstance(value, dict) else value
+    for key, value in overrides.items():
+        if key == "title" and isinstance(value, str):
+            value = {"text": value}
+        default = defaults.get(key)
+        merged[key] = _merge(default, value) if isinstance(default, dict) and isinstance(value, dict) else value
+    return merged
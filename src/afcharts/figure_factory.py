@@ -0,0 +1,246 @@
+# Memory-bounded rendering of many afcharts matplotlib charts without pyplot
+# pyplot keeps every figure it creates until it is closed, and styling through
+# `plt.style.use()` reapplies the style file each time, so a worker rendering
+# charts through pyplot grows for as long as it runs. Here figures are built
+# directly on Agg canvases with the pre-validated afcharts rcParams. Canvases,
+# and the Agg render buffer each one keeps, are pooled by figure size and
+# dpi, so charts of the same size draw into the same buffer. Figures built by
+# the factory are cleared and detached from their canvas at the end of their
+# block. Figures built elsewhere only borrow a pooled canvas while they are
+# saved, and are otherwise left as they were.
+
+import collections
+import contextlib
+import io
+import threading
+from pathlib import Path
+
+from afcharts.mpl_style import afcharts_style
+
+# Number of idle canvases kept for reuse by default. Each holds a render buffer
+# of 4 bytes per pixel, about 1.2 MB for a 640 x 480 figure.
+default_max_canvases = 8
+
+
+class FigureFactory:
+    """
+    Builds and saves afcharts styled matplotlib figures without pyplot,
+    keeping memory flat over any number of charts. Figures are drawn on
+    pooled Agg canvases, so charts of the same size and dpi reuse one
+    render buffer, and each figure is cleared at the end of its block.
+
+    Build a figure in a block, saving it inside the block:
+
+        factory = FigureFactory()
+        with factory.figure(size=(8, 5)) as fig:
+            ax = fig.add_subplot()
+            ax.plot(x, y)
+            png = factory.render(fig)
+
+    or save a figure built elsewhere, for example by line_chart(), which
+    borrows a pooled canvas while it is saved but is not cleared:
+
+        factory.save(line_chart(frame, backend="matplotlib"), "chart.png")
+
+    A factory may be shared by threads. Building and saving hold
+    afcharts.mpl_style.rc_params_lock, as afcharts_style() does, so
+    threads take turns.
+
+    Parameters
+    ----------
+    max_canvases : int, optional
+        Largest number of idle canvases kept for reuse. Defaults to
+        default_max_canvases.
+
+    Raises
+    ------
+    ValueError
+        If max_canvases is negative.
+
+    """
+
+    def __init__(self, max_canvases=default_max_canvases):
+        if max_canvases < 0:
+            raise ValueError("max_canvases must not be negative.")
+        self.max_canvases = max_canvases
+        self.canvases_created = 0
+        self._idle: collections.OrderedDict = collections.OrderedDict()
+        self._idle_count = 0
+        self._active: dict = {}
+        self._lock = threading.Lock()
+
+    @contextlib.contextmanager
+    def figure(self, size=None, dpi=None, **kwargs):
+        """
+        Create a figure in the afcharts style for the length of a block.
+        The style is applied for the whole block, so create the axes and
+        artists and save the figure inside it. At the end of the block
+        the figure is cleared and its canvas is returned to the pool.
+
+        Parameters
+        ----------
+        size : tuple of float, optional
+            Width and height in inches. Defaults to the afcharts figure
+            size.
+
+        dpi : float, optional
+            Figure dpi. Defaults to the afcharts style's.
+
+        **kwargs
+            Passed to `matplotlib.figure.Figure`, for example layout.
+
+        Yields
+        ------
+        matplotlib.figure.Figure
+            The figure, drawn on a pooled Agg canvas.
+
+        """
+        from matplotlib.figure import Figure
+
+        with afcharts_style():
+            fig = Figure(figsize=size, dpi=dpi, **kwargs)
+            canvas = self._attach(fig)
+            self._active[id(fig)] = canvas
+            try:
+                yield fig
+            finally:
+                del self._active[id(fig)]
+                self._release(fig, canvas)
+
+    def render(self, fig, format="png", **kwargs):
+        """
+        Render a figure to bytes in the afcharts style.
+
+        A figure from figure() can be rendered any number of times inside
+        its block. Any other figure is drawn on a pooled canvas and then
+        given back its own canvas, unchanged, so it stays in memory for
+        as long as the caller keeps it.
+
+        Parameters
+        ----------
+        fig : matplotlib.figure.Figure
+            Figure to render.
+
+        format : string, optional
+            Output format, such as "png" (default), "svg" or "pdf".
+
+        **kwargs
+            Passed to `savefig`.
+
+        Returns
+        -------
+        bytes
+            The rendered chart.
+
+        """
+        buffer = io.BytesIO()
+        self._save(fig, buffer, format=format, **kwargs)
+        return buffer.getvalue()
+
+    def save(self, fig, path, **kwargs):
+        """
+        Save a figure to a file in the afcharts style, creating the parent
+        directory if needed. Figures built elsewhere are left unchanged, as
+        for render().
+
+        Parameters
+        ----------
+        fig : matplotlib.figure.Figure
+            Figure to save.
+
+        path : str or Path
+            Output file. The format is taken from the suffix.
+
+        **kwargs
+            Passed to `savefig`.
+
+        """
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._save(fig, path, **kwargs)
+
+    def clear(self):
+        """
+        Drop the idle canvases and their render buffers.
+        """
+        with self._lock:
+            self._idle.clear()
+            self._idle_count = 0
+
+    def _save(self, fig, target, **kwargs):
+        canvas = self._active.get(id(fig))
+        if canvas is not None and canvas.figure is fig:
+            with afcharts_style():
+                fig.savefig(target, **kwargs)
+            return
+
+        key = _canvas_key(fig)
+        own_canvas = fig.canvas
+        with afcharts_style():
+            canvas = self._attach(fig)
+            try:
+                fig.savefig(target, **kwargs)
+            finally:
+                fig.set_canvas(own_canvas)
+                self._return_canvas(key, canvas)
+
+    def _attach(self, fig):
+        """
+        Draw a figure on an idle canvas of its size and dpi, or a new one.
+        """
+        from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+        key = _canvas_key(fig)
+        with self._lock:
+            canvases = self._idle.get(key)
+            canvas = canvases.pop() if canvases else None
+            if canvas is not None:
+                self._idle_count -= 1
+                if not canvases:
+                    del self._idle[key]
+            else:
+                self.canvases_created += 1
+
+        if canvas is None:
+            return FigureCanvasAgg(fig)
+        fig.set_canvas(canvas)
+        canvas.figure = fig
+        return canvas
+
+    def _release(self, fig, canvas):
+        """
+        Clear a figure, so its artists and data are freed, and return its
+        canvas to the pool.
+        """
+        from matplotlib.backend_bases import FigureCanvasBase
+
+        key = _canvas_key(fig)
+        fig.clear()
+        # Give the figure a canvas of its own, so it cannot draw on a canvas in use by another figure
+        FigureCanvasBase(fig)
+        self._return_canvas(key, canvas)
+
+    def _return_canvas(self, key, canvas):
+        """
+        Put a canvas back in the pool, dropping the least recently used
+        canvases beyond max_canvases.
+        """
+        canvas.figure = None
+        if self.max_canvases == 0:
+            return
+
+        with self._lock:
+            self._idle.setdefault(key, []).append(canvas)
+            self._idle.move_to_end(key)
+            self._idle_count += 1
+            while self._idle_count > self.max_canvases:
+                oldest_key, canvases = next(iter(self._idle.items()))
+                canvases.pop(0)
+                self._idle_count -= 1
+                if not canvases:
+                    del self._idle[oldest_key]
+
+
+def _canvas_key(fig):
+    width, height = fig.get_size_inches()
+    return (float(width), float(height), float(fig.dpi))
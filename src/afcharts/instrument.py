@@ -0,0 +1,201 @@
+# Opt-in timing of the stages of building and exporting afcharts charts
+# afcharts wraps its slow steps in stage() blocks. They record nothing unless
+# the caller is inside record_stages(), so the cost when recording is off is
+# a single context variable lookup.
+#
+# Stages recorded by afcharts:
+#   palette_load    reading the palette config from disk
+#   template_build  building an afcharts plotly template
+#   template_apply  choosing and applying a plotly template to a figure
+#   template_merge  looking up named plotly templates, merging those joined by "+"
+#   layout          setting titles, sizes and fixed margins on a plotly figure
+#   downsample      downsampling data for a chart helper
+#   aggregate       binning points for a chart helper
+#   figure_build    creating the figure and traces in a chart helper
+#   export          a whole ExportJob, with the stages below inside it
+#   cache_lookup    hashing a chart and checking the render cache
+#   build           calling the build function of an ExportJob
+#   write           rendering and writing the figure to disk
+#   cache_store     copying a rendered chart into the render cache
+
+import contextlib
+import dataclasses
+import sys
+import time
+from contextvars import ContextVar
+
+_sink: ContextVar = ContextVar("afcharts_stage_sink", default=None)
+_current_stage: ContextVar = ContextVar("afcharts_current_stage", default=None)
+_not_recording = contextlib.nullcontext()
+
+
+@dataclasses.dataclass(frozen=True)
+class StageEvent:
+    """
+    Measurements of one stage of building or exporting a chart.
+
+    Attributes
+    ----------
+    stage : string
+        Name of the stage, for example "write".
+
+    wall : float
+        Elapsed seconds.
+
+    cpu : float
+        CPU seconds used by the thread that ran the stage.
+
+    allocated_blocks : int
+        Net change in the number of memory blocks allocated by Python
+        during the stage. Memory allocated outside Python, for example
+        by the Agg renderer, is not counted.
+
+    parent : string or NoneType
+        Name of the stage this stage ran inside, if any.
+
+    chart : string or NoneType
+        Label of the chart, such as the output path of an ExportJob.
+        Inherited from the enclosing stage when not given.
+
+    failed : bool
+        True if the stage raised an exception.
+
+    """
+
+    stage: str
+    wall: float
+    cpu: float
+    allocated_blocks: int
+    parent: str | None = None
+    chart: str | None = None
+    failed: bool = False
+
+
+class _Stage:
+    __slots__ = ("name", "chart", "sink", "parent", "token", "start_wall", "start_cpu", "start_blocks")
+
+    def __init__(self, name, chart, sink):
+        self.name = name
+        self.chart = chart
+        self.sink = sink
+
+    def __enter__(self):
+        parent = _current_stage.get()
+        self.parent = None if parent is None else parent.name
+        if self.chart is None and parent is not None:
+            self.chart = parent.chart
+        self.token = _current_stage.set(self)
+        self.start_blocks = sys.getallocatedblocks()
+        self.start_cpu = time.thread_time()
+        self.start_wall = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        wall = time.perf_counter() - self.start_wall
+        cpu = time.thread_time() - self.start_cpu
+        blocks = sys.getallocatedblocks() - self.start_blocks
+        _current_stage.reset(self.token)
+        self.sink(StageEvent(self.name, wall, cpu, blocks, self.parent, self.chart, exc_type is not None))
+        return False
+
+
+def stage(name, chart=None):
+    """
+    Return a context manager measuring a stage of chart building, or a
+    do-nothing context manager when no recorder is active.
+
+    Parameters
+    ----------
+    name : string
+        Name of the stage.
+
+    chart : string, optional
+        Label of the chart the stage belongs to.
+
+    Returns
+    -------
+    context manager
+        Emits a StageEvent to the active recorder when the block exits.
+
+    """
+    sink = _sink.get()
+    if sink is None:
+        return _not_recording
+    return _Stage(name, chart, sink)
+
+
+@contextlib.contextmanager
+def record_stages(callback=None):
+    """
+    Record a StageEvent for every afcharts stage run inside the block,
+    including stages run by export_charts() in worker processes.
+
+    Parameters
+    ----------
+    callback : callable, optional
+        Called with each StageEvent as it is recorded. Use this to
+        aggregate events from a long run without keeping them all in
+        memory. If not given, the events are collected in a list.
+
+    Yields
+    ------
+    list of StageEvent
+        The recorded events, or an empty list when callback is given.
+
+    """
+    events: list[StageEvent] = []
+    token = _sink.set(callback or events.append)
+    try:
+        yield events
+    finally:
+        _sink.reset(token)
+
+
+def is_recording():
+    """
+    Return True if stages are being recorded in the current context.
+    """
+    return _sink.get() is not None
+
+
+def forward_events(events):
+    """
+    Pass events recorded elsewhere, such as in a worker process, to the
+    active recorder. Does nothing when no recorder is active.
+
+    Parameters
+    ----------
+    events : iterable of StageEvent
+        Events to pass on.
+
+    """
+    sink = _sink.get()
+    if sink is not None:
+        for event in events:
+            sink(event)
+
+
+def summarise(events):
+    """
+    Total the events for each stage.
+
+    Parameters
+    ----------
+    events : iterable of StageEvent
+        Events from record_stages().
+
+    Returns
+    -------
+    dict
+        For each stage name, a dict with the number of events ("count")
+        and the total "wall", "cpu" and "allocated_blocks".
+
+    """
+    totals: dict[str, dict] = {}
+    for event in events:
+        total = totals.setdefault(event.stage, {"count": 0, "wall": 0.0, "cpu": 0.0, "allocated_blocks": 0})
+        total["count"] += 1
+        total["wall"] += event.wall
+        total["cpu"] += event.cpu
+        total["allocated_blocks"] += event.allocated_blocks
+    return totals
@@ -0,0 +1,414 @@
+# Fixed margins for afcharts plotly figures, computed in Python
+# The afcharts template turns on `automargin` for both axes, so plotly.js
+# measures the tick labels in the browser and lays the chart out again until
+# the margins fit them. On pages with many charts these passes take seconds.
+# Here the tick labels plotly.js will draw are predicted from the data, their
+# size is estimated with built-in font metrics, and the figure is sent with
+# fixed margins and `automargin` off. Figures whose labels cannot be
+# predicted this way raise UnsupportedFigure and keep `automargin`.
+# Tick placement follows plotly.js autoTicks() and autoTickRound():
+# https://github.com/plotly/plotly.js/blob/master/src/plots/cartesian/axes.js
+
+import datetime
+import functools
+import math
+
+import numpy as np
+
+from afcharts.instrument import stage
+
+# Advance widths of ASCII characters 32 to 126 in Helvetica, in 1/1000 em,
+# from the Adobe font metrics. Arial, which browsers use for "sans-serif" on
+# most systems, has the same widths.
+_ASCII_WIDTHS = (
+    (278, 278, 355, 556, 556, 889, 667, 191, 333, 333, 389, 584, 278, 333, 278, 278)
+    + (556,) * 10
+    + (278, 278, 584, 584, 584, 556, 1015, 667, 667, 722, 722, 667, 611, 778, 722, 278, 500, 667, 556, 833, 722)
+    + (778, 667, 778, 722, 667, 611, 722, 667, 944, 667, 667, 611, 278, 278, 278, 469, 556, 333, 556, 556, 500)
+    + (556, 556, 278, 556, 556, 222, 222, 500, 222, 833, 556, 556, 556, 556, 333, 500, 278, 556, 500, 722, 500)
+    + (500, 500, 334, 260, 334, 584)
+)
+_CHARACTER_WIDTHS = {chr(code): width for code, width in enumerate(_ASCII_WIDTHS, start=32)}
+_CHARACTER_WIDTHS.update({"−": 584, "£": 556, "€": 556, "°": 400, "×": 584, "–": 556, "—": 1000, "…": 1000})
+
+# Font families drawn with the Helvetica widths, as the first family named
+_MEASURED_FONTS = ("sans-serif", "arial", "helvetica", "helvetica neue", "liberation sans", "arimo")
+
+# Width of characters not in the table, about that of a digit
+_DEFAULT_WIDTH = 556
+
+# Height of a line of text as a multiple of the font size
+_LINE_HEIGHT = 1.3
+
+# plotly.js defaults: tick length, gap between ticks and labels, and size of
+# figures without a width and height
+_TICK_LENGTH = 5
+_TICK_LABEL_GAP = 3
+_DEFAULT_SIZE = (700, 450)
+
+# Smallest space plotly.js gives each tick on a linear x and y axis, and its
+# limits on the number of ticks
+_MIN_TICK_SPACING = {"x": 80, "y": 40}
+_TICK_COUNT_LIMITS = (4, 9)
+
+# Tick label angles tried by plotly.js when x labels overlap
+_AUTO_TICK_ANGLES = (0, 30, 90)
+
+# SI suffixes used by plotly.js's default "B" exponent format
+_SI_SUFFIXES = {-15: "f", -12: "p", -9: "n", -6: "μ", -3: "m", 0: "", 3: "k", 6: "M", 9: "B", 12: "T"}
+
+# Stand-in for plotly.js's default date tick labels, such as "Sep 30" with
+# "2024" on a second line, used when a date axis has no tickformat
+_DATE_LABEL = "Sep 30<br>2024"
+
+# Trace types whose value axis starts at zero
+_BAR_TYPES = ("bar", "waterfall", "funnel")
+
+
+class UnsupportedFigure(ValueError):
+    """
+    Raised by estimate_margins() for figures whose tick labels it cannot
+    predict, so apply_fixed_margins() leaves them to `automargin`.
+    """
+
+
+@functools.lru_cache(maxsize=4096)
+def text_width(text, size):
+    """
+    Return the width of text in pixels, using the font metrics of
+    Helvetica and Arial.
+
+    Parameters
+    ----------
+    text : string
+        Single line of text.
+
+    size : float
+        Font size in pixels.
+
+    Returns
+    -------
+    float
+        Estimated width in pixels.
+
+    """
+    return sum(_CHARACTER_WIDTHS.get(character, _DEFAULT_WIDTH) for character in text) * size / 1000
+
+
+def estimate_margins(fig, width=None, height=None):
+    """
+    Estimate the margins plotly.js `automargin` would give a figure with
+    the afcharts template, from the tick labels its data will produce.
+
+    Labels are measured with the Helvetica and Arial font metrics, so the
+    figure's fonts must be one of these or sans-serif. Labels on linear
+    axes follow plotly.js's default number format, whatever the axis's
+    `tickformat`. Labels on date axes are the first and last dates in
+    the data written with the axis's `tickformat`, or "Sep 30" over a
+    year when it has none.
+
+    Parameters
+    ----------
+    fig : plotly.graph_objects.Figure or dict
+        Figure with a single x and y axis.
+
+    width, height : float, optional
+        Size the figure is drawn at, in pixels. Default to the figure's
+        width and height, or plotly's default of 700 x 450.
+
+    Raises
+    ------
+    UnsupportedFigure
+        If the figure has more than one x or y axis, an axis type other
+        than linear, date or category, or a font other than Helvetica,
+        Arial or sans-serif.
+
+    Returns
+    -------
+    dict
+        Margins "l", "r", "t" and "b" in pixels, and the angle of the x
+        tick labels as "xaxis_tickangle".
+
+    """
+    figure = fig if isinstance(fig, dict) else fig.to_plotly_json()
+    layout = figure.get("layout") or {}
+    template = _template_layout(layout)
+    traces = figure.get("data") or []
+    _check_axes(layout, traces)
+
+    width = width or layout.get("width") or _DEFAULT_SIZE[0]
+    height = height or layout.get("height") or _DEFAULT_SIZE[1]
+    margin = {**template.get("margin", {}), **(layout.get("margin") or {})}
+    font_size = _get(layout, template, "font", "size") or 12
+
+    x_axis = _merged(layout, template, "xaxis")
+    y_axis = _merged(layout, template, "yaxis")
+    x_size = _get(x_axis, {}, "tickfont", "size") or font_size
+    y_size = _get(y_axis, {}, "tickfont", "size") or font_size
+    font_family = _get(layout, template, "font", "family")
+    for axis in (x_axis, y_axis):
+        _check_font(_get(axis, {}, "tickfont", "family") or font_family)
+
+    # The x axis length depends on the left margin, so the y labels are found first
+    provisional_bottom = margin.get("b", 0) + _TICK_LENGTH + _TICK_LABEL_GAP + 2 * _LINE_HEIGHT * x_size
+    y_length = height - margin.get("t", 0) - provisional_bottom
+    y_labels, _ = _tick_labels(traces, "y", y_axis, y_length)
+    left = margin.get("l", 0) + _axis_depth(y_axis, font_size)
+    left += max((_label_width(label, y_size) for label in y_labels), default=0)
+
+    x_length = width - left - margin.get("r", 0)
+    x_labels, x_kind = _tick_labels(traces, "x", x_axis, x_length)
+    lines = max((label.count("<br>") + 1 for label in x_labels), default=1)
+    label_widths = [_label_width(label, x_size) for label in x_labels]
+    angle = x_axis.get("tickangle")
+    if angle is None or angle == "auto":
+        angle = _tick_angle(label_widths, x_length, x_size)
+    radians = math.radians(abs(angle))
+    label_height = lines * _LINE_HEIGHT * x_size
+    x_depth = max((label * math.sin(radians) + label_height * math.cos(radians) for label in label_widths), default=0)
+    bottom = margin.get("b", 0) + _axis_depth(x_axis, font_size) + x_depth
+
+    # The last x label may be centred on the end of the axis, so half of it sits in the right margin
+    right = margin.get("r", 0)
+    if angle == 0 and label_widths and x_kind == "linear":
+        right = max(right, label_widths[-1] / 2 + 1)
+
+    return {
+        "l": math.ceil(left),
+        "r": math.ceil(right),
+        "t": math.ceil(margin.get("t", 0)),
+        "b": math.ceil(bottom),
+        "xaxis_tickangle": angle,
+    }
+
+
+def apply_fixed_margins(fig, width=None, height=None):
+    """
+    Replace `automargin` with fixed margins computed in Python, so
+    plotly.js lays the figure out once instead of measuring it and laying
+    it out again. See estimate_margins().
+
+    Figures that estimate_margins() cannot handle, such as those with
+    several x or y axes, a log axis or a font without built-in metrics,
+    are returned unchanged, keeping `automargin`.
+
+    Parameters
+    ----------
+    fig : plotly.graph_objects.Figure or dict
+        Figure using the afcharts template. Modified in place.
+
+    width, height : float, optional
+        Size the figure is drawn at, in pixels. Default to the figure's
+        width and height, or plotly's default of 700 x 450.
+
+    Returns
+    -------
+    plotly.graph_objects.Figure or dict
+        The figure, to allow chaining.
+
+    """
+    with stage("layout"):
+        try:
+            margins = estimate_margins(fig, width, height)
+        except UnsupportedFigure:
+            return fig
+
+        angle = margins.pop("xaxis_tickangle")
+        update = {
+            "margin": margins,
+            "xaxis": {"automargin": False, "tickangle": angle},
+            "yaxis": {"automargin": False},
+        }
+        if isinstance(fig, dict):
+            layout = fig.setdefault("layout", {})
+            for key, value in update.items():
+                layout[key] = {**(layout.get(key) or {}), **value}
+            return fig
+        return fig.update_layout(update)
+
+
+def _template_layout(layout):
+    template = layout.get("template") or {}
+    if isinstance(template, str):
+        import plotly.io as pio
+
+        import afcharts.pio_template  # noqa: F401  Registers the afcharts templates
+
+        template = pio.templates[template].to_plotly_json()
+    return template.get("layout") or {}
+
+
+def _check_axes(layout, traces):
+    for key in layout:
+        if key[:5] in ("xaxis", "yaxis") and key[5:]:
+            raise UnsupportedFigure(f"Only figures with a single x and y axis are supported, not {key}.")
+    for trace in traces:
+        if trace.get("xaxis", "x") != "x" or trace.get("yaxis", "y") != "y":
+            raise UnsupportedFigure("Only figures with a single x and y axis are supported.")
+    for axis in ("xaxis", "yaxis"):
+        axis_type = (layout.get(axis) or {}).get("type", "-")
+        if axis_type not in ("-", "linear", "date", "category"):
+            raise UnsupportedFigure(f"{axis} type {axis_type} is not supported.")
+
+
+def _check_font(family):
+    # plotly.js draws with the first family the browser has, so only the first is checked
+    first = (family or "").split(",")[0].strip().strip("\"'").lower()
+    if first not in _MEASURED_FONTS:
+        raise UnsupportedFigure(f"Font {family} is not supported, labels are measured with Helvetica and Arial widths.")
+
+
+def _label_width(label, size):
+    # plotly.js draws each line of labels holding <br> separately
+    return max(text_width(line, size) for line in label.split("<br>"))
+
+
+def _merged(layout, template, key):
+    return {**(template.get(key) or {}), **(layout.get(key) or {})}
+
+
+def _get(primary, fallback, key, item):
+    value = (primary.get(key) or {}).get(item)
+    return value if value is not None else (fallback.get(key) or {}).get(item)
+
+
+def _axis_depth(axis, font_size):
+    """
+    Return the space taken by an axis's ticks and title.
+    """
+    depth = (_TICK_LENGTH if axis.get("ticks") else 0) + _TICK_LABEL_GAP
+    title = axis.get("title") or {}
+    if isinstance(title, str) or title.get("text"):
+        title_size = (title.get("font") or {}).get("size") if isinstance(title, dict) else None
+        standoff = title.get("standoff", 0) if isinstance(title, dict) else 0
+        depth += standoff + _LINE_HEIGHT * (title_size or font_size)
+    return depth
+
+
+def _tick_labels(traces, letter, axis, length):
+    """
+    Return the tick labels plotly.js will draw on an axis, and the axis
+    kind: "linear", "date" or "category".
+    """
+    values = []
+    starts_at_zero = False
+    for trace in traces:
+        horizontal = trace.get("orientation") == "h"
+        value_letter = "x" if horizontal else "y"
+        array = _trace_array(trace, letter)
+        if array is None and trace.get("type") in _BAR_TYPES and letter != value_letter:
+            # Bars given only their values are placed at 0, 1, 2, ...
+            bar_values = _trace_array(trace, value_letter)
+            array = np.arange(0 if bar_values is None else len(bar_values))
+        if array is not None:
+            values.append(array)
+            starts_at_zero |= trace.get("type") in _BAR_TYPES and letter == value_letter
+    if not values:
+        return [], "linear"
+
+    kind = axis.get("type", "-")
+    if kind == "-":
+        kinds = {np.asarray(array).dtype.kind for array in values}
+        kind = "date" if "M" in kinds else "category" if kinds & {"U", "S", "O"} else "linear"
+    if kind == "category":
+        return list(dict.fromkeys(str(value) for array in values for value in array.tolist())), kind
+    if kind == "date":
+        return _date_tick_labels(values, axis.get("tickformat")), kind
+
+    low, high = axis.get("range") or _data_range(values, starts_at_zero)
+    return _linear_tick_labels(low, high, length, letter), kind
+
+
+def _date_tick_labels(values, tickformat):
+    """
+    Return the first and last dates in the values written with a date
+    axis's tickformat, which uses the same directives as strftime().
+    """
+    if not tickformat:
+        return [_DATE_LABEL] * 2
+    try:
+        dates = np.concatenate([np.asarray(array, dtype="datetime64[us]") for array in values])
+    except ValueError:
+        return [_DATE_LABEL] * 2
+    dates = dates[~np.isnat(dates)]
+    if not len(dates):
+        return [_DATE_LABEL] * 2
+    ends = (dates.min(), dates.max())
+    return [date.astype(datetime.datetime).strftime(tickformat) for date in ends]
+
+
+def _trace_array(trace, key):
+    values = trace.get(key)
+    if values is None:
+        return None
+    if isinstance(values, dict) and "bdata" in values:
+        import base64
+
+        return np.frombuffer(base64.b64decode(values["bdata"]), dtype=f"<{values['dtype']}")
+    array = np.asarray(values)
+    if array.dtype.kind == "O" and all(isinstance(value, (int, float)) for value in array.tolist()):
+        array = array.astype("float64")
+    return array.ravel()
+
+
+def _data_range(values, starts_at_zero):
+    """
+    Return the axis range plotly.js autorange gives the values, with 5%
+    padding, starting at zero for bars.
+    """
+    finite = np.concatenate([array[np.isfinite(array)] for array in values if array.dtype.kind in "iuf"] or [[0.0]])
+    low, high = (float(finite.min()), float(finite.max())) if len(finite) else (0.0, 1.0)
+    padding = 0.05 * ((high - low) or abs(high) or 1)
+    if starts_at_zero:
+        return min(low, 0) - (padding if low < 0 else 0), max(high, 0) + (padding if high > 0 else 0)
+    return low - padding, high + padding
+
+
+def _linear_tick_labels(low, high, length, letter):
+    """
+    Return the labels of the ticks plotly.js places on a linear axis.
+    """
+    low, high = min(low, high), max(low, high)
+    count = min(max(length / _MIN_TICK_SPACING[letter], _TICK_COUNT_LIMITS[0]), _TICK_COUNT_LIMITS[1]) + 1
+    rough = (high - low) / count or 1
+    base = 10 ** math.floor(math.log10(rough))
+    step = base * next(multiple for multiple in (2, 5, 10) if multiple >= rough / base)
+    if rough / base <= 1:
+        step = base
+
+    first = math.ceil(low / step - 1e-9)
+    ticks = [index * step for index in range(first, math.floor(high / step + 1e-9) + 1)]
+
+    # Values are written with an SI suffix once the axis reaches 10,000
+    largest = max(abs(low), abs(high)) or 1
+    exponent = math.floor(math.log10(largest) + 0.01)
+    exponent = 3 * round((exponent - 1) / 3) if abs(exponent) > 3 and abs(exponent) <= 14 else 0
+    decimals = max(0, -math.floor(math.log10(step / 10**exponent) + 0.01))
+    suffix = _SI_SUFFIXES.get(exponent, f"e{exponent}")
+    return [_format_tick(tick / 10**exponent, decimals) + (suffix if tick else "") for tick in ticks]
+
+
+def _format_tick(value, decimals):
+    # plotly.js drops trailing zeros, so ticks read 0.5, 1, 1.5
+    text = f"{value:.{decimals}f}"
+    if "." in text:
+        text = text.rstrip("0").rstrip(".")
+    if text in ("0", "-0"):
+        return "0"
+    return text.replace("-", "−")
+
+
+def _tick_angle(label_widths, length, size):
+    """
+    Return the first of plotly.js's automatic tick angles at which the x
+    labels do not overlap.
+    """
+    if len(label_widths) < 2:
+        return 0
+    spacing = length / len(label_widths)
+    for angle in _AUTO_TICK_ANGLES:
+        if angle == 0 and max(label_widths) + _TICK_LABEL_GAP <= spacing:
+            return 0
+        if angle and _LINE_HEIGHT * size / math.sin(math.radians(angle)) <= spacing:
+            return angle
+    return _AUTO_TICK_ANGLES[-1]
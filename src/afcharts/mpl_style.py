@@ -0,0 +1,175 @@
+# Matplotlib style for afcharts
+# afcharts.mplstyle is parsed and validated once, then applied from memory,
+# either globally under the "afcharts" style name or to a single block of code
+# with afcharts_style(). afcharts_large.mplstyle adds path simplification and
+# chunked Agg drawing for charts with many points, under "afcharts-large".
+
+import contextlib
+import functools
+import threading
+from pathlib import Path
+from types import MappingProxyType
+
+mplstyle_path = Path(__file__).parent.joinpath("afcharts.mplstyle")
+style_name = "afcharts"
+large_mplstyle_path = Path(__file__).parent.joinpath("afcharts_large.mplstyle")
+large_style_name = "afcharts-large"
+
+# Number of points above which rasterise_dense_artists() draws an artist as an
+# image in SVG and PDF output
+dense_artist_threshold = 10_000
+
+# Held by afcharts_style() and afcharts.theme.matplotlib_theme() while they
+# change matplotlib's rcParams, which every thread shares
+rc_params_lock = threading.RLock()
+
+
+@functools.cache
+def get_afcharts_rc_params():
+    """
+    Return the rcParams set by afcharts.mplstyle. The file is read and
+    validated by matplotlib on the first call only.
+
+    Returns
+    -------
+    mappingproxy
+        Read-only mapping of validated rcParams names to values.
+
+    """
+    import matplotlib
+
+    rc_params = matplotlib.rc_params_from_file(mplstyle_path, use_default_template=False)
+    return MappingProxyType(dict(rc_params))
+
+
+@functools.cache
+def get_afcharts_large_rc_params():
+    """
+    Return the rcParams of the afcharts-large style: those set by
+    afcharts.mplstyle, with path simplification and chunked Agg drawing
+    from afcharts_large.mplstyle. The file is read on the first call only.
+
+    Returns
+    -------
+    mappingproxy
+        Read-only mapping of validated rcParams names to values.
+
+    """
+    import matplotlib
+
+    rc_params = matplotlib.rc_params_from_file(large_mplstyle_path, use_default_template=False)
+    return MappingProxyType({**get_afcharts_rc_params(), **rc_params})
+
+
+def register_afcharts_style():
+    """
+    Register the afcharts and afcharts-large styles with matplotlib, so
+    that `plt.style.use("afcharts")` and `plt.style.context("afcharts")`
+    apply them without reading the style files. Calling this again has no
+    further effect, unless matplotlib's style library has been reloaded.
+    """
+    import matplotlib
+    import matplotlib.style
+
+    styles = {style_name: get_afcharts_rc_params, large_style_name: get_afcharts_large_rc_params}
+    for name, get_rc_params in styles.items():
+        if name not in matplotlib.style.library:
+            matplotlib.style.library[name] = matplotlib.RcParams(get_rc_params())
+    matplotlib.style.available[:] = sorted(matplotlib.style.library)
+
+
+@contextlib.contextmanager
+def afcharts_style(large=False):
+    """
+    Apply the afcharts style to a block of code, then restore the previous
+    values of the rcParams it changes. Use as a context manager, or as a
+    decorator on a function that builds a figure:
+
+        with afcharts_style():
+            fig = Figure()
+
+        @afcharts_style()
+        def build_chart(): ...
+
+    Only the parameters set by afcharts.mplstyle are saved and restored,
+    and the pre-validated values are copied in directly, so this is much
+    cheaper than `plt.style.context()`. Matplotlib's rcParams are shared
+    by every thread, so the block holds rc_params_lock: other threads
+    entering afcharts_style() or afcharts.theme.matplotlib_theme() wait
+    until it ends. Code changing rcParams without the lock is not
+    isolated.
+
+    Parameters
+    ----------
+    large : bool, optional
+        If True, apply the afcharts-large style, which draws lines with
+        many points faster. Saving the figure must also happen inside
+        the block for it to take effect. Defaults to False.
+
+    """
+    import matplotlib
+
+    rc_params = get_afcharts_large_rc_params() if large else get_afcharts_rc_params()
+    with rc_params_lock:
+        previous = {key: dict.__getitem__(matplotlib.rcParams, key) for key in rc_params}
+        # The values were validated when the style file was parsed. Matplotlib's
+        # own rc_context() restores rcParams in the same way.
+        dict.update(matplotlib.rcParams, rc_params)
+        try:
+            yield
+        finally:
+            dict.update(matplotlib.rcParams, previous)
+
+
+def rasterise_dense_artists(fig, threshold=None):
+    """
+    Draw the lines and collections of a figure that have many points as
+    images when it is saved as SVG or PDF, keeping text, axes and other
+    artists as vectors. A scatter plot of a million points then saves as
+    a file of tens of kilobytes rather than a hundred megabytes. PNG
+    output is unchanged.
+
+    Rasterised artists are drawn at the dpi of `savefig`.
+
+    Parameters
+    ----------
+    fig : matplotlib.figure.Figure
+        Figure to change. Modified in place.
+
+    threshold : int, optional
+        Number of points above which an artist is rasterised. Defaults
+        to `dense_artist_threshold`.
+
+    Returns
+    -------
+    list of matplotlib.artist.Artist
+        The artists that were rasterised.
+
+    """
+    if threshold is None:
+        threshold = dense_artist_threshold
+
+    rasterised = []
+    for ax in fig.axes:
+        for artist in (*ax.lines, *ax.collections):
+            if _point_count(artist) > threshold:
+                artist.set_rasterized(True)
+                rasterised.append(artist)
+    return rasterised
+
+
+def _point_count(artist):
+    import numpy as np
+    from matplotlib.collections import Collection, QuadMesh
+    from matplotlib.lines import Line2D
+
+    if isinstance(artist, Line2D):
+        return np.shape(artist.get_xdata())[0]
+    if isinstance(artist, QuadMesh):
+        # A mesh's paths are built on request, so count its cells instead
+        rows, columns = np.shape(artist.get_coordinates())[:2]
+        return (rows - 1) * (columns - 1)
+    if isinstance(artist, Collection):
+        vertices = sum(np.shape(path.vertices)[0] for path in artist.get_paths())
+        return max(np.shape(artist.get_offsets())[0], vertices)
+    return 0
@@ -1,7 +1,9 @@
-import plotly.graph_objects as go
+import functools
+from typing import Any
+
 import plotly.io as pio
 
-from afcharts.af_colours import get_af_colours
+from afcharts.instrument import stage
 
 # References:
 # https://plotly.com/python/templates/
@@ -28,115 +30,322 @@ half_line = base_size / 2
 
 af_chart_feature_colour = "#D6D6D6"
 
-pio.templates["afcharts"] = go.layout.Template(
-    layout={
-        "autosize": True,  # Automatically adjusts the scale of the plot based on it's content
-        "annotationdefaults": {
-            "font": {"size": base_size},
-            "showarrow": False,
-        },  # Sets default font size for annotation
-        "bargap": 0.15,
-        "bargroupgap": 0.1,
-        "coloraxis": {
-            "colorbar": {  # Bar chart colours
-                "outlinewidth": 0,  # Width of the outline around the color bar
-                "tickcolor": af_chart_feature_colour,  # Bar chart tick colour
-                "ticklen": half_line / 2,  # Bar chart tick length
-                "ticks": "outside",  # Bar chart tick position
-            }
-        },
-        "colorscale": {
-            "sequential": get_af_colours("sequential")[
-                ::-1
-            ]  # reverse to make high = dark  # Sequential colour scale for low to high ranges
-        },
-        "colorway": get_af_colours("categorical"),  # Sequence of colours to be used in plots
-        "font": {
-            "color": "black",  # Text colour
-            "family": afcharts_font,  # Font
-            "size": base_size,
-        },  # Text size
-        "legend_title": None,  # Removes legend title
-        "legend": {
-            "borderwidth": 0,
-            "title": {"text": None},  # Removes legend title
-            "font": {"size": base_size},  # Legend font size
-            "bgcolor": "rgba(0,0,0,0)",  # Makes legend background transparent
-            "orientation": "v",  # Legend orientation
-            "x": 1,  # Positions legend (0,0 is the bottom left)
-            "y": 0.5,
-            "indentation": 0,
-            "itemclick": "toggleothers",  # Change behaviour from hiding trace to showing only this trace
-            "itemwidth": 30,
-            "traceorder": "normal",
-        },
-        "hoverlabel": {
-            "align": "left",  # Align hover label text to the left
-            "font_size": base_size * 0.9,  # Text size of hover
-            "bgcolor": "white",  # Hover box background
-        },
-        "hovermode": "x unified",  # How hovering affects the display
-        # x unified shows info for all the data at that point in the x-axis
-        "margin": {  # Set margins around the plot area in pixels
-            "l": half_line,  # Left margin
-            "r": half_line,  # Right margin
-            "t": half_line,  # Top margin
-            "b": half_line,  # Bottom margin
-            "pad": 0,  # Padding between grid lines and the tick labels
-        },
-        "uniformtext_minsize": 8,  # Minimum font size for text elements in the plot
-        "uniformtext_mode": "hide",  # Controls visibility of text based on size then the
-        # text will be hidden - hide means that if a text element's size falls below the "uniformtext_minsize"
-        "title": {
-            "text": None,
+# Number of points in a single trace above which apply_afcharts_template()
+# switches to the "afcharts-large" template
+large_trace_threshold = 50_000
+
+# Trace properties holding one value per point, used to measure trace size
+_POINT_PROPERTIES = ("x", "y", "z", "lat", "lon", "values")
+
+# Bytes per item of the dtypes used in plotly typed array specs
+_TYPED_ARRAY_ITEMSIZE = {"i1": 1, "u1": 1, "i2": 2, "u2": 2, "i4": 4, "u4": 4, "f4": 4, "f8": 8}
+
+
+@functools.cache
+def build_afcharts_template():
+    """
+    Build the "afcharts" plotly template. The template is built once
+    and cached, so palette lookups and plotly validation only run the
+    first time it is needed.
+
+    Returns
+    -------
+    plotly.graph_objects.layout.Template
+        The afcharts template.
+
+    """
+    import plotly.graph_objects as go
+
+    from afcharts.af_colourmaps import get_af_colorscale
+    from afcharts.af_colours import get_af_colours
+
+    return go.layout.Template(
+        layout={
+            "autosize": True,  # Automatically adjusts the scale of the plot based on it's content
+            "annotationdefaults": {
+                "font": {"size": base_size},
+                "showarrow": False,
+            },  # Sets default font size for annotation
+            "bargap": 0.15,
+            "bargroupgap": 0.1,
+            "coloraxis": {
+                "colorbar": {  # Bar chart colours
+                    "outlinewidth": 0,  # Width of the outline around the color bar
+                    "tickcolor": af_chart_feature_colour,  # Bar chart tick colour
+                    "ticklen": half_line / 2,  # Bar chart tick length
+                    "ticks": "outside",  # Bar chart tick position
+                }
+            },
+            "colorscale": {
+                # Sequential colour scale for low to high ranges, light to dark so high = dark
+                "sequential": get_af_colorscale("afcharts_sequential"),
+                "diverging": get_af_colorscale("afcharts_diverging"),
+            },
+            "colorway": get_af_colours("categorical"),  # Sequence of colours to be used in plots
             "font": {
-                "size": base_size * 1.6,
-            },  # Title font size and colour
-            "x": 0,
-            "xref": "paper",  # Title alignment
-            "pad": {
-                "t": half_line,
-                "l": 0,
-                "r": half_line,
-                "b": half_line,
-            },  # Padding above and below title
-        },
-        "xaxis": {  # Configures the x-axis
-            "automargin": True,  # Automatically adjust margins on axes to fit the content
-            "gridcolor": af_chart_feature_colour,  # Grid lines colours
-            "linecolor": af_chart_feature_colour,  # Axes line colour
-            "linewidth": 1,
-            "tickcolor": af_chart_feature_colour,  # Tick mark colours
-            "tickfont": {
+                "color": "black",  # Text colour
+                "family": afcharts_font,  # Font
                 "size": base_size,
-            },  # Tick label font size
-            "tickwidth": 1,
-            "ticks": "outside",  # Removes tick marks
-            "title": {  # Axes title
-                "text": None,  # Removes axes title
-                "standoff": half_line / 2,  # Position from axes
+            },  # Text size
+            "legend_title": None,  # Removes legend title
+            "legend": {
+                "borderwidth": 0,
+                "title": {"text": None},  # Removes legend title
+                "font": {"size": base_size},  # Legend font size
+                "bgcolor": "rgba(0,0,0,0)",  # Makes legend background transparent
+                "orientation": "v",  # Legend orientation
+                "x": 1,  # Positions legend (0,0 is the bottom left)
+                "y": 0.5,
+                "indentation": 0,
+                "itemclick": "toggleothers",  # Change behaviour from hiding trace to showing only this trace
+                "itemwidth": 30,
+                "traceorder": "normal",
             },
-            "fixedrange": True,  # Disables zoom and pan, keeps range fixed
-            "zeroline": True,  # Makes zeroline visible
-            "zerolinecolor": af_chart_feature_colour,  # Zero line colour
-        },
-        "yaxis": {  # Configures the y-axis (as with the x-axis above)
-            "automargin": True,
-            "gridcolor": af_chart_feature_colour,
-            "linecolor": af_chart_feature_colour,
-            "linewidth": 1,
-            "tickcolor": af_chart_feature_colour,
-            "tickfont": {"size": base_size},
-            "tickwidth": 1,
-            "ticks": "outside",
+            "hoverlabel": {
+                "align": "left",  # Align hover label text to the left
+                "font_size": base_size * 0.9,  # Text size of hover
+                "bgcolor": "white",  # Hover box background
+            },
+            "hovermode": "x unified",  # How hovering affects the display
+            # x unified shows info for all the data at that point in the x-axis
+            "margin": {  # Set margins around the plot area in pixels
+                "l": half_line,  # Left margin
+                "r": half_line,  # Right margin
+                "t": half_line,  # Top margin
+                "b": half_line,  # Bottom margin
+                "pad": 0,  # Padding between grid lines and the tick labels
+            },
+            "uniformtext_minsize": 8,  # Minimum font size for text elements in the plot
+            "uniformtext_mode": "hide",  # Controls visibility of text based on size then the
+            # text will be hidden - hide means that if a text element's size falls below the "uniformtext_minsize"
             "title": {
                 "text": None,
-                "standoff": half_line / 2,  # Position from axes
+                "font": {
+                    "size": base_size * 1.6,
+                },  # Title font size and colour
+                "x": 0,
+                "xref": "paper",  # Title alignment
+                "pad": {
+                    "t": half_line,
+                    "l": 0,
+                    "r": half_line,
+                    "b": half_line,
+                },  # Padding above and below title
+            },
+            "xaxis": {  # Configures the x-axis
+                "automargin": True,  # Automatically adjust margins on axes to fit the content
+                "gridcolor": af_chart_feature_colour,  # Grid lines colours
+                "linecolor": af_chart_feature_colour,  # Axes line colour
+                "linewidth": 1,
+                "tickcolor": af_chart_feature_colour,  # Tick mark colours
+                "tickfont": {
+                    "size": base_size,
+                },  # Tick label font size
+                "tickwidth": 1,
+                "ticks": "outside",  # Removes tick marks
+                "title": {  # Axes title
+                    "text": None,  # Removes axes title
+                    "standoff": half_line / 2,  # Position from axes
+                },
+                "fixedrange": True,  # Disables zoom and pan, keeps range fixed
+                "zeroline": True,  # Makes zeroline visible
+                "zerolinecolor": af_chart_feature_colour,  # Zero line colour
+            },
+            "yaxis": {  # Configures the y-axis (as with the x-axis above)
+                "automargin": True,
+                "gridcolor": af_chart_feature_colour,
+                "linecolor": af_chart_feature_colour,
+                "linewidth": 1,
+                "tickcolor": af_chart_feature_colour,
+                "tickfont": {"size": base_size},
+                "tickwidth": 1,
+                "ticks": "outside",
+                "title": {
+                    "text": None,
+                    "standoff": half_line / 2,  # Position from axes
+                },
+                "fixedrange": True,
+                "zeroline": True,
+                "zerolinecolor": af_chart_feature_colour,
             },
-            "fixedrange": True,
-            "zeroline": True,
-            "zerolinecolor": af_chart_feature_colour,
         },
-    },
-    data={"scatter": [{"marker": {"size": 8}, "line": {"width": 2.5}}]},
-)
+        data={"scatter": [{"marker": {"size": 8}, "line": {"width": 2.5}}]},
+    )
+
+
+@functools.cache
+def build_afcharts_large_template():
+    """
+    Build the "afcharts-large" plotly template, a companion to
+    "afcharts" for traces with many points. It keeps the afcharts look
+    but styles WebGL `scattergl` traces, hovers on the nearest point
+    rather than scanning every trace, and turns off uniform text sizing.
+
+    Returns
+    -------
+    plotly.graph_objects.layout.Template
+        The afcharts-large template.
+
+    """
+    import plotly.graph_objects as go
+
+    template = go.layout.Template(build_afcharts_template())
+    template.layout.hovermode = "closest"  # Only the nearest point is looked up on hover
+    template.layout.uniformtext = {"mode": False, "minsize": None}  # No per-point text size pass
+    template.data.scattergl = [trace.to_plotly_json() for trace in template.data.scatter]
+    return template
+
+
+def select_afcharts_template(fig, threshold=None):
+    """
+    Return the name of the afcharts template suited to the size of a
+    figure's traces.
+
+    Parameters
+    ----------
+    fig : plotly.graph_objects.Figure or dict
+        Figure to inspect.
+
+    threshold : int, optional
+        Number of points in a single trace above which "afcharts-large"
+        is chosen. Defaults to `large_trace_threshold`.
+
+    Returns
+    -------
+    string
+        "afcharts-large" if any trace has more points than threshold,
+        otherwise "afcharts".
+
+    """
+    if threshold is None:
+        threshold = large_trace_threshold
+
+    for trace in fig["data"]:
+        for name in _POINT_PROPERTIES:
+            if name in trace and trace[name] is not None and _count_points(trace[name]) > threshold:
+                return "afcharts-large"
+    return "afcharts"
+
+
+def _count_points(values):
+    """
+    Return the number of points in a trace array, including plotly's
+    base64 typed array specs such as {"dtype": "f8", "bdata": "..."}.
+    """
+    if isinstance(values, dict) and "bdata" in values:
+        if "shape" in values:
+            return int(str(values["shape"]).split(",")[0])
+        bdata = values["bdata"]
+        n_bytes = len(bdata) * 3 // 4 - bdata[-2:].count("=")
+        return n_bytes // _TYPED_ARRAY_ITEMSIZE[values["dtype"]]
+    return len(values)
+
+
+def apply_afcharts_template(fig, threshold=None):
+    """
+    Set a figure's template to "afcharts", or to "afcharts-large" once
+    any trace has more points than threshold.
+
+    Parameters
+    ----------
+    fig : plotly.graph_objects.Figure
+        Figure to style. Modified in place.
+
+    threshold : int, optional
+        Number of points in a single trace above which "afcharts-large"
+        is applied. Defaults to `large_trace_threshold`.
+
+    Returns
+    -------
+    plotly.graph_objects.Figure
+        The styled figure, to allow chaining.
+
+    """
+    with stage("template_apply"):
+        return fig.update_layout(template=select_afcharts_template(fig, threshold))
+
+
+# The class of pio.templates, which plotly does not export
+_TemplatesConfig: Any = type(pio.templates)
+
+
+class _LazyTemplatesConfig(_TemplatesConfig):
+    """
+    The class of `pio.templates` once afcharts templates are registered.
+    Registered templates are listed and found by name like any other, but
+    each is only built the first time plotly looks it up, for example when
+    it is set as `pio.templates.default` or passed as a figure's
+    `template`. Only the public mapping methods of plotly's templates
+    object are extended.
+    """
+
+    # Builders of the registered templates that have not been built yet
+    _unbuilt: dict = {}
+
+    def __contains__(self, item):
+        return item in self._unbuilt or super().__contains__(item)
+
+    def __iter__(self):
+        names = list(super().__iter__())
+        names.extend(name for name in self._unbuilt if name not in names)
+        return iter(names)
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+    def __getitem__(self, item):
+        for name in item.split("+") if isinstance(item, str) else [item]:
+            if name in self._unbuilt:
+                self._build(name)
+        with stage("template_merge"):
+            return super().__getitem__(item)
+
+    def __setitem__(self, key, value):
+        self._unbuilt.pop(key, None)
+        super().__setitem__(key, value)
+
+    def __delitem__(self, key):
+        # Built first, so plotly also clears the default if it names this template
+        if key in self._unbuilt:
+            self._build(key)
+        super().__delitem__(key)
+
+    def keys(self):
+        return list(iter(self))
+
+    def items(self):
+        for name in list(self._unbuilt):
+            self._build(name)
+        return super().items()
+
+    def _build(self, name):
+        with stage("template_build"):
+            template = self._unbuilt[name]()
+        # Registered through plotly's own __setitem__, which validates the template
+        super().__setitem__(name, template)
+        del self._unbuilt[name]
+
+
+def register_lazy_template(name, builder):
+    """
+    Register a plotly template under `name` without building it. The
+    builder is called the first time the template is used, for example
+    when it is set as `pio.templates.default` or passed as a figure's
+    `template`.
+
+    Parameters
+    ----------
+    name : string
+        Name to register the template under in `pio.templates`.
+
+    builder : callable
+        Function taking no arguments and returning the template.
+
+    """
+    if not isinstance(pio.templates, _LazyTemplatesConfig):
+        pio.templates.__class__ = _LazyTemplatesConfig
+    _LazyTemplatesConfig._unbuilt[name] = builder
+
+
+register_lazy_template("afcharts", build_afcharts_template)
+register_lazy_template("afcharts-large", build_afcharts_large_template)
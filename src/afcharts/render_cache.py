@@ -0,0 +1,317 @@
+# Content-addressed cache of rendered charts
+# Rendered files are stored under a hash of the chart's content and of the
+# afcharts styles, so a chart is only rendered again when its data, layout,
+# the afcharts templates, mplstyles or palettes, or the matplotlib or plotly
+# versions change.
+
+import dataclasses
+import datetime
+import decimal
+import enum
+import functools
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+from collections.abc import Mapping
+from pathlib import Path, PurePath
+
+import numpy as np
+
+_PACKAGE_DIR = Path(__file__).parent
+
+# Types hashed by their repr, which is stable and determined by their value
+_VALUE_TYPES = (
+    str,
+    bytes,
+    int,
+    float,
+    complex,
+    type(None),
+    np.generic,
+    datetime.date,
+    datetime.time,
+    datetime.timedelta,
+    decimal.Decimal,
+    PurePath,
+    enum.Enum,
+)
+
+
+@dataclasses.dataclass
+class CacheStats:
+    """
+    Counts of cache lookups and evictions.
+
+    Attributes
+    ----------
+    hits : int
+        Lookups that found a cached file.
+
+    misses : int
+        Lookups that had to render.
+
+    evictions : int
+        Cached files removed to keep the cache under its size limit.
+
+    """
+
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+
+    @property
+    def hit_rate(self):
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+
+class RenderCache:
+    """
+    A directory of rendered charts keyed by content hash, kept under a
+    size limit by evicting the least recently used files.
+
+    Parameters
+    ----------
+    directory : str or Path
+        Directory holding the cached files. Created if needed.
+
+    max_bytes : int, optional
+        Size limit of the cache. Defaults to 1 GiB.
+
+    """
+
+    def __init__(self, directory, max_bytes=2**30):
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self.stats = CacheStats()
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+    def key(self, content, suffix=""):
+        """
+        Return the cache key for a chart.
+
+        Parameters
+        ----------
+        content : object
+            Anything identifying the rendered output, such as a figure,
+            or a build function with its arguments. Figures, dicts,
+            sequences, NumPy arrays and pandas objects are hashed by
+            value.
+
+        suffix : string, optional
+            Output file suffix, for example ".png".
+
+        Raises
+        ------
+        TypeError
+            If content holds an object that cannot be hashed by value,
+            such as a matplotlib figure or a lambda.
+
+        Returns
+        -------
+        string
+            Hex digest combining the content, suffix and style_fingerprint().
+
+        """
+        digest = hashlib.blake2b(digest_size=20)
+        digest.update(style_fingerprint().encode())
+        digest.update(suffix.encode())
+        _update_hash(digest, content)
+        return digest.hexdigest()
+
+    def path(self, key, suffix=""):
+        """
+        Return the file a key is cached in.
+        """
+        return self.directory.joinpath(f"{key}{suffix}")
+
+    def restore(self, key, output_path):
+        """
+        Copy a cached file to output_path if the key is in the cache.
+
+        Parameters
+        ----------
+        key : string
+            Cache key from key().
+
+        output_path : str or Path
+            Where the chart should be written. Its suffix must match the
+            one used to compute the key.
+
+        Returns
+        -------
+        bool
+            True on a cache hit, False on a miss.
+
+        """
+        output_path = Path(output_path)
+        cached = self.path(key, output_path.suffix)
+        try:
+            shutil.copyfile(cached, output_path)
+            # Mark as recently used for least recently used eviction
+            os.utime(cached)
+        except FileNotFoundError:
+            self.stats.misses += 1
+            return False
+        self.stats.hits += 1
+        return True
+
+    def store(self, key, output_path):
+        """
+        Add a rendered file to the cache. The file is written to a
+        temporary name and renamed into place, so concurrent processes
+        never read a partial file.
+
+        Parameters
+        ----------
+        key : string
+            Cache key from key().
+
+        output_path : str or Path
+            The rendered file.
+
+        """
+        output_path = Path(output_path)
+        fd, temporary = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        os.close(fd)
+        try:
+            shutil.copyfile(output_path, temporary)
+            os.replace(temporary, self.path(key, output_path.suffix))
+        except BaseException:
+            os.unlink(temporary)
+            raise
+
+    def evict(self):
+        """
+        Remove the least recently used files until the cache is no
+        larger than max_bytes.
+
+        Returns
+        -------
+        int
+            Number of files removed.
+
+        """
+        entries = []
+        total = 0
+        with os.scandir(self.directory) as scan:
+            for entry in scan:
+                if entry.is_file() and not entry.name.endswith(".tmp"):
+                    stat = entry.stat()
+                    entries.append((stat.st_mtime_ns, stat.st_size, entry.path))
+                    total += stat.st_size
+
+        removed = 0
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+            removed += 1
+
+        self.stats.evictions += removed
+        return removed
+
+
+def style_fingerprint():
+    """
+    Return a hash of everything that changes how a chart looks: the
+    afcharts, matplotlib and plotly versions, the colour config, every
+    afcharts mplstyle file and the afcharts plotly templates. Cache keys
+    include it, so changing any of these invalidates cached charts. The
+    hash is worked out again whenever a style file is modified.
+
+    Returns
+    -------
+    string
+        Hex digest.
+
+    """
+    import matplotlib
+    import plotly
+
+    style_files = [_PACKAGE_DIR / "config" / "af_colours.yaml", *sorted(_PACKAGE_DIR.glob("*.mplstyle"))]
+    return _style_fingerprint(
+        tuple((str(path), path.stat().st_mtime_ns) for path in style_files),
+        f"matplotlib {matplotlib.__version__} plotly {plotly.__version__}",
+    )
+
+
+@functools.lru_cache(maxsize=4)
+def _style_fingerprint(style_files, library_versions):
+    """
+    Hash the style files, given with their modification times so that an
+    edited file is hashed again, together with the library versions and
+    the afcharts plotly templates.
+    """
+    from importlib.metadata import PackageNotFoundError, version
+
+    from afcharts.pio_template import build_afcharts_large_template, build_afcharts_template
+
+    digest = hashlib.blake2b(digest_size=20)
+    try:
+        digest.update(version("afcharts").encode())
+    except PackageNotFoundError:
+        pass
+    digest.update(library_versions.encode())
+    for path, _ in style_files:
+        digest.update(Path(path).name.encode())
+        digest.update(Path(path).read_bytes())
+    for template in (build_afcharts_template(), build_afcharts_large_template()):
+        digest.update(json.dumps(template.to_plotly_json(), sort_keys=True, default=str).encode())
+    return digest.hexdigest()
+
+
+def _update_hash(digest, value):
+    """
+    Feed a value into a hash by content, tagging each type so that, for
+    example, the string "1" and the integer 1 hash differently.
+    """
+    if hasattr(value, "to_plotly_json"):
+        _update_hash(digest, value.to_plotly_json())
+    elif isinstance(value, Mapping):
+        digest.update(b"{")
+        for item_key in sorted(value, key=str):
+            _update_hash(digest, item_key)
+            _update_hash(digest, value[item_key])
+        digest.update(b"}")
+    elif isinstance(value, (list, tuple)):
+        digest.update(b"[")
+        for item in value:
+            _update_hash(digest, item)
+        digest.update(b"]")
+    elif isinstance(value, np.ndarray):
+        _update_array_hash(digest, value)
+    elif hasattr(value, "to_numpy"):
+        _update_pandas_hash(digest, value)
+    elif isinstance(value, _VALUE_TYPES):
+        digest.update(f"{type(value).__name__}:{value!r}".encode())
+    elif callable(value) and "<" not in getattr(value, "__qualname__", "<"):
+        # Module-level functions and classes, identified by name
+        digest.update(f"callable:{value.__module__}.{value.__qualname__}".encode())
+    else:
+        raise TypeError(f"Cannot hash a {type(value).__name__} by content; give the chart an explicit cache key.")
+
+
+def _update_pandas_hash(digest, value):
+    """
+    Hash a pandas Series, DataFrame or Index with its labels.
+    """
+    digest.update(type(value).__name__.encode())
+    _update_array_hash(digest, value.to_numpy())
+    for labels in ("index", "columns"):
+        if hasattr(value, labels):
+            _update_array_hash(digest, getattr(value, labels).to_numpy())
+
+
+def _update_array_hash(digest, array):
+    if array.dtype.kind == "O":
+        _update_hash(digest, array.tolist())
+        return
+    digest.update(f"array:{array.dtype.str}:{array.shape}".encode())
+    digest.update(np.ascontiguousarray(array).data)
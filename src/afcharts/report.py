@@ -0,0 +1,240 @@
+# HTML reports with many afcharts plotly figures
+# plotly.js and the afcharts templates are written once at the top of the page
+# and each figure is written as compact JSON as it is added, so the size of a
+# report grows with its data rather than with its number of charts. Figures
+# are drawn when they scroll into view. No CDN is needed.
+
+import html
+import json
+import os
+
+from afcharts.serialise import TEMPLATE_NAMES, TEMPLATE_RESOLVER_JS, templates_json, write_compact_json
+
+# Height of a chart placeholder before it is drawn, plotly's default height
+_DEFAULT_HEIGHT = 450
+
+_HEAD = """\
+<!DOCTYPE html>
+<html lang="en">
+<head>
+<meta charset="utf-8">
+<meta name="viewport" content="width=device-width, initial-scale=1">
+<title>{title}</title>
+<style>
+body {{ font-family: sans-serif; margin: 0 auto; max-width: 1000px; padding: 1em; }}
+.afcharts-figure {{ width: 100%; margin-bottom: 2em; }}
+</style>
+"""
+
+_LOADER_JS = """\
+var afchartsTemplates = {templates};
+var afchartsConfig = {config};
+{resolver}
+var afchartsRegister = (function () {{
+    function render(element) {{
+        var data = document.getElementById(element.id + "-data");
+        var figure = afchartsResolveTemplate(JSON.parse(data.textContent), afchartsTemplates);
+        data.remove();
+        Plotly.newPlot(element, figure.data, figure.layout, afchartsConfig);
+    }}
+    var lazy = {lazy} && "IntersectionObserver" in window;
+    var observer = lazy && new IntersectionObserver(function (entries) {{
+        entries.forEach(function (entry) {{
+            if (entry.isIntersecting) {{
+                observer.unobserve(entry.target);
+                render(entry.target);
+            }}
+        }});
+    }}, {{ rootMargin: "500px 0px" }});
+    return function (id) {{
+        var element = document.getElementById(id);
+        if (observer) {{
+            observer.observe(element);
+        }} else {{
+            render(element);
+        }}
+    }};
+}})();
+"""
+
+
+class HTMLReport:
+    """
+    A self-contained HTML page of plotly figures, written as figures are
+    added. plotly.js and the afcharts templates are included once, so
+    the page works without a CDN or network access.
+
+    Use as a context manager, so the page is finished and the file is
+    closed at the end of the block:
+
+        with HTMLReport("bulletin.html", title="Weekly bulletin") as report:
+            report.add_html("<h1>Weekly bulletin</h1>")
+            for region in regions:
+                report.add_figure(build_chart(region), alt_text=f"Cases in {region}")
+
+    Parameters
+    ----------
+    file : str, Path or text stream
+        Output file, or any object with a `write(str)` method.
+
+    title : string, optional
+        Page title.
+
+    lazy : bool, optional
+        If True (default), each chart is drawn when it scrolls near the
+        screen, so long reports open quickly.
+
+    include_plotlyjs : bool, optional
+        If True (default), plotly.js is embedded in the page. If False,
+        the page expects plotly.js to be loaded some other way.
+
+    config : dict, optional
+        plotly.js config for every chart. Defaults to
+        {"responsive": True}.
+
+    templates : iterable of string, optional
+        Registered templates included once in the page. Figures using
+        one of them refer to it by name. Defaults to the afcharts
+        templates.
+
+    """
+
+    def __init__(self, file, title="", lazy=True, include_plotlyjs=True, config=None, templates=TEMPLATE_NAMES):
+        self.templates = tuple(templates)
+        self.figure_count = 0
+        if isinstance(file, (str, os.PathLike)):
+            self._stream = open(file, "w", encoding="utf-8")
+            self._owns_stream = True
+        else:
+            self._stream = file
+            self._owns_stream = False
+        self._closed = False
+
+        write = self._stream.write
+        write(_HEAD.format(title=html.escape(title)))
+        if include_plotlyjs:
+            from plotly.offline import get_plotlyjs
+
+            write('<script type="text/javascript">')
+            write(get_plotlyjs())
+            write("</script>\n")
+        loader = _LOADER_JS.format(
+            templates=_escape_script(templates_json(self.templates)),
+            config=_escape_script(json.dumps({"responsive": True} if config is None else config)),
+            resolver=TEMPLATE_RESOLVER_JS,
+            lazy=json.dumps(bool(lazy)),
+        )
+        write(f'<script type="text/javascript">\n{loader}</script>\n</head>\n<body>\n')
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+        return False
+
+    def add_figure(self, fig, alt_text=None):
+        """
+        Write a plotly figure to the report.
+
+        Parameters
+        ----------
+        fig : plotly.graph_objects.Figure or dict
+            The figure, for example from build_figure_dict().
+
+        alt_text : string, optional
+            Text alternative describing the chart for screen readers.
+
+        """
+        self._check_open()
+        self.figure_count += 1
+        element_id = f"afcharts-figure-{self.figure_count}"
+
+        height = (fig.get("layout") or {}).get("height") if isinstance(fig, dict) else fig.layout.height
+        height = height or _DEFAULT_HEIGHT
+        label = "" if alt_text is None else f' role="img" aria-label="{html.escape(alt_text)}"'
+
+        write = self._stream.write
+        write(f'<div class="afcharts-figure" id="{element_id}" style="min-height: {height}px"{label}></div>\n')
+        write(f'<script type="application/json" id="{element_id}-data">')
+        write_compact_json(fig, _ScriptStream(write), templates=self.templates)
+        write(f'</script>\n<script type="text/javascript">afchartsRegister("{element_id}");</script>\n')
+
+    def add_html(self, markup):
+        """
+        Write HTML, such as headings and commentary, to the report.
+
+        Parameters
+        ----------
+        markup : string
+            HTML written into the page as it is.
+
+        """
+        self._check_open()
+        self._stream.write(markup)
+        self._stream.write("\n")
+
+    def close(self):
+        """
+        Finish the page, and close the file if the report opened it.
+        Calling this again has no further effect.
+        """
+        if self._closed:
+            return
+        self._closed = True
+        self._stream.write("</body>\n</html>\n")
+        if self._owns_stream:
+            self._stream.close()
+
+    def _check_open(self):
+        if self._closed:
+            raise ValueError("Cannot add to a report that has been closed.")
+
+
+def write_html_report(figures, file, title="", **kwargs):
+    """
+    Write plotly figures to a self-contained HTML report, one at a
+    time, see HTMLReport.
+
+    Parameters
+    ----------
+    figures : iterable of plotly.graph_objects.Figure or dict
+        Figures in page order. May be a generator, so each figure can be
+        built, written and released before the next is built.
+
+    file : str, Path or text stream
+        Output file.
+
+    title : string, optional
+        Page title.
+
+    **kwargs
+        Passed to HTMLReport.
+
+    Returns
+    -------
+    int
+        Number of figures written.
+
+    """
+    with HTMLReport(file, title=title, **kwargs) as report:
+        for fig in figures:
+            report.add_figure(fig)
+    return report.figure_count
+
+
+class _ScriptStream:
+    """
+    Text stream writing JSON safely inside an HTML script element.
+    """
+
+    __slots__ = ("write",)
+
+    def __init__(self, write):
+        self.write = lambda text: write(_escape_script(text))
+
+
+def _escape_script(text):
+    # "<" only appears inside JSON strings, where < decodes back to it,
+    # so a string holding "</script>" cannot end the script element
+    return text.replace("<", "\\u003c")
@@ -0,0 +1,281 @@
+# Compact JSON for afcharts styled plotly figures
+# Numeric trace arrays are written as plotly typed arrays ("bdata") in the
+# smallest dtype that holds their values exactly, and the afcharts templates
+# are written as a name that the page resolves once, instead of in full in
+# every figure. Figures are written piece by piece to a file or stream.
+# Typed array reference: https://plotly.com/javascript/reference/ (data_array)
+
+import base64
+import functools
+import json
+import os
+
+import numpy as np
+
+TEMPLATE_NAMES = ("afcharts", "afcharts-large")
+
+# Page-side helper swapping a template name written by write_compact_json()
+# for the template itself, before the figure is passed to Plotly.newPlot
+TEMPLATE_RESOLVER_JS = """\
+function afchartsResolveTemplate(figure, templates) {
+    var name = figure.layout && figure.layout.template;
+    if (typeof name === "string" && templates[name]) {
+        figure.layout.template = templates[name];
+    }
+    return figure;
+}
+"""
+
+# Integer dtypes supported by plotly typed arrays, smallest first
+_INTEGER_DTYPES = tuple(np.dtype(f"<{code}") for code in ("u1", "i1", "u2", "i2", "u4", "i4"))
+
+# Largest integer a float64 holds exactly
+_MAX_EXACT_INTEGER = 2**53
+
+# Bytes encoded per write, a multiple of 3 so base64 chunks join without padding
+_CHUNK_BYTES = 3 * 2**16
+
+
+class _TypedArray:
+    """
+    An array to be written as a plotly typed array spec.
+    """
+
+    __slots__ = ("array",)
+
+    def __init__(self, array):
+        self.array = array
+
+    def spec(self):
+        spec = {"dtype": self.array.dtype.str[1:], "bdata": base64.b64encode(self.array.tobytes()).decode("ascii")}
+        if self.array.ndim > 1:
+            spec["shape"] = ", ".join(map(str, self.array.shape))
+        return spec
+
+
+def compact_figure(fig, templates=TEMPLATE_NAMES, min_length=8):
+    """
+    Return a figure as a dict with numeric trace arrays packed as plotly
+    typed arrays in their smallest exact dtype, and the afcharts
+    templates replaced by their names.
+
+    Parameters
+    ----------
+    fig : plotly.graph_objects.Figure or dict
+        Figure to compact, for example from build_figure_dict().
+
+    templates : iterable of string, optional
+        Names of registered templates to write as references. A figure
+        whose template is one of these has it replaced by the name.
+        Defaults to TEMPLATE_NAMES.
+
+    min_length : int, optional
+        Shortest array to pack. Short arrays are smaller as text.
+        Defaults to 8.
+
+    Returns
+    -------
+    dict
+        Compacted figure dict. `go.Figure()` resolves the template name
+        from `plotly.io.templates`; in a web page, use
+        TEMPLATE_RESOLVER_JS with templates_json().
+
+    """
+    return _unwrap(_prepare(fig, templates, min_length))
+
+
+def write_compact_json(fig, file, templates=TEMPLATE_NAMES, min_length=8):
+    """
+    Write a figure as compact JSON, see compact_figure(). The JSON is
+    written piece by piece, and typed arrays are base64 encoded in
+    chunks, so the whole JSON string is never held in memory.
+
+    Parameters
+    ----------
+    fig : plotly.graph_objects.Figure or dict
+        Figure to write.
+
+    file : str, Path or text stream
+        Output file, or any object with a `write(str)` method, such as
+        an open text file or `socket.makefile("w")`.
+
+    templates : iterable of string, optional
+        Names of registered templates to write as references. Defaults
+        to TEMPLATE_NAMES.
+
+    min_length : int, optional
+        Shortest array to pack. Defaults to 8.
+
+    """
+    figure = _prepare(fig, templates, min_length)
+    if isinstance(file, (str, os.PathLike)):
+        with open(file, "w", encoding="utf-8") as stream:
+            _write(figure, stream.write)
+    else:
+        _write(figure, file.write)
+
+
+def templates_json(names=TEMPLATE_NAMES):
+    """
+    Return registered templates as a JSON object keyed by name, to be
+    sent to a page once and used with TEMPLATE_RESOLVER_JS.
+
+    Parameters
+    ----------
+    names : iterable of string, optional
+        Template names. Defaults to TEMPLATE_NAMES.
+
+    Returns
+    -------
+    string
+        JSON text.
+
+    """
+    from plotly.utils import PlotlyJSONEncoder
+
+    return json.dumps({name: _template_json(name) for name in names}, cls=PlotlyJSONEncoder)
+
+
+def smallest_typed_array(values):
+    """
+    Return values in the smallest dtype supported by plotly typed arrays
+    that holds them exactly, or None if they are not numeric or cannot be
+    held exactly. Floats with only whole numbers become integers, and
+    other floats become float32 when no precision is lost.
+
+    Parameters
+    ----------
+    values : array_like
+        Numeric values.
+
+    Returns
+    -------
+    numpy.ndarray or NoneType
+        Little-endian array of dtype u1, i1, u2, i2, u4, i4, f4 or f8.
+
+    """
+    array = np.asarray(values)
+    if array.dtype.kind not in "iuf" or array.size == 0:
+        return None
+
+    if array.dtype.kind == "f":
+        whole = np.isfinite(array).all() and np.abs(array).max() < _MAX_EXACT_INTEGER
+        if not (whole and np.array_equal(array, np.trunc(array))):
+            single = array.astype("<f4")
+            if np.array_equal(single, array, equal_nan=True):
+                return single
+            return array.astype("<f8")
+        array = array.astype(np.int64)
+
+    low, high = array.min(), array.max()
+    for dtype in _INTEGER_DTYPES:
+        limits = np.iinfo(dtype)
+        if limits.min <= low and high <= limits.max:
+            return array.astype(dtype)
+    if -_MAX_EXACT_INTEGER <= low and high <= _MAX_EXACT_INTEGER:
+        return array.astype("<f8")
+    return None
+
+
+@functools.cache
+def _template_json(name):
+    import plotly.io as pio
+
+    import afcharts.pio_template  # noqa: F401  Registers the afcharts templates
+
+    return pio.templates[name].to_plotly_json()
+
+
+def _prepare(fig, templates, min_length):
+    """
+    Return the figure as a dict with packable arrays wrapped in
+    _TypedArray and known templates replaced by their names.
+    """
+    figure = dict(fig if isinstance(fig, dict) else fig.to_plotly_json())
+
+    layout = dict(figure.get("layout") or {})
+    template = layout.get("template")
+    to_plotly_json = getattr(template, "to_plotly_json", None)
+    if to_plotly_json is not None:
+        template = to_plotly_json()
+    if isinstance(template, dict):
+        for name in templates:
+            if template == _template_json(name):
+                layout["template"] = name
+                break
+    figure["layout"] = layout
+
+    figure["data"] = [_pack(trace, min_length) for trace in figure.get("data", [])]
+    return figure
+
+
+def _pack(value, min_length):
+    """
+    Wrap the numeric arrays in a trace, or a value within it, in _TypedArray.
+    """
+    if isinstance(value, dict):
+        if "bdata" in value and "dtype" in value:
+            array = np.frombuffer(base64.b64decode(value["bdata"]), dtype=f"<{value['dtype']}")
+            if "shape" in value:
+                array = array.reshape([int(size) for size in str(value["shape"]).split(",")])
+        else:
+            return {key: _pack(item, min_length) for key, item in value.items()}
+    elif isinstance(value, (list, tuple, np.ndarray)) or hasattr(value, "to_numpy"):
+        if len(value) < min_length:
+            return value
+        try:
+            array = np.asarray(value)
+        except ValueError:
+            # Ragged nested lists
+            return value
+    else:
+        return value
+
+    packed = smallest_typed_array(array)
+    return value if packed is None else _TypedArray(packed)
+
+
+def _unwrap(value):
+    if isinstance(value, _TypedArray):
+        return value.spec()
+    if isinstance(value, dict):
+        return {key: _unwrap(item) for key, item in value.items()}
+    if isinstance(value, list) and value and isinstance(value[0], dict):
+        return [_unwrap(item) for item in value]
+    return value
+
+
+def _write(value, write):
+    """
+    Write a prepared figure, or a value within it, as JSON.
+    """
+    if isinstance(value, _TypedArray):
+        array = value.array
+        write(f'{{"dtype":"{array.dtype.str[1:]}",')
+        if array.ndim > 1:
+            write(f'"shape":"{", ".join(map(str, array.shape))}",')
+        write('"bdata":"')
+        buffer = memoryview(np.ascontiguousarray(array)).cast("B")
+        for start in range(0, len(buffer), _CHUNK_BYTES):
+            write(base64.b64encode(buffer[start : start + _CHUNK_BYTES]).decode("ascii"))
+        write('"}')
+    elif isinstance(value, dict):
+        write("{")
+        for index, (key, item) in enumerate(value.items()):
+            if index:
+                write(",")
+            write(json.dumps(str(key)))
+            write(":")
+            _write(item, write)
+        write("}")
+    elif isinstance(value, list) and value and isinstance(value[0], (dict, _TypedArray)):
+        write("[")
+        for index, item in enumerate(value):
+            if index:
+                write(",")
+            _write(item, write)
+        write("]")
+    else:
+        from plotly.utils import PlotlyJSONEncoder
+
+        write(json.dumps(value, cls=PlotlyJSONEncoder))
@@ -0,0 +1,408 @@
+# Live updating afcharts charts
+# A chart is styled and built once. After that, each batch of new points is
+# turned into a small update: an extendTraces delta for plotly, or new data
+# for the lines of a matplotlib chart redrawn by blitting over a saved
+# background of the styled axes. Each line keeps only its last `window`
+# points, so the cost of an update grows with the new points and the window,
+# never with the whole history.
+# References:
+# https://plotly.com/javascript/plotlyjs-function-reference/#plotlyextendtraces
+# https://dash.plotly.com/partial-properties
+# https://matplotlib.org/stable/users/explain/animations/blitting.html
+
+import base64
+import dataclasses
+import json
+
+import numpy as np
+
+# Fraction of the x axis span the axis moves by when a matplotlib line
+# reaches its right-hand end, so the styled axes are redrawn rarely
+default_jump = 0.25
+
+# Space left above and below the data when a matplotlib y axis is refitted,
+# as a fraction of the data range
+_Y_MARGIN = 0.05
+
+
+class _RollingBuffer:
+    """
+    The last `window` values appended, in an array of twice that length.
+    When the array fills up, the window is copied to its start, so
+    appending costs a constant amount of copying per value.
+    """
+
+    __slots__ = ("window", "_data", "_start", "_stop")
+
+    def __init__(self, window, values=None):
+        self.window = window
+        self._data = None
+        self._start = self._stop = 0
+        if values is not None:
+            self.extend(values)
+
+    def __len__(self):
+        return self._stop - self._start
+
+    def extend(self, values):
+        """
+        Append values, dropping the oldest beyond the window, and return
+        the number of values dropped.
+        """
+        values = np.asarray(values)[-self.window :]
+        count = len(values)
+        data = self._data
+        if data is None or not np.can_cast(values.dtype, data.dtype, "same_kind"):
+            data = self._reallocate(np.result_type(values, *(() if data is None else (data,))))
+
+        previous = len(self)
+        if self._stop + count > len(data):
+            keep = min(previous, self.window - count)
+            data[:keep] = data[self._stop - keep : self._stop]
+            self._start, self._stop = 0, keep
+        data[self._stop : self._stop + count] = values
+        self._stop += count
+        self._start = max(self._start, self._stop - self.window)
+        return previous + count - len(self)
+
+    def view(self):
+        """
+        Return the values in the window, without copying.
+        """
+        if self._data is None:
+            return np.empty(0)
+        return self._data[self._start : self._stop]
+
+    def _reallocate(self, dtype):
+        data = np.empty(2 * self.window, dtype=dtype)
+        if self._data is not None:
+            data[: len(self)] = self.view()
+            self._start, self._stop = 0, len(self)
+        self._data = data
+        return data
+
+
+@dataclasses.dataclass(frozen=True)
+class PlotlyUpdate:
+    """
+    New points for some traces of a streaming plotly figure.
+
+    Attributes
+    ----------
+    data : dict
+        "x" and "y" lists holding one array of new values per trace.
+
+    traces : list of int
+        Indices of the updated traces, in the same order.
+
+    max_points : int
+        Number of points kept in each trace.
+
+    dropped : dict
+        "x" and "y" lists holding the number of old values dropped from
+        the start of each trace.
+
+    """
+
+    data: dict
+    traces: list
+    max_points: int
+    dropped: dict
+
+    def extend_data(self):
+        """
+        Return the update as the value of the `extendData` property of a
+        Dash `dcc.Graph`.
+        """
+        return (self.data, self.traces, self.max_points)
+
+    def patch(self):
+        """
+        Return the update as a Dash `Patch` of the figure, for a callback
+        whose output is the `figure` property. Needs the dash package.
+        """
+        from dash import Patch
+
+        patch = Patch()
+        for index, trace in enumerate(self.traces):
+            for axis in ("x", "y"):
+                values = patch["data"][trace][axis]
+                values.extend(self.data[axis][index])
+                for _ in range(self.dropped[axis][index]):
+                    del values[0]
+        return patch
+
+    def javascript(self, element_id):
+        """
+        Return a `Plotly.extendTraces` call applying the update to the
+        chart with the given element id, for example to send over a
+        websocket.
+        """
+        from plotly.utils import PlotlyJSONEncoder
+
+        arguments = [element_id, self.data, self.traces, self.max_points]
+        return (
+            f"Plotly.extendTraces({', '.join(json.dumps(argument, cls=PlotlyJSONEncoder) for argument in arguments)});"
+        )
+
+
+class PlotlyStream:
+    """
+    A plotly figure updated with new points as they arrive. Each update
+    only holds the new points, and each trace keeps its last `window`
+    points, so browsers and Dash callbacks handle a small delta instead
+    of a whole new figure.
+
+        stream = PlotlyStream(line_chart(history), window=2000)
+        ...
+        update = stream.extend({0: (new_times, new_values)})
+        return update.extend_data()  # Output("graph", "extendData")
+
+    Parameters
+    ----------
+    fig : plotly.graph_objects.Figure or dict
+        Styled figure, for example from line_chart() or
+        build_figure_dict(), holding the history so far.
+
+    window : int, optional
+        Number of points kept in each trace. Defaults to 1000.
+
+    Raises
+    ------
+    ValueError
+        If window is less than 1, or a trace gives only x or only y
+        with a start or step (such as `x0` and `dx`) that is not a
+        number.
+
+    """
+
+    def __init__(self, fig, window=1000):
+        if window < 1:
+            raise ValueError("window must be at least 1.")
+        self.window = window
+        figure = fig if isinstance(fig, dict) else fig.to_plotly_json()
+        self._layout = figure.get("layout", {})
+        self._traces = [dict(trace) for trace in figure.get("data", [])]
+        self._buffers = []
+        for trace in self._traces:
+            x, y = _trace_values(trace, "x"), _trace_values(trace, "y")
+            # Plotly places points given only by y at x0, x0 + dx, ..., and the reverse
+            if x is None and y is not None:
+                x = _implicit_values(trace, "x", len(y))
+            elif y is None and x is not None:
+                y = _implicit_values(trace, "y", len(x))
+            self._buffers.append({"x": _RollingBuffer(window, x), "y": _RollingBuffer(window, y)})
+
+    def extend(self, points):
+        """
+        Append new points to traces.
+
+        Parameters
+        ----------
+        points : dict
+            Maps trace index to an (x, y) pair of equal length arrays of
+            new values.
+
+        Raises
+        ------
+        ValueError
+            If x and y have different lengths.
+
+        Returns
+        -------
+        PlotlyUpdate
+            The new points, to send to the page.
+
+        """
+        data: dict[str, list] = {"x": [], "y": []}
+        dropped: dict[str, list] = {"x": [], "y": []}
+        traces = []
+        for trace, (x, y) in points.items():
+            x, y = np.asarray(x), np.asarray(y)
+            if len(x) != len(y):
+                raise ValueError(f"x and y for trace {trace} have different lengths, {len(x)} and {len(y)}.")
+            for axis, values in (("x", x), ("y", y)):
+                dropped[axis].append(self._buffers[trace][axis].extend(values))
+                data[axis].append(values[-self.window :])
+            traces.append(trace)
+        return PlotlyUpdate(data, traces, self.window, dropped)
+
+    def figure(self):
+        """
+        Return the figure with the points currently in the window, for
+        example to send to a newly connected page.
+
+        Returns
+        -------
+        dict
+            Figure dict, accepted by Dash and `go.Figure()`.
+
+        """
+        data = [
+            {**trace, "x": buffers["x"].view().copy(), "y": buffers["y"].view().copy()}
+            for trace, buffers in zip(self._traces, self._buffers, strict=True)
+        ]
+        return {"data": data, "layout": self._layout}
+
+
+class MatplotlibStream:
+    """
+    Lines of a matplotlib chart updated with new points as they arrive.
+    The styled axes, gridlines, spines and tick labels are drawn once and
+    saved; each update restores them and draws only the lines, using
+    blitting. The axes are redrawn in full only when a line runs off the
+    end of the x axis, which then jumps forward by a fraction of its
+    span, or outside the y axis.
+
+        fig = line_chart(history, backend="matplotlib")
+        stream = MatplotlibStream(fig.axes[0].lines, window=2000)
+        ...
+        stream.extend({0: (new_times, new_values)})
+
+    Parameters
+    ----------
+    lines : list of matplotlib.lines.Line2D
+        Lines to update, all in the same figure. Their current data is
+        kept as the start of the stream.
+
+    window : int, optional
+        Number of points kept in each line. Defaults to 1000.
+
+    jump : float, optional
+        Fraction of the x axis span the axis moves by when a line reaches
+        its right-hand end. Defaults to default_jump.
+
+    Raises
+    ------
+    ValueError
+        If window is less than 1, jump is not between 0 and 1 or the lines
+        are in different figures.
+
+    """
+
+    def __init__(self, lines, window=1000, jump=default_jump):
+        if window < 1:
+            raise ValueError("window must be at least 1.")
+        if not 0 < jump <= 1:
+            raise ValueError("jump must be greater than 0 and at most 1.")
+        self.lines = list(lines)
+        figures = {line.figure for line in self.lines}
+        if len(figures) != 1:
+            raise ValueError("lines must all be in one figure.")
+        self.figure = figures.pop()
+        self.window = window
+        self.jump = jump
+        self.full_draws = 0
+
+        self._buffers = []
+        for line in self.lines:
+            x = np.asarray(line.convert_xunits(line.get_xdata()), dtype="float64")
+            y = np.asarray(line.convert_yunits(line.get_ydata()), dtype="float64")
+            self._buffers.append((_RollingBuffer(window, x), _RollingBuffer(window, y)))
+            line.set_animated(True)
+
+        self._background = None
+        self.figure.canvas.mpl_connect("draw_event", self._on_draw)
+
+    def extend(self, points):
+        """
+        Append new points to lines and redraw them.
+
+        Parameters
+        ----------
+        points : dict
+            Maps line index to an (x, y) pair of equal length arrays of
+            new values. x may hold dates.
+
+        Raises
+        ------
+        ValueError
+            If x and y have different lengths.
+
+        Returns
+        -------
+        bool
+            True if the axes had to be redrawn in full, False if only
+            the lines were redrawn.
+
+        """
+        axes_to_fit = set()
+        for index, (x, y) in points.items():
+            line = self.lines[index]
+            x = np.asarray(line.convert_xunits(x), dtype="float64")
+            y = np.asarray(line.convert_yunits(y), dtype="float64")
+            if len(x) != len(y):
+                raise ValueError(f"x and y for line {index} have different lengths, {len(x)} and {len(y)}.")
+            x_buffer, y_buffer = self._buffers[index]
+            x_buffer.extend(x)
+            y_buffer.extend(y)
+            line.set_data(x_buffer.view(), y_buffer.view())
+            if len(x) and _outside_limits(line.axes, x, y):
+                axes_to_fit.add(line.axes)
+
+        for ax in axes_to_fit:
+            self._fit(ax)
+        if axes_to_fit or self._background is None:
+            self.figure.canvas.draw()
+            return True
+
+        canvas = self.figure.canvas
+        canvas.restore_region(self._background)
+        self._draw_lines()
+        canvas.blit(self.figure.bbox)
+        return False
+
+    def _on_draw(self, event):
+        # A full draw leaves out animated artists, so save it as the background and draw the lines over it.
+        # Saving to a vector format draws on a temporary canvas that cannot be blitted, so only the lines
+        # are drawn there.
+        canvas = event.canvas
+        if canvas is self.figure.canvas and hasattr(canvas, "copy_from_bbox"):
+            self.full_draws += 1
+            self._background = canvas.copy_from_bbox(self.figure.bbox)
+        for line in self.lines:
+            line.draw(event.renderer)
+
+    def _draw_lines(self):
+        for line in self.lines:
+            self.figure.draw_artist(line)
+
+    def _fit(self, ax):
+        """
+        Move the x axis forward to show the newest points and fit the y
+        axis to the lines in the window.
+        """
+        lines = [line for line in self.lines if line.axes is ax]
+        x_max = max(self._buffers[self.lines.index(line)][0].view().max() for line in lines)
+        left, right = ax.get_xlim()
+        span = right - left
+        if x_max > right:
+            right = x_max + self.jump * span
+            ax.set_xlim(right - span, right)
+
+        y = np.concatenate([self._buffers[self.lines.index(line)][1].view() for line in lines])
+        bottom, top = np.nanmin(y), np.nanmax(y)
+        margin = _Y_MARGIN * ((top - bottom) or 1)
+        ax.set_ylim(bottom - margin, top + margin)
+
+
+def _trace_values(trace, axis):
+    values = trace.get(axis)
+    if values is None:
+        return None
+    if isinstance(values, dict) and "bdata" in values:
+        return np.frombuffer(base64.b64decode(values["bdata"]), dtype=f"<{values['dtype']}")
+    return np.asarray(values)
+
+
+def _implicit_values(trace, axis, count):
+    start, step = trace.get(f"{axis}0", 0), trace.get(f"d{axis}", 1)
+    if not all(isinstance(value, (int, float)) for value in (start, step)):
+        raise ValueError(f"{axis}0 and d{axis} must be numbers for a trace without {axis}; give {axis} instead.")
+    return start + step * np.arange(count)
+
+
+def _outside_limits(ax, x, y):
+    left, right = ax.get_xlim()
+    bottom, top = ax.get_ylim()
+    return x.max() > right or np.nanmin(y) < bottom or np.nanmax(y) > top
@@ -0,0 +1,193 @@
+# Per-request afcharts theming for servers rendering charts on many threads
+# Setting `pio.templates.default` or matplotlib's rcParams styles every chart
+# in the process, so threads rendering afcharts and other charts get each
+# other's styles. Here the theme of a request is held in a context variable,
+# which each thread and asyncio task sees separately. Plotly figures carry
+# their template in the figure itself. Matplotlib reads the shared rcParams
+# while it builds and draws a figure, so styled matplotlib blocks hold a
+# process-wide lock instead.
+
+import contextlib
+from contextvars import ContextVar
+
+from afcharts.mpl_style import rc_params_lock
+
+THEMES = ("afcharts", "afcharts-large")
+
+_theme: ContextVar = ContextVar("afcharts_theme", default=None)
+
+# Default for functions taking the theme of the current context
+_CURRENT = object()
+
+
+@contextlib.contextmanager
+def use_theme(theme="afcharts"):
+    """
+    Set the theme used by themed_figure(), apply_theme() and
+    matplotlib_theme() in the current thread or asyncio task for the
+    rest of the block. Other threads and tasks are unaffected.
+
+    Parameters
+    ----------
+    theme : string or NoneType, optional
+        "afcharts" (default), "afcharts-large", or None for figures
+        without a plotly template and with the process's matplotlib
+        rcParams.
+
+    Raises
+    ------
+    ValueError
+        If theme is not a theme.
+
+    """
+    _check_theme(theme)
+    token = _theme.set(theme)
+    try:
+        yield
+    finally:
+        _theme.reset(token)
+
+
+def current_theme():
+    """
+    Return the theme set by use_theme() in the current context, or None.
+    """
+    return _theme.get()
+
+
+def get_plotly_template(theme=_CURRENT):
+    """
+    Return the plotly template for a theme. The template comes from the
+    afcharts template builders rather than a lookup in `pio.templates`,
+    so templates registered or replaced there by other code do not
+    change it. Importing the builders registers the afcharts templates
+    in `pio.templates`, without changing the default template.
+
+    Parameters
+    ----------
+    theme : string or NoneType, optional
+        Theme name, or None for an empty template. Defaults to the theme
+        of the current context.
+
+    Raises
+    ------
+    ValueError
+        If theme is not a theme.
+
+    Returns
+    -------
+    plotly.graph_objects.layout.Template
+        The template. It is shared, so copy it before changing it.
+
+    """
+    import plotly.graph_objects as go
+
+    from afcharts.pio_template import build_afcharts_large_template, build_afcharts_template
+
+    theme = _resolve(theme)
+    if theme is None:
+        return go.layout.Template()
+    if theme == "afcharts-large":
+        return build_afcharts_large_template()
+    return build_afcharts_template()
+
+
+def themed_figure(data=None, layout=None, theme=_CURRENT, **kwargs):
+    """
+    Create a plotly figure carrying the template of a theme, so it looks
+    the same whatever `pio.templates.default` is in the process.
+
+    Parameters
+    ----------
+    data, layout, **kwargs
+        Passed to `go.Figure()`. A template given in layout is kept.
+
+    theme : string or NoneType, optional
+        Theme name. Defaults to the theme of the current context.
+
+    Returns
+    -------
+    plotly.graph_objects.Figure
+        The figure.
+
+    """
+    import plotly.graph_objects as go
+
+    layout = dict(layout or {})
+    layout.setdefault("template", get_plotly_template(theme))
+    return go.Figure(data, layout, **kwargs)
+
+
+def apply_theme(fig, theme=_CURRENT):
+    """
+    Set the template of a plotly figure to that of a theme.
+
+    Parameters
+    ----------
+    fig : plotly.graph_objects.Figure
+        Figure to style. Modified in place.
+
+    theme : string or NoneType, optional
+        Theme name. Defaults to the theme of the current context.
+
+    Returns
+    -------
+    plotly.graph_objects.Figure
+        The styled figure, to allow chaining.
+
+    """
+    return fig.update_layout(template=get_plotly_template(theme))
+
+
+@contextlib.contextmanager
+def matplotlib_theme(theme=_CURRENT):
+    """
+    Build and draw matplotlib figures in a theme. Matplotlib's rcParams
+    are shared by every thread, so the block holds a process-wide lock:
+    blocks in other threads, including afcharts_style(), wait until it
+    ends, and each sees only its own theme. Any rcParams changed in the
+    block are restored at the end.
+
+    Do all the work that reads rcParams inside the block, that is
+    creating the figure and its artists and saving it:
+
+        with matplotlib_theme("afcharts"):
+            fig = Figure()
+            ...
+            fig.savefig(buffer, format="png")
+
+    Parameters
+    ----------
+    theme : string or NoneType, optional
+        Theme name, or None for the rcParams of the process. Defaults to
+        the theme of the current context. "afcharts-large" adds the path
+        settings of afcharts_large.mplstyle to afcharts.mplstyle.
+
+    Raises
+    ------
+    ValueError
+        If theme is not a theme.
+
+    """
+    import matplotlib
+
+    from afcharts.mpl_style import afcharts_style
+
+    theme = _resolve(theme)
+    with rc_params_lock, matplotlib.rc_context():
+        if theme is None:
+            yield
+        else:
+            with afcharts_style(large=theme == "afcharts-large"):
+                yield
+
+
+def _resolve(theme):
+    theme = current_theme() if theme is _CURRENT else theme
+    _check_theme(theme)
+    return theme
+
+
+def _check_theme(theme):
+    if theme is not None and theme not in THEMES:
+        raise ValueError(f"theme must be one of {', '.join(THEMES)} or None, not {theme}.")
@@ -0,0 +1,112 @@
+"""
+Tests for the continuous colour maps in `af_colourmaps`.
+
+These tests verify that the lookup tables start and end on the AF palette
+colours, that reversed maps mirror their originals, that tables are cached
+and read-only, that they are rebuilt when the palette config changes, and
+that the maps are exposed to matplotlib and plotly.
+"""
+
+import os
+
+import matplotlib
+import numpy as np
+import pytest
+
+from afcharts import af_colours
+from afcharts.af_colourmaps import (
+    COLOURMAP_NAMES,
+    get_af_cmap,
+    get_af_colorscale,
+    get_af_colour_lut,
+    register_af_cmaps,
+)
+from afcharts.af_colours import clear_palette_cache, colours_to_rgb_array, get_af_colours
+
+
+def test_sequential_lut_runs_light_to_dark():
+    """
+    Verify the sequential map starts on the lightest and ends on the darkest sequential colour.
+    """
+    lut = get_af_colour_lut("afcharts_sequential")
+    light, _, dark = colours_to_rgb_array(get_af_colours("sequential")[::-1], dtype="float64")
+
+    assert lut.shape == (256, 3)
+    np.testing.assert_allclose(lut[0], light, atol=1e-6)
+    np.testing.assert_allclose(lut[-1], dark, atol=1e-6)
+
+
+@pytest.mark.parametrize("name", ["afcharts_sequential", "afcharts_diverging"])
+def test_reversed_lut_mirrors_original(name):
+    """
+    Verify each reversed map is the original map in reverse order.
+    """
+    np.testing.assert_array_equal(get_af_colour_lut(f"{name}_r"), get_af_colour_lut(name)[::-1])
+
+
+def test_lut_is_cached_and_read_only():
+    """
+    Verify lookup tables are computed once and cannot be modified.
+    """
+    lut = get_af_colour_lut("afcharts_diverging")
+
+    assert lut is get_af_colour_lut("afcharts_diverging")
+    with pytest.raises(ValueError):
+        lut[0] = 0
+
+
+def test_colour_maps_follow_palette_config_changes(tmp_path, monkeypatch):
+    """
+    Verify lookup tables, matplotlib colour maps and colorscales are rebuilt when the palette config changes.
+    """
+    config = af_colours._DEFAULT_CONFIG_PATH.read_text()
+    path = tmp_path / "af_colours.yaml"
+    path.write_text(config)
+    monkeypatch.setattr(af_colours, "_DEFAULT_CONFIG_PATH", path)
+    clear_palette_cache()
+    try:
+        before = (get_af_colour_lut(), get_af_cmap(), get_af_colorscale())
+
+        path.write_text(config.replace("#12436D", "#000000"))
+        stat = path.stat()
+        os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+        lut, cmap, colorscale = get_af_colour_lut(), get_af_cmap(), get_af_colorscale()
+    finally:
+        clear_palette_cache()
+
+    np.testing.assert_allclose(before[0][-1], colours_to_rgb_array(["#12436D"], dtype="float64")[0], atol=1e-9)
+    np.testing.assert_allclose(lut[-1], [0, 0, 0], atol=1e-9)
+    assert cmap is not before[1]
+    np.testing.assert_allclose(cmap(1.0), [0, 0, 0, 1], atol=1e-9)
+    assert colorscale[-1] == (1.0, "#000000")
+
+
+def test_matplotlib_colormaps_registered():
+    """
+    Verify every colour map can be used by name in matplotlib after registration.
+    """
+    register_af_cmaps()
+    register_af_cmaps()
+
+    for name in COLOURMAP_NAMES:
+        assert matplotlib.colormaps[name].N == 256
+    assert get_af_cmap() is get_af_cmap()
+
+
+def test_plotly_colorscale():
+    """
+    Verify the plotly colorscale spans 0 to 1 between the sequential palette end points.
+    """
+    colorscale = get_af_colorscale("afcharts_sequential", n=5)
+
+    assert [position for position, _ in colorscale] == [0, 0.25, 0.5, 0.75, 1]
+    assert colorscale[0][1] == get_af_colours("sequential")[-1]
+    assert colorscale[-1][1] == get_af_colours("sequential")[0]
+
+
+def test_invalid_colourmap_name():
+    """
+    Verify an unknown colour map name triggers a ValueError.
+    """
+    with pytest.raises(ValueError):
+        get_af_colour_lut("viridis")
@@ -0,0 +1,94 @@
+"""
+Tests for the vectorised colour conversion functions in `af_colours`.
+
+These tests verify that `colours_to_rgb_array` parses every supported colour
+notation from lists, pandas Series and NumPy arrays, that
+`rgb_array_to_hex` reverses the conversion, and that invalid colours raise
+a `ValueError`.
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from afcharts.af_colours import colours_to_rgb_array, get_af_colours, hex_to_rgb, rgb_array_to_hex
+
+
+@pytest.mark.parametrize(
+    "colour, expected",
+    [
+        ("#12436D", (18, 67, 109, 255)),
+        ("12436d", (18, 67, 109, 255)),
+        ("#FFF", (255, 255, 255, 255)),
+        ("#FFF8", (255, 255, 255, 136)),
+        ("#12436D80", (18, 67, 109, 128)),
+        ("rgb(255, 0, 10)", (255, 0, 10, 255)),
+        ("rgba(0,0,0,0.5)", (0, 0, 0, 128)),
+        ("rgb(100%, 0%, 50%)", (255, 0, 128, 255)),
+    ],
+)
+def test_colour_notations(colour, expected):
+    """
+    Verify each supported notation is converted to the expected rgba values.
+    """
+    assert tuple(colours_to_rgb_array([colour], alpha=True)[0]) == expected
+
+
+@pytest.mark.parametrize("container", [list, tuple, pd.Series, np.array])
+def test_input_containers(container):
+    """
+    Verify lists, tuples, pandas Series and NumPy arrays give the same contiguous array.
+    """
+    colours = get_af_colours("categorical")
+    result = colours_to_rgb_array(container(colours))
+
+    assert result.shape == (6, 3)
+    assert result.dtype == np.uint8
+    assert result.flags.c_contiguous
+    assert result.tolist() == [list(rgb) for rgb in get_af_colours("categorical", "rgb")]
+
+
+def test_float_output():
+    """
+    Verify a float dtype returns values scaled between 0 and 1.
+    """
+    result = colours_to_rgb_array(["#FFFFFF", "#000000"], alpha=True, dtype="float32")
+
+    assert result.dtype == np.float32
+    np.testing.assert_array_equal(result, [[1, 1, 1, 1], [0, 0, 0, 1]])
+
+
+def test_round_trip_to_hex():
+    """
+    Verify rgb_array_to_hex reverses colours_to_rgb_array for integer and float arrays.
+    """
+    colours = list(get_af_colours("categorical"))
+
+    assert rgb_array_to_hex(colours_to_rgb_array(colours)).tolist() == colours
+    assert rgb_array_to_hex(colours_to_rgb_array(colours, dtype="float64")).tolist() == colours
+    assert rgb_array_to_hex(colours_to_rgb_array(["#12436D80"], alpha=True)).tolist() == ["#12436D80"]
+
+
+def test_hex_to_rgb_accepts_tuples():
+    """
+    Verify hex_to_rgb accepts the tuples returned by get_af_colours.
+    """
+    assert hex_to_rgb(get_af_colours("duo")) == [(18, 67, 109), (244, 106, 37)]
+
+
+@pytest.mark.parametrize("colour", ["#12", "#GGGGGG", "#1234567", "rgb(300, 0, 0)", ""])
+def test_invalid_colour_values(colour):
+    """
+    Verify colours that cannot be parsed trigger a ValueError.
+    """
+    with pytest.raises(ValueError):
+        colours_to_rgb_array(["#12436D", colour])
+
+
+@pytest.mark.parametrize("colours", ["#12436D", [1, 2, 3], ["#12436D", None]])
+def test_invalid_colour_types(colours):
+    """
+    Verify single strings and non-string values trigger a TypeError.
+    """
+    with pytest.raises(TypeError):
+        colours_to_rgb_array(colours)
@@ -0,0 +1,68 @@
+"""
+Tests for the in-memory palette store behind `get_af_colours`.
+
+These tests verify that the colour config is parsed once per path, that the
+cached palettes are replaced when the config file changes on disk, and that
+the palettes handed back cannot be modified by callers.
+"""
+
+import os
+
+import pytest
+
+from afcharts import af_colours
+from afcharts.af_colours import clear_palette_cache, get_af_colours, load_palettes
+
+CONFIG = """\
+categorical_hex_list: ["#12436D","#28A197","#801650", "#F46A25","#3D3D3D","#A285D1"]
+duo_hex_list: ["#12436D","#F46A25"]
+sequential_hex_list: ["#12436D", "#2073BC", "#6BACE6"]
+focus_hex_list: ["#12436D","#BFBFBF"]
+"""
+
+
+@pytest.fixture
+def config_path(tmp_path):
+    path = tmp_path / "af_colours.yaml"
+    path.write_text(CONFIG)
+    yield path
+    clear_palette_cache()
+
+
+def test_config_parsed_once(config_path, mocker):
+    """
+    Verify repeated lookups reuse the parsed config instead of re-reading the YAML.
+    """
+    spy = mocker.spy(af_colours.yaml, "load")
+
+    first = get_af_colours("categorical", config_path=config_path)
+    second = get_af_colours("categorical", config_path=config_path)
+
+    assert first is second
+    assert spy.call_count == 1
+
+
+def test_cache_invalidated_when_config_changes(config_path):
+    """
+    Verify an edit to the config file is picked up on the next lookup.
+    """
+    assert get_af_colours("duo", config_path=config_path) == ("#12436D", "#F46A25")
+
+    config_path.write_text(CONFIG.replace('duo_hex_list: ["#12436D","#F46A25"]', 'duo_hex_list: ["#000000","#FFFFFF"]'))
+    stat = config_path.stat()
+    os.utime(config_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+    assert get_af_colours("duo", config_path=config_path) == ("#000000", "#FFFFFF")
+    assert get_af_colours("duo", "rgb", config_path=config_path) == ((0, 0, 0), (255, 255, 255))
+
+
+def test_cached_palettes_are_immutable(config_path):
+    """
+    Verify callers cannot modify the cached palettes.
+    """
+    palettes = load_palettes(config_path)
+
+    assert isinstance(get_af_colours("sequential", config_path=config_path), tuple)
+    assert palettes["rgb"]["sequential"] == ((18, 67, 109), (32, 115, 188), (107, 172, 230))
+    with pytest.raises(TypeError):
+        palettes["hex"]["duo"] = ("#000000",)
@@ -0,0 +1,109 @@
+"""
+Tests for `map_af_colours`, which maps arrays of values to colours.
+
+These tests verify that categorical values are coloured from the AF
+palettes in category order, that continuous values are coloured along the
+sequential colour map, that missing values get the missing value colour,
+that infinite values go to the ends of the colour map, and that invalid
+input raises a `ValueError`.
+"""
+
+import warnings
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from afcharts.af_colours import get_af_colours, map_af_colours
+
+categorical = get_af_colours("categorical")
+sequential = get_af_colours("sequential")
+
+
+@pytest.mark.parametrize(
+    "values",
+    [
+        ["b", "a", "c", "b"],
+        np.array(["b", "a", "c", "b"]),
+        pd.Series(["b", "a", "c", "b"]),
+        pd.Series(["b", "a", "c", "b"], dtype="category"),
+    ],
+)
+def test_categorical_values(values):
+    """
+    Verify each category gets one palette colour, assigned in sorted category order.
+    """
+    result = map_af_colours(values, colour_format="hex")
+
+    assert result.tolist() == [categorical[1], categorical[0], categorical[2], categorical[1]]
+
+
+def test_categorical_values_with_explicit_categories():
+    """
+    Verify the categories argument sets the order colours are assigned in.
+    """
+    result = map_af_colours(["low", "high", "low"], categories=["low", "high"], colour_format="hex")
+
+    assert result.tolist() == [get_af_colours("duo")[0], get_af_colours("duo")[1], get_af_colours("duo")[0]]
+
+
+def test_continuous_values():
+    """
+    Verify numbers are normalised onto the sequential colour map, light to dark.
+    """
+    result = map_af_colours(np.array([10.0, 15.0, 20.0]), colour_format="hex")
+
+    assert result[0] == sequential[-1]
+    assert result[-1] == sequential[0]
+
+
+def test_continuous_values_are_clipped_to_range():
+    """
+    Verify values outside vmin and vmax get the colour at the nearest end of the colour map.
+    """
+    result = map_af_colours([-5, 0, 100, 200], vmin=0, vmax=100, colour_format="hex")
+
+    assert result.tolist() == [sequential[-1], sequential[-1], sequential[0], sequential[0]]
+
+
+def test_infinite_values_go_to_the_ends():
+    """
+    Verify infinite values do not affect the range and get the colours at the ends of the colour map.
+    """
+    values = np.array([1.0, np.nan, 3.0, np.inf, -np.inf])
+    with warnings.catch_warnings():
+        warnings.simplefilter("error")
+        result = map_af_colours(values, colour_format="hex", nan_colour="#BFBFBF")
+        only_infinite = map_af_colours([np.inf, -np.inf], colour_format="hex")
+
+    assert result.tolist() == [sequential[-1], "#BFBFBF", sequential[0], sequential[0], sequential[-1]]
+    assert only_infinite.tolist() == [sequential[0], sequential[-1]]
+
+
+@pytest.mark.parametrize("values", [[1.0, np.nan, 2.0], ["a", None, "b"], pd.Series(["a", None, "b"])])
+def test_missing_values(values):
+    """
+    Verify missing values are given the missing value colour.
+    """
+    rgba = map_af_colours(values)
+    hex_colours = map_af_colours(values, colour_format="hex", nan_colour="#BFBFBF")
+
+    assert rgba.shape == (3, 4)
+    assert rgba[1].tolist() == [1, 1, 1, 0]
+    assert hex_colours[1] == "#BFBFBF"
+
+
+def test_too_many_categories():
+    """
+    Verify more categories than the palette supports triggers a ValueError.
+    """
+    with pytest.raises(ValueError):
+        map_af_colours([str(i) for i in range(7)])
+
+
+def test_unknown_category():
+    """
+    Verify a value missing from the categories argument triggers a ValueError.
+    """
+    with pytest.raises(ValueError):
+        map_af_colours(["a", "b"], categories=["a"])
@@ -0,0 +1,102 @@
+"""
+Tests for the binning of points onto a grid in `aggregate`.
+
+These tests verify that counts match numpy's two-dimensional histogram,
+including across chunks, that means and maxima leave empty bins missing,
+that points outside the range or with missing data are left out, and that
+invalid input is rejected.
+"""
+
+import numpy as np
+import pytest
+
+from afcharts import aggregate
+from afcharts.aggregate import bin_points
+
+
+def test_counts_match_histogram2d(monkeypatch):
+    """
+    Verify counts read in several chunks match numpy's histogram2d, with rows running up the y axis.
+    """
+    monkeypatch.setattr(aggregate, "_CHUNK_SIZE", 1_000)
+    generator = np.random.default_rng(0)
+    x, y = generator.standard_normal((2, 10_500))
+
+    grid, x_edges, y_edges = bin_points(x, y, bins=(40, 30))
+    expected, expected_x_edges, expected_y_edges = np.histogram2d(x, y, bins=(40, 30))
+
+    assert grid.shape == (30, 40)
+    assert grid.dtype.kind == "i"
+    np.testing.assert_array_equal(grid, expected.T)
+    np.testing.assert_allclose(x_edges, expected_x_edges)
+    np.testing.assert_allclose(y_edges, expected_y_edges)
+
+
+def test_mean_and_max():
+    """
+    Verify means and maxima of the values in each bin, with empty bins missing.
+    """
+    x = [0.1, 0.2, 0.9, 0.9]
+    y = [0.1, 0.1, 0.9, 0.9]
+    values = [1.0, 3.0, 5.0, 9.0]
+
+    mean, _, _ = bin_points(x, y, values, reduction="mean", bins=2, x_range=(0, 1), y_range=(0, 1))
+    peak, _, _ = bin_points(x, y, values, reduction="max", bins=2, x_range=(0, 1), y_range=(0, 1))
+
+    np.testing.assert_array_equal(mean, [[2.0, np.nan], [np.nan, 7.0]])
+    np.testing.assert_array_equal(peak, [[3.0, np.nan], [np.nan, 9.0]])
+
+
+def test_range_and_missing_data():
+    """
+    Verify points outside the range or with missing data are left out, and points on the upper edge are kept.
+    """
+    x = [0.0, 1.0, 1.5, -0.5, np.nan, 0.5]
+    y = [0.0, 1.0, 0.5, 0.5, 0.5, 0.5]
+    values = [1.0, 1.0, 1.0, 1.0, 1.0, np.nan]
+
+    counts, _, _ = bin_points(x, y, bins=2, x_range=(0, 1), y_range=(0, 1))
+    mean, _, _ = bin_points(x, y, values, reduction="mean", bins=2, x_range=(0, 1), y_range=(0, 1))
+
+    np.testing.assert_array_equal(counts, [[1, 0], [0, 2]])
+    np.testing.assert_array_equal(mean, [[1.0, np.nan], [np.nan, 1.0]])
+
+
+def test_points_just_past_the_upper_edge():
+    """
+    Verify points less than a bin past the upper edge of the range are left out, and points on it are kept.
+    """
+    x = [10.0, 10.5, 5.0, 5.0]
+    y = [5.0, 5.0, 10.0, 10.25]
+
+    grid, _, _ = bin_points(x, y, bins=10, x_range=(0, 10), y_range=(0, 10))
+
+    assert grid.sum() == 2
+    assert grid[5, 9] == 1 and grid[9, 5] == 1
+
+
+def test_single_point():
+    """
+    Verify a single point, whose data range is empty, is counted.
+    """
+    grid, x_edges, _ = bin_points([2.0], [3.0], bins=3)
+
+    assert grid.sum() == 1
+    assert x_edges[0] == 2.0
+
+
+@pytest.mark.parametrize(
+    "kwargs, message",
+    [
+        ({"reduction": "sum"}, "reduction must be one of"),
+        ({"reduction": "mean"}, "values must be given"),
+        ({"bins": (0, 10)}, "at least 1"),
+        ({"values": [1.0], "reduction": "max"}, "same length"),
+    ],
+)
+def test_bin_points_errors(kwargs, message):
+    """
+    Verify unknown reductions, missing values, empty grids and mismatched lengths are rejected.
+    """
+    with pytest.raises(ValueError, match=message):
+        bin_points([1.0, 2.0], [1.0, 2.0], **kwargs)
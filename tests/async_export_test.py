@@ -0,0 +1,217 @@
+"""
+Tests for rendering charts from asyncio code in `async_export`.
+
+These tests verify that charts render to bytes and export to files without
+blocking the event loop, that no more than max_concurrency charts render at
+once, that callers beyond max_waiting are turned away, and that timeouts and
+cancellation release their slot only when the chart has finished.
+"""
+
+import asyncio
+import threading
+import time
+
+import matplotlib
+import matplotlib.style
+import plotly.graph_objects as go
+import pytest
+from matplotlib.figure import Figure
+
+from afcharts.async_export import AsyncExporter, RenderQueueFull, render_figure
+from afcharts.export import ExportJob
+
+
+def build_matplotlib_chart(n):
+    fig = Figure()
+    fig.add_subplot().plot(range(n))
+    return fig
+
+
+class SlowFigure:
+    """
+    Stand-in matplotlib figure taking `delay` seconds to save, counting how many save at once.
+    """
+
+    lock = threading.Lock()
+    running = 0
+    most_running = 0
+    canvas = None
+
+    def __init__(self, delay):
+        self.delay = delay
+
+    def savefig(self, file, format="png", **kwargs):
+        with SlowFigure.lock:
+            SlowFigure.running += 1
+            SlowFigure.most_running = max(SlowFigure.most_running, SlowFigure.running)
+        time.sleep(self.delay)
+        with SlowFigure.lock:
+            SlowFigure.running -= 1
+        if hasattr(file, "write"):
+            file.write(format.encode())
+        else:
+            file.write_bytes(format.encode())
+
+
+def test_render_figure_formats():
+    """
+    Verify matplotlib figures render to PNG and plotly figures to JSON and HTML.
+    """
+    fig = go.Figure(go.Bar(x=[1, 2], y=[3, 4]))
+
+    assert render_figure(build_matplotlib_chart(5), "png").startswith(b"\x89PNG")
+    assert b'"type":"bar"' in render_figure(fig, "json")
+    assert b"<html>" in render_figure(fig, "html", {"include_plotlyjs": False})
+    with pytest.raises(TypeError):
+        render_figure("chart", "png")
+
+
+def test_render_on_worker_processes():
+    """
+    Verify a figure renders to bytes on a worker process.
+    """
+
+    async def main():
+        async with AsyncExporter(max_concurrency=1) as exporter:
+            return await exporter.render(build_matplotlib_chart(5), "svg")
+
+    assert b"<svg" in asyncio.run(main())
+
+
+def test_concurrency_is_bounded():
+    """
+    Verify no more than max_concurrency charts render at once while the event loop keeps running.
+    """
+    SlowFigure.most_running = 0
+
+    async def main():
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            while True:
+                ticks += 1
+                await asyncio.sleep(0.005)
+
+        ticking = asyncio.ensure_future(ticker())
+        async with AsyncExporter(max_concurrency=2, executor="thread") as exporter:
+            results = await asyncio.gather(*(exporter.render(SlowFigure(0.05), "png") for _ in range(6)))
+        ticking.cancel()
+        return results, ticks
+
+    results, ticks = asyncio.run(main())
+
+    assert results == [b"png"] * 6
+    assert SlowFigure.most_running == 2
+    assert ticks >= 10
+
+
+def test_queue_full():
+    """
+    Verify calls beyond max_waiting are turned away while a slot is busy.
+    """
+
+    async def main():
+        async with AsyncExporter(max_concurrency=1, executor="thread", max_waiting=1) as exporter:
+            first = asyncio.ensure_future(exporter.render(SlowFigure(0.1), "png"))
+            second = asyncio.ensure_future(exporter.render(SlowFigure(0.1), "png"))
+            await asyncio.sleep(0.02)
+            with pytest.raises(RenderQueueFull):
+                await exporter.render(SlowFigure(0.1), "png")
+            return await asyncio.gather(first, second)
+
+    assert asyncio.run(main()) == [b"png", b"png"]
+
+
+def test_timeout_holds_slot_until_chart_finishes():
+    """
+    Verify a timed out render raises TimeoutError and its slot stays busy until the chart finishes.
+    """
+    SlowFigure.most_running = 0
+
+    async def main():
+        async with AsyncExporter(max_concurrency=1, executor="thread") as exporter:
+            with pytest.raises(asyncio.TimeoutError):
+                await exporter.render(SlowFigure(0.2), "png", timeout=0.05)
+            start = time.perf_counter()
+            await exporter.render(SlowFigure(0), "png")
+            return time.perf_counter() - start
+
+    waited = asyncio.run(main())
+
+    assert waited >= 0.1
+    assert SlowFigure.most_running == 1
+
+
+def test_export_many(tmp_path):
+    """
+    Verify export_many() writes every job from a generator and reports failures and timeouts as results.
+    """
+    jobs = [ExportJob(tmp_path / f"chart_{n}.png", build_matplotlib_chart, args=(n,)) for n in range(2, 6)]
+    jobs.append(ExportJob(tmp_path / "bad.png"))
+    jobs.append(ExportJob(tmp_path / "slow.png", figure=SlowFigure(0.5)))
+
+    async def main():
+        async with AsyncExporter(max_concurrency=2, executor="thread", timeout=0.2) as exporter:
+            return {result.path: result async for result in exporter.export_many(iter(jobs))}
+
+    results = asyncio.run(main())
+
+    assert len(results) == 6
+    assert all(results[str(tmp_path / f"chart_{n}.png")].ok for n in range(2, 6))
+    assert "ExportJob needs either build or figure" in results[str(tmp_path / "bad.png")].error
+    assert "Timed out" in results[str(tmp_path / "slow.png")].error
+
+
+def test_export_many_ignores_max_waiting(tmp_path):
+    """
+    Verify export_many() does not fill the waiting room itself when max_waiting is below max_concurrency.
+    """
+    jobs = (ExportJob(tmp_path / f"chart_{n}.png", figure=SlowFigure(0.02)) for n in range(20))
+
+    async def main():
+        async with AsyncExporter(max_concurrency=4, executor="thread", max_waiting=2) as exporter:
+            results = [result async for result in exporter.export_many(jobs)]
+            return results, exporter.waiting
+
+    results, waiting = asyncio.run(main())
+
+    assert len(results) == 20
+    assert all(result.ok for result in results)
+    assert waiting == 0
+
+
+def build_colour_map_chart():
+    fig = Figure()
+    fig.add_subplot().imshow([[0, 1], [2, 3]], cmap="afcharts_sequential")
+    return fig
+
+
+def test_thread_executor_registers_names_only(tmp_path):
+    """
+    Verify thread renders can use the afcharts colour maps and styles by name without changing rcParams.
+    """
+    if "afcharts_sequential" in matplotlib.colormaps:
+        matplotlib.colormaps.unregister("afcharts_sequential")
+    matplotlib.style.library.pop("afcharts", None)
+    rc_params = dict(matplotlib.rcParams)
+
+    async def main():
+        async with AsyncExporter(max_concurrency=1, executor="thread") as exporter:
+            return await exporter.export(ExportJob(tmp_path / "chart.png", build=build_colour_map_chart))
+
+    result = asyncio.run(main())
+
+    assert result.ok, result.error
+    assert "afcharts" in matplotlib.style.library
+    assert dict(matplotlib.rcParams) == rc_params
+
+
+def test_invalid_arguments():
+    """
+    Verify an invalid concurrency or executor triggers a ValueError.
+    """
+    with pytest.raises(ValueError, match="max_concurrency"):
+        AsyncExporter(max_concurrency=-1)
+    with pytest.raises(ValueError, match="executor"):
+        AsyncExporter(executor="cluster")
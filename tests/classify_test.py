@@ -0,0 +1,146 @@
+"""
+Tests for the classification of values into coloured classes in `classify`.
+
+These tests verify quantile, equal interval and Jenks breaks, including
+Jenks breaks against an exhaustive search, that values and missing values
+are put in the right classes, and that classes get AF sequential colours
+and legend labels ready for plotly and matplotlib.
+"""
+
+import itertools
+
+import numpy as np
+import pytest
+
+from afcharts.af_colours import get_af_colours
+from afcharts.classify import classify, jenks_breaks
+
+
+def exhaustive_jenks_breaks(values, number_of_classes):
+    """
+    Return the breaks with the smallest within-class sum of squared deviations, trying every grouping.
+    """
+    values = np.sort(values)
+    unique = np.unique(values)
+    best_cost, best_breaks = np.inf, None
+    for cuts in itertools.combinations(range(1, len(unique)), number_of_classes - 1):
+        ends = [0, *cuts, len(unique)]
+        cost = 0.0
+        for start, end in itertools.pairwise(ends):
+            members = values[(values >= unique[start]) & (values <= unique[end - 1])]
+            cost += ((members - members.mean()) ** 2).sum()
+        if cost < best_cost - 1e-9:
+            best_cost, best_breaks = cost, [unique[0], *(unique[end - 1] for end in ends[1:])]
+    return best_breaks
+
+
+def test_jenks_breaks_find_natural_groups():
+    """
+    Verify Jenks breaks fall between clearly separated groups of values.
+    """
+    values = np.array([1, 2, 3, 10, 11, 12, 20, 21, 22], dtype="float64")
+
+    np.testing.assert_array_equal(jenks_breaks(values, 3), [1, 3, 12, 22])
+
+
+def test_jenks_breaks_match_exhaustive_search():
+    """
+    Verify Jenks breaks are optimal for random data with repeated values.
+    """
+    generator = np.random.default_rng(0)
+    for _ in range(20):
+        values = generator.integers(0, 30, size=generator.integers(8, 20)).astype("float64")
+        number_of_classes = int(generator.integers(2, 5))
+
+        np.testing.assert_allclose(
+            jenks_breaks(values, number_of_classes), exhaustive_jenks_breaks(values, number_of_classes)
+        )
+
+
+def test_jenks_breaks_with_few_distinct_values():
+    """
+    Verify the largest value is repeated when there are fewer distinct values than classes, however many values.
+    """
+    np.testing.assert_array_equal(jenks_breaks(np.array([5.0, 5.0, 7.0]), 4), [5, 5, 7, 7, 7])
+    np.testing.assert_array_equal(jenks_breaks(np.repeat([1.0, 2.0, 9.0], 100_000), 2), [1, 2, 9])
+
+
+def test_jenks_breaks_sampled():
+    """
+    Verify Jenks breaks from a sample keep the smallest and largest values and separate well spaced groups.
+    """
+    generator = np.random.default_rng(0)
+    values = np.concatenate([generator.normal(centre, 1, 10_000) for centre in (0, 20, 40)])
+
+    classification = classify(values, method="jenks", sample_size=1_000)
+
+    assert classification.breaks[0] == values.min() and classification.breaks[-1] == values.max()
+    np.testing.assert_array_equal(classification.counts, [10_000] * 3)
+
+
+def test_quantile_classes():
+    """
+    Verify quantile classes hold equal numbers of values, with missing values in class -1.
+    """
+    values = np.append(np.arange(1, 13, dtype="float64"), np.nan)
+
+    classification = classify(values, number_of_classes=3)
+
+    np.testing.assert_array_equal(classification.counts, [4, 4, 4])
+    np.testing.assert_array_equal(classification.classes, [0] * 4 + [1] * 4 + [2] * 4 + [-1])
+    assert classification.labels == ("1 to 5", "5 to 8", "8 to 12")
+
+
+def test_equal_interval_classes():
+    """
+    Verify equal interval breaks divide the range evenly and values on a break go in the lower class.
+    """
+    classification = classify([0, 10, 25, 50, 100], number_of_classes=4, method="equal_interval")
+
+    np.testing.assert_array_equal(classification.breaks, [0, 25, 50, 75, 100])
+    np.testing.assert_array_equal(classification.classes, [0, 0, 0, 1, 3])
+
+
+def test_classes_use_af_sequential_palette():
+    """
+    Verify three classes get the AF sequential palette from light to dark, and other numbers get interpolated colours.
+    """
+    assert classify(np.arange(10)).colours == tuple(reversed(get_af_colours("sequential")))
+
+    five = classify(np.arange(10), number_of_classes=5).colours
+    assert len(set(five)) == 5
+    assert five[0] == "#6BACE6" and five[-1] == "#12436D"
+
+
+def test_value_colours_and_labels():
+    """
+    Verify each value gets its class colour and label, with missing values transparent and labelled "No data".
+    """
+    classification = classify(
+        [1.0, 2.0, np.nan], number_of_classes=2, colourmap=["#FFFFFF", "#000000"], label_format=".1f"
+    )
+
+    np.testing.assert_array_equal(classification.value_colours(), ["#FFFFFF", "#000000", "#FFFFFF00"])
+    np.testing.assert_array_equal(classification.value_colours("rgba"), [[1, 1, 1, 1], [0, 0, 0, 1], [1, 1, 1, 0]])
+    np.testing.assert_array_equal(classification.value_labels(), ["1.0 to 1.5", "1.5 to 2.0", "No data"])
+    assert classification.colour_map() == dict(zip(classification.labels, ["#FFFFFF", "#000000"], strict=True))
+    assert [handle.get_label() for handle in classification.legend_handles()] == list(classification.labels)
+
+
+@pytest.mark.parametrize(
+    "args, kwargs, message",
+    [
+        (([1, 2],), {"method": "natural"}, "method must be one of"),
+        (([1, 2],), {"number_of_classes": 0}, "at least 1"),
+        (([np.nan],), {}, "at least one number"),
+        (([[1, 2]],), {}, "one-dimensional"),
+        (([1, 2],), {"colourmap": ["#000000"]}, "1 colours but there are 3 classes"),
+        ((np.arange(20_001.0),), {"method": "jenks", "sample_size": 0}, "at most 20,000 distinct values"),
+    ],
+)
+def test_classify_errors(args, kwargs, message):
+    """
+    Verify bad methods, class numbers, values and palettes, and Jenks breaks from too many values are rejected.
+    """
+    with pytest.raises(ValueError, match=message):
+        classify(*args, **kwargs)
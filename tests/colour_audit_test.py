@@ -0,0 +1,168 @@
+"""
+Tests for the colour vision deficiency simulation and palette audit in `colour_audit`.
+
+These tests verify the CIEDE2000 colour difference against published test
+data, that CVD simulation keeps the shape, dtype and alpha of its input, that
+contrast ratios follow WCAG, and that palettes and rendered charts are
+audited with the right colours flagged.
+"""
+
+import numpy as np
+import pytest
+
+from afcharts.af_colours import get_af_colours
+from afcharts.colour_audit import (
+    audit_image,
+    audit_palette,
+    chart_colours,
+    ciede2000,
+    contrast_ratio,
+    delta_e_matrix,
+    simulate_cvd,
+)
+
+
+@pytest.mark.parametrize(
+    "lab1, lab2, expected",
+    [
+        ((50.0, 2.6772, -79.7751), (50.0, 0.0, -82.7485), 2.0425),
+        ((50.0, 3.1571, -77.2803), (50.0, 0.0, -82.7485), 2.8615),
+        ((50.0, 2.5, 0.0), (50.0, 0.0, -2.5), 4.3065),
+        ((60.2574, -34.0099, 36.2677), (60.4626, -34.1751, 39.4387), 1.2644),
+        ((22.7233, 20.0904, -46.6940), (23.0331, 14.9730, -42.5619), 2.0373),
+        ((2.0776, 0.0795, -1.1350), (0.9033, -0.0636, -0.5514), 0.9082),
+    ],
+)
+def test_ciede2000_matches_published_values(lab1, lab2, expected):
+    """
+    Verify CIEDE2000 differences match the test data of Sharma, Wu and Dalal (2005).
+    """
+    assert ciede2000(np.array(lab1), np.array(lab2)) == pytest.approx(expected, abs=1e-4)
+
+
+def test_delta_e_matrix_is_symmetric():
+    """
+    Verify the pairwise difference matrix is symmetric with zeros on the diagonal.
+    """
+    matrix = delta_e_matrix(["#12436D", "#F46A25", "#28A197"])
+
+    assert matrix.shape == (3, 3)
+    np.testing.assert_allclose(matrix, matrix.T)
+    np.testing.assert_allclose(np.diag(matrix), 0, atol=1e-9)
+
+
+def test_simulate_cvd_keeps_greys_and_alpha():
+    """
+    Verify greys look the same with every deficiency and alpha is unchanged for a uint8 image.
+    """
+    image = np.zeros((4, 5, 4), dtype="uint8")
+    image[..., :3] = np.arange(0, 256, 13)[:20].reshape(4, 5, 1)
+    image[..., 3] = 128
+
+    for cvd_type in ("protan", "deutan", "tritan"):
+        simulated = simulate_cvd(image, cvd_type)
+        assert simulated.shape == image.shape
+        assert simulated.dtype == np.uint8
+        np.testing.assert_allclose(simulated[..., :3], image[..., :3], atol=1)
+        np.testing.assert_array_equal(simulated[..., 3], 128)
+
+
+def test_simulate_cvd_makes_red_and_green_similar():
+    """
+    Verify red and green are much closer with deuteranopia, and severity 0 leaves colours unchanged.
+    """
+    colours = ["#D62728", "#2CA02C"]
+
+    assert delta_e_matrix(simulate_cvd(colours, "deutan"))[0, 1] < delta_e_matrix(colours)[0, 1] / 5
+    np.testing.assert_array_equal(simulate_cvd(colours, "deutan", severity=0), [[214, 39, 40], [44, 160, 44]])
+
+
+def test_simulate_cvd_float_input():
+    """
+    Verify float RGB input gives float output between 0 and 1.
+    """
+    simulated = simulate_cvd(np.array([[1.0, 0.0, 0.0], [0.0, 0.0, 1.0]]), "protan")
+
+    assert simulated.dtype == np.float64
+    assert simulated.min() >= 0 and simulated.max() <= 1
+
+
+@pytest.mark.parametrize(
+    "kwargs, message",
+    [({"cvd_type": "red"}, "cvd_type must be one of"), ({"severity": 2}, "severity must be between")],
+)
+def test_simulate_cvd_errors(kwargs, message):
+    """
+    Verify unknown deficiency types and out of range severities are rejected.
+    """
+    with pytest.raises(ValueError, match=message):
+        simulate_cvd(["#12436D"], **kwargs)
+
+
+def test_contrast_ratio():
+    """
+    Verify black on white has the maximum contrast ratio of 21 and a colour against itself has 1.
+    """
+    ratios = contrast_ratio(["#000000", "#FFFFFF"], ["#FFFFFF", "#000000"])
+
+    np.testing.assert_allclose(ratios, [[21, 1], [1, 21]])
+
+
+def test_audit_palette_passes_af_categorical_palette():
+    """
+    Verify the AF categorical palette passes the audit with the default thresholds.
+    """
+    audit = audit_palette(get_af_colours("categorical"))
+
+    assert audit.passed
+    assert audit.colours == tuple(get_af_colours("categorical"))
+    assert set(audit.min_delta_e()) == {"normal", "protan", "deutan", "tritan"}
+
+
+def test_audit_palette_flags_problems():
+    """
+    Verify red and green are flagged for deuteranopia and a pale colour is flagged for low contrast.
+    """
+    audit = audit_palette(["#D62728", "#2CA02C", "#FFFF33"], backgrounds=["#FFFFFF"])
+
+    assert not audit.passed
+    assert any("#D62728 and #2CA02C" in issue and "deutan" in issue for issue in audit.issues)
+    assert any(issue.startswith("#FFFF33 has contrast") for issue in audit.issues)
+    assert audit.contrast.shape == (3, 1)
+
+
+def test_chart_colours_ignores_background_and_edges():
+    """
+    Verify chart colours are found most common first, leaving out the background and rare pixels.
+    """
+    image = np.full((100, 100, 3), 255, dtype="uint8")
+    image[:50, :20] = (18, 67, 109)
+    image[60:70, :20] = (244, 106, 37)
+    image[99, 99] = (10, 200, 10)
+    image[80:90, :50] = (214, 214, 214)
+
+    colours = chart_colours(image)
+
+    np.testing.assert_array_equal(colours, [[18, 67, 109], [244, 106, 37]])
+
+
+def test_audit_image_of_rendered_chart(tmp_path):
+    """
+    Verify a rendered afcharts bar chart has its bar colours audited and passes.
+    """
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib.figure import Figure
+
+    from afcharts.mpl_style import afcharts_style
+
+    with afcharts_style():
+        fig = Figure()
+        ax = fig.add_subplot()
+        for index, colour in enumerate(get_af_colours("categorical", number_of_colours=4)):
+            ax.bar([index], [index + 1], color=colour)
+    FigureCanvasAgg(fig).print_png(tmp_path / "chart.png")
+
+    audit = audit_image(tmp_path / "chart.png")
+
+    assert set(audit.colours) == set(get_af_colours("categorical", number_of_colours=4))
+    assert audit.passed
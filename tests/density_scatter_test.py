@@ -0,0 +1,99 @@
+"""
+Tests for the `density_scatter` helper in `charts`.
+
+These tests verify that points are drawn as a single heatmap or image
+coloured with the AF sequential colour map, that empty bins are blank,
+that counts use a log colour scale by default, that charts with no points
+still draw, and that invalid input is rejected.
+"""
+
+import numpy as np
+import plotly.graph_objects as go
+import pytest
+from matplotlib.colors import LogNorm, Normalize
+from matplotlib.figure import Figure
+
+from afcharts.af_colourmaps import get_af_colorscale
+from afcharts.charts import density_scatter
+
+generator = np.random.default_rng(0)
+x, y = generator.standard_normal((2, 100_000))
+
+
+def test_plotly_density_scatter():
+    """
+    Verify a plotly chart has one heatmap of log counts over the plot area, with blank empty bins.
+    """
+    fig = density_scatter(x, y, title="Test", size=(600, 400))
+    trace = fig.data[0]
+    z = np.asarray(trace.z, dtype="float64")
+
+    assert isinstance(fig, go.Figure)
+    assert len(fig.data) == 1
+    assert isinstance(trace, go.Heatmap)
+    assert z.shape[1] < 600 and z.shape[0] < 400
+    assert np.isnan(z).any()
+    assert np.nansum(10**z) == pytest.approx(len(x))
+    assert trace.colorbar.ticktext[0] == "1"
+    assert trace.colorscale == tuple(tuple(stop) for stop in get_af_colorscale("afcharts_sequential"))
+    assert fig.layout.title.text == "Test"
+
+
+def test_plotly_density_scatter_mean():
+    """
+    Verify the mean reduction colours bins by value on a linear scale.
+    """
+    fig = density_scatter([0.0, 0.0, 1.0], [0.0, 0.0, 1.0], values=[1.0, 3.0, 5.0], reduction="mean", bins=2)
+    z = np.asarray(fig.data[0].z, dtype="float64")
+
+    np.testing.assert_array_equal(z, [[2.0, np.nan], [np.nan, 5.0]])
+    assert fig.data[0].colorbar.title.text == "Mean"
+    assert fig.data[0].x0 == 0.25 and fig.data[0].dx == 0.5
+
+
+def test_matplotlib_density_scatter():
+    """
+    Verify a matplotlib chart draws the points as a single image with a colour bar.
+    """
+    fig = density_scatter(x, y, backend="matplotlib", title="Test")
+    ax = fig.axes[0]
+
+    assert isinstance(fig, Figure)
+    assert len(ax.images) == 1 and not ax.collections
+    assert isinstance(ax.images[0].norm, LogNorm)
+    assert ax.images[0].get_cmap().name == "afcharts_sequential"
+    assert "Test" in [ax.get_title(loc) for loc in ("left", "center", "right")]
+    assert fig.axes[1].get_ylabel() == "Number of points"
+
+    linear = density_scatter(x, y, backend="matplotlib", log=False)
+    assert type(linear.axes[0].images[0].norm) is Normalize
+
+
+@pytest.mark.parametrize("backend", ["plotly", "matplotlib"])
+def test_density_scatter_without_points(backend):
+    """
+    Verify a chart with no points draws with every bin blank.
+    """
+    fig = density_scatter([], [], backend=backend)
+
+    if backend == "plotly":
+        assert np.isnan(np.asarray(fig.data[0].z, dtype="float64")).all()
+    else:
+        assert not np.isfinite(np.ma.getdata(fig.axes[0].images[0].get_array())).any()
+        fig.canvas.draw()
+
+
+@pytest.mark.parametrize(
+    "kwargs, message",
+    [
+        ({"backend": "bokeh"}, "backend must be"),
+        ({"colourmap": "viridis"}, "viridis"),
+        ({"reduction": "max"}, "values must be given"),
+    ],
+)
+def test_density_scatter_errors(kwargs, message):
+    """
+    Verify unknown backends and colour maps, and reductions without values, are rejected.
+    """
+    with pytest.raises(ValueError, match=message):
+        density_scatter(x, y, **kwargs)
@@ -0,0 +1,90 @@
+"""
+Tests for the shape-preserving downsampling functions in `downsample`.
+
+These tests verify that LTTB and min/max downsampling return the requested
+number of points, keep the end points and extremes of the line, leave short
+series unchanged and accept pandas objects with datetime indexes.
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from afcharts.downsample import downsample, downsample_indices
+
+rng = np.random.default_rng(42)
+x = np.arange(100_000, dtype="float64")
+y = rng.normal(size=x.size).cumsum()
+
+
+def test_lttb_returns_n_out_points():
+    """
+    Verify LTTB selects exactly n_out points, including the first and last.
+    """
+    indices = downsample_indices(x, y, 500)
+
+    assert len(indices) == 500
+    assert indices[0] == 0
+    assert indices[-1] == len(x) - 1
+    assert np.all(np.diff(indices) > 0)
+
+
+def test_minmax_keeps_envelope():
+    """
+    Verify min/max downsampling keeps the lowest and highest points of the series.
+    """
+    indices = downsample_indices(x, y, 500, method="minmax")
+
+    assert len(indices) <= 500
+    assert y.argmin() in indices
+    assert y.argmax() in indices
+
+
+def test_short_series_unchanged():
+    """
+    Verify a series with no more than n_out points is returned whole.
+    """
+    np.testing.assert_array_equal(downsample_indices(x[:100], y[:100], 500), np.arange(100))
+
+
+def test_missing_values_never_selected():
+    """
+    Verify points with missing y values are not selected.
+    """
+    y_missing = y.copy()
+    y_missing[::3] = np.nan
+
+    assert not np.isnan(y_missing[downsample_indices(x, y_missing, 500)]).any()
+
+
+@pytest.mark.parametrize("tz", [None, "Europe/London"])
+def test_dataframe_with_datetime_index(tz):
+    """
+    Verify DataFrames with datetime indexes keep their index and every column.
+    """
+    index = pd.date_range("2024-01-01", periods=x.size, freq="min", tz=tz)
+    df = pd.DataFrame({"a": y, "b": -y}, index=index)
+
+    result = downsample(df, 500)
+
+    assert isinstance(result, pd.DataFrame)
+    assert list(result.columns) == ["a", "b"]
+    assert result.index.isin(index).all()
+    assert 500 <= len(result) <= 1000
+
+
+def test_tuple_input():
+    """
+    Verify (x, y) tuples are downsampled to a tuple of arrays.
+    """
+    x_out, y_out = downsample((x, y), 500)
+
+    assert len(x_out) == len(y_out) == 500
+
+
+def test_invalid_method():
+    """
+    Verify an unknown method triggers a ValueError.
+    """
+    with pytest.raises(ValueError):
+        downsample_indices(x, y, 500, method="mean")
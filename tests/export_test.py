@@ -0,0 +1,94 @@
+"""
+Tests for the parallel batch export pipeline in `export`.
+
+These tests verify that charts built in worker processes are written to
+disk with the afcharts styles applied, that results stream back for a
+generator of jobs, and that a failing job or a crashed worker is reported
+without stopping the rest of the run.
+"""
+
+import os
+from pathlib import Path
+
+import plotly.graph_objects as go
+from matplotlib.figure import Figure
+
+from afcharts.export import ExportJob, export_charts
+
+
+def build_matplotlib_chart(n):
+    fig = Figure()
+    fig.add_subplot().plot(range(n))
+    return fig
+
+
+def build_plotly_chart(n):
+    return go.Figure(go.Bar(x=list(range(n)), y=list(range(n))))
+
+
+def build_failing_chart():
+    raise RuntimeError("no data")
+
+
+def crash_worker():
+    os._exit(1)
+
+
+def test_export_charts_writes_every_job(tmp_path):
+    """
+    Verify every job from a generator is written and reported as successful.
+    """
+    jobs = (ExportJob(tmp_path / f"chart_{n}.png", build_matplotlib_chart, args=(n,)) for n in range(2, 8))
+
+    results = list(export_charts(jobs, max_workers=2, max_pending=2))
+
+    assert len(results) == 6
+    assert all(result.ok for result in results)
+    assert sorted(path.name for path in tmp_path.iterdir()) == [f"chart_{n}.png" for n in range(2, 8)]
+
+
+def test_export_charts_reports_failures(tmp_path):
+    """
+    Verify a failing job is reported with its traceback while other jobs still succeed.
+    """
+    jobs = [
+        ExportJob(tmp_path / "good.svg", build_matplotlib_chart, args=(3,)),
+        ExportJob(tmp_path / "bad.svg", build_failing_chart),
+    ]
+
+    results = {result.path: result for result in export_charts(jobs, max_workers=2)}
+
+    failure = results[str(tmp_path / "bad.svg")]
+
+    assert results[str(tmp_path / "good.svg")].ok
+    assert failure.error is not None
+    assert "RuntimeError: no data" in failure.error
+
+
+def test_export_charts_reports_jobs_after_a_worker_crash(tmp_path):
+    """
+    Verify jobs queued after a worker process dies get error results instead of aborting the run.
+    """
+    jobs = [
+        ExportJob(tmp_path / "crash.png", crash_worker),
+        *(ExportJob(tmp_path / f"chart_{n}.png", build_matplotlib_chart, args=(n,)) for n in range(2, 5)),
+    ]
+
+    results = list(export_charts(jobs, max_workers=1, max_pending=1))
+
+    assert [Path(result.path).name for result in results] == ["crash.png", "chart_2.png", "chart_3.png", "chart_4.png"]
+    assert all("BrokenProcessPool" in (result.error or "") for result in results)
+
+
+def test_workers_apply_afcharts_styles(tmp_path):
+    """
+    Verify the workers apply the afcharts plotly template and matplotlib style.
+    """
+    jobs = [
+        ExportJob(tmp_path / "chart.html", build_plotly_chart, args=(3,), write_kwargs={"include_plotlyjs": False}),
+        ExportJob(tmp_path / "chart.svg", build_matplotlib_chart, args=(3,)),
+    ]
+
+    assert all(result.ok for result in export_charts(jobs, max_workers=1))
+    assert '"hovermode":"x unified"' in (tmp_path / "chart.html").read_text()
+    assert "#12436d" in (tmp_path / "chart.svg").read_text()
@@ -0,0 +1,88 @@
+"""
+Tests for the validation-free figure builder in `fast_figure`.
+
+These tests verify that figure dicts carry the afcharts template's layout
+and trace styles as a go.Figure using the template would show them, that
+values given by the caller take precedence, and that built figures do not
+share state with each other.
+"""
+
+import json
+
+import plotly.graph_objects as go
+import plotly.io as pio
+
+from afcharts.fast_figure import build_figure_dict
+from afcharts.pio_template import build_afcharts_template
+
+
+def to_json_dict(fig):
+    return json.loads(pio.to_json(fig, validate=False))
+
+
+def test_layout_matches_template():
+    """
+    Verify the figure layout holds every layout value of the afcharts template.
+    """
+    template_layout = to_json_dict(go.Figure(layout={"template": build_afcharts_template()}))["layout"]["template"]
+    layout = to_json_dict(go.Figure(build_figure_dict([{"type": "bar", "y": [1, 2]}])))["layout"]
+
+    for key, value in template_layout["layout"].items():
+        if not key.endswith("defaults"):
+            assert layout[key] == value, key
+
+
+def test_trace_styles_and_overrides():
+    """
+    Verify template trace styles are merged under each trace and caller values win.
+    """
+    fig = build_figure_dict(
+        [
+            {"y": [1, 2, 3], "line": {"color": "#28A197"}},
+            {"type": "bar", "y": [1, 2]},
+        ],
+        layout={"title": "Title", "xaxis": {"title": "Year", "range": [0, 10]}, "bargap": 0.5},
+    )
+
+    scatter, bar = fig["data"]
+
+    assert scatter["line"] == {"width": 2.5, "color": "#28A197"}
+    assert scatter["marker"] == {"size": 8}
+    assert bar == {"type": "bar", "y": [1, 2]}
+    assert fig["layout"]["bargap"] == 0.5
+    assert fig["layout"]["title"]["text"] == "Title"
+    assert fig["layout"]["title"]["x"] == 0
+    assert fig["layout"]["xaxis"]["title"]["text"] == "Year"
+    assert fig["layout"]["xaxis"]["linecolor"] == build_afcharts_template().layout.xaxis.linecolor
+
+
+def test_extra_axes_and_annotations():
+    """
+    Verify extra axes and annotations get the template's axis and annotation styles.
+    """
+    fig = build_figure_dict(
+        [{"y": [1, 2], "yaxis": "y2"}],
+        layout={"xaxis2": {"anchor": "y2"}, "annotations": [{"text": "Note"}]},
+    )
+    template = build_afcharts_template().layout
+
+    assert fig["layout"]["yaxis2"]["gridcolor"] == template.yaxis.gridcolor
+    assert fig["layout"]["xaxis2"]["anchor"] == "y2"
+    assert fig["layout"]["xaxis2"]["linecolor"] == template.xaxis.linecolor
+    assert fig["layout"]["annotations"][0]["showarrow"] is False
+    assert "annotationdefaults" not in fig["layout"]
+
+
+def test_figures_do_not_share_state():
+    """
+    Verify changing a built figure does not change figures built later, and that plotly accepts the dict.
+    """
+    first = build_figure_dict([{"y": [1]}])
+    first["layout"]["xaxis"]["tickfont"]["size"] = 99
+    first["data"][0]["line"]["width"] = 10
+
+    second = build_figure_dict([{"y": [1]}])
+
+    assert second["layout"]["xaxis"]["tickfont"]["size"] != 99
+    assert second["data"][0]["line"]["width"] == 2.5
+    assert go.Figure(second).layout.template.layout.to_plotly_json() == {}
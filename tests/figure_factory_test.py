@@ -0,0 +1,148 @@
+"""
+Tests for the pyplot-free matplotlib figure factory in `figure_factory`.
+
+These tests verify that figures are styled and rendered the same as a
+matplotlib figure built in the afcharts style, that canvases and their
+render buffers are reused for figures of the same size, that factory figures
+are cleared at the end of their block while figures built elsewhere are left
+unchanged, and that memory stays flat over many charts.
+"""
+
+import gc
+import io
+import tracemalloc
+
+import matplotlib.image
+import numpy as np
+import pandas as pd
+import pytest
+from matplotlib.backend_bases import FigureCanvasBase
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+
+from afcharts.charts import line_chart
+from afcharts.figure_factory import FigureFactory
+from afcharts.mpl_style import afcharts_style, get_afcharts_rc_params
+
+
+def draw_chart(fig, title="Chart"):
+    ax = fig.add_subplot()
+    ax.plot([1, 2, 3], [3, 1, 2])
+    ax.set_title(title)
+
+
+def test_render_matches_afcharts_style():
+    """
+    Verify a factory figure has the afcharts style and renders the same pixels as one built with afcharts_style().
+    """
+    factory = FigureFactory()
+    with factory.figure() as fig:
+        draw_chart(fig)
+        assert list(fig.get_size_inches()) == get_afcharts_rc_params()["figure.figsize"]
+        png = factory.render(fig)
+
+    with afcharts_style():
+        expected = Figure()
+        draw_chart(expected)
+        buffer = io.BytesIO()
+        FigureCanvasAgg(expected).print_png(buffer)
+
+    buffer.seek(0)
+    np.testing.assert_array_equal(matplotlib.image.imread(io.BytesIO(png)), matplotlib.image.imread(buffer))
+
+
+def test_canvases_and_buffers_are_reused():
+    """
+    Verify figures of the same size share a canvas and render buffer, and other sizes get their own.
+    """
+    factory = FigureFactory()
+    renderers = []
+    for size in [(6, 4), (6, 4), (3, 2), (6, 4)]:
+        with factory.figure(size=size) as fig:
+            draw_chart(fig)
+            factory.render(fig)
+            renderers.append(fig.canvas.get_renderer())
+
+    assert factory.canvases_created == 2
+    assert renderers[0] is renderers[1] is renderers[3]
+    assert renderers[2] is not renderers[0]
+
+
+def test_figures_are_cleared_after_the_block():
+    """
+    Verify a figure can be saved several times in its block and loses its artists and pooled canvas at the end.
+    """
+    factory = FigureFactory()
+    with factory.figure() as fig:
+        draw_chart(fig)
+        assert factory.render(fig, format="svg").startswith(b"<?xml")
+        assert factory.render(fig).startswith(b"\x89PNG")
+        assert isinstance(fig.canvas, FigureCanvasAgg)
+
+    assert fig.axes == []
+    assert type(fig.canvas) is FigureCanvasBase
+
+
+def test_save_figure_built_elsewhere(tmp_path):
+    """
+    Verify a figure from line_chart() is saved, creating the directory, and left with its artists and own canvas.
+    """
+    factory = FigureFactory()
+    fig = line_chart(pd.DataFrame({"a": [1.0, 3.0, 2.0]}), backend="matplotlib")
+    own_canvas = fig.canvas
+
+    factory.save(fig, tmp_path / "charts" / "chart.png")
+    png = factory.render(fig)
+
+    assert (tmp_path / "charts" / "chart.png").read_bytes() == png
+    assert len(fig.axes) == 1
+    assert fig.canvas is own_canvas
+    assert own_canvas.figure is fig
+    assert factory.canvases_created == 1
+    assert factory._idle_count == 1
+
+
+def test_idle_canvases_are_bounded():
+    """
+    Verify only max_canvases idle canvases are kept, and clear() drops them.
+    """
+    factory = FigureFactory(max_canvases=2)
+    for width in range(2, 7):
+        with factory.figure(size=(width, 2)) as fig:
+            factory.render(fig)
+
+    assert factory._idle_count == 2
+    assert list(factory._idle) == [(5.0, 2.0, fig.dpi), (6.0, 2.0, fig.dpi)]
+    factory.clear()
+    assert factory._idle_count == 0
+
+    with pytest.raises(ValueError, match="must not be negative"):
+        FigureFactory(max_canvases=-1)
+
+
+def test_memory_stays_flat():
+    """
+    Verify Python memory does not grow with the number of charts rendered.
+    """
+    factory = FigureFactory()
+
+    def render_charts(count):
+        for index in range(count):
+            with factory.figure(size=(2, 1.5), dpi=50) as fig:
+                draw_chart(fig, f"Chart {index % 5}")
+                factory.render(fig)
+
+    render_charts(10)
+    gc.collect()
+    tracemalloc.start()
+    try:
+        render_charts(10)
+        gc.collect()
+        before, _ = tracemalloc.get_traced_memory()
+        render_charts(40)
+        gc.collect()
+        after, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    assert after - before < 50_000
@@ -0,0 +1,115 @@
+"""
+Tests for the `heatmap` helper in `charts`.
+
+These tests verify that label colours contrast with their cells, that labels
+too large for their cells are left out, that matplotlib labels are drawn as
+one collection per character, that a grid with no values draws, and that
+invalid input is rejected.
+"""
+
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+import pytest
+from matplotlib.collections import PathCollection
+from matplotlib.figure import Figure
+
+from afcharts.charts import heatmap
+
+values = np.array([[0.0, 5.0, 10.0], [15.0, np.nan, 100.0]])
+
+
+def test_plotly_heatmap_labels():
+    """
+    Verify each present value is labelled, light cells with black text and dark cells with white text.
+    """
+    df = pd.DataFrame(values, index=["a", "b"], columns=["x", "y", "z"])
+
+    fig = heatmap(df, title="Test")
+    labels = fig.data[1]
+
+    assert isinstance(fig, go.Figure)
+    assert isinstance(fig.data[0], go.Heatmap)
+    assert list(fig.data[0].x) == ["x", "y", "z"]
+    assert list(labels.text) == ["0", "5", "10", "15", "100"]
+    assert list(labels.y) == ["a", "a", "a", "b", "b"]
+    assert labels.textfont.color[0] == "#000000"
+    assert labels.textfont.color[-1] == "#FFFFFF"
+    assert fig.layout.yaxis.autorange == "reversed"
+
+
+def test_plotly_heatmap_skips_labels_that_do_not_fit():
+    """
+    Verify a grid too dense for its figure size has no labels, and a larger figure has them.
+    """
+    dense = np.arange(100 * 100.0).reshape(100, 100)
+
+    assert len(heatmap(dense).data[1].text) == 0
+    assert len(heatmap(dense, label_size=4, size=(4000, 1500)).data[1].text) == 100 * 100
+
+
+def test_matplotlib_heatmap_labels_drawn_per_character():
+    """
+    Verify matplotlib labels are one collection per distinct character with one offset per use.
+    """
+    fig = heatmap(values, backend="matplotlib", label_format=".0f")
+    ax = fig.axes[0]
+    collections = [collection for collection in ax.collections if isinstance(collection, PathCollection)]
+
+    assert isinstance(fig, Figure)
+    assert not ax.texts
+    # Characters 0, 1 and 5 across the labels 0, 5, 10, 15 and 100
+    assert len(collections) == 3
+    assert sum(np.asarray(collection.get_offsets()).shape[0] for collection in collections) == 9
+    fig.canvas.draw()
+
+
+def test_matplotlib_heatmap_label_colours():
+    """
+    Verify the label of the darkest cell is white and the label of the lightest cell is black.
+    """
+    fig = heatmap(np.array([[0.0, 9.0]]), backend="matplotlib")
+    zero, nine = fig.axes[0].collections[-2:]
+
+    np.testing.assert_array_equal(zero.get_facecolor(), [[0, 0, 0, 1]])
+    np.testing.assert_array_equal(nine.get_facecolor(), [[1, 1, 1, 1]])
+
+
+def test_matplotlib_heatmap_without_labels():
+    """
+    Verify labels=False and an undersized figure both draw no labels.
+    """
+    dense = np.arange(200 * 200.0).reshape(200, 200)
+
+    assert not heatmap(values, backend="matplotlib", labels=False).axes[0].collections
+    assert not heatmap(dense, backend="matplotlib").axes[0].collections
+
+
+@pytest.mark.parametrize("backend", ["plotly", "matplotlib"])
+def test_heatmap_all_missing(backend):
+    """
+    Verify a grid with no values draws without labels on either backend.
+    """
+    fig = heatmap(np.full((3, 3), np.nan), backend=backend)
+
+    if backend == "plotly":
+        assert len(fig.data[1].text) == 0
+    else:
+        assert not fig.axes[0].collections
+        fig.canvas.draw()
+
+
+@pytest.mark.parametrize(
+    "data, kwargs, message",
+    [
+        (values, {"backend": "bokeh"}, "backend must be"),
+        (values, {"colourmap": "viridis"}, "name must be one of"),
+        (np.arange(3.0), {}, "two dimensional"),
+    ],
+)
+def test_heatmap_errors(data, kwargs, message):
+    """
+    Verify unknown backends and colour maps and one dimensional data trigger a ValueError.
+    """
+    with pytest.raises(ValueError, match=message):
+        heatmap(data, **kwargs)
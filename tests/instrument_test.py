@@ -0,0 +1,98 @@
+"""
+Tests for the stage instrumentation in `instrument`.
+
+These tests verify that nothing is recorded outside record_stages(), that
+stages record nesting, chart labels and failures, that template and layout
+steps are timed, that events can be totalled with summarise(), and that
+export_charts() passes on the stages timed in its worker processes.
+"""
+
+import pandas as pd
+import plotly.graph_objects as go
+import pytest
+
+from afcharts.charts import line_chart
+from afcharts.export import ExportJob, export_charts
+from afcharts.instrument import StageEvent, record_stages, stage, summarise
+from afcharts.margins import apply_fixed_margins
+
+
+def build_plotly_chart(n):
+    return go.Figure(go.Bar(x=list(range(n)), y=list(range(n))))
+
+
+def test_stage_does_nothing_when_not_recording():
+    """
+    Verify stage() returns a shared do-nothing context manager outside record_stages().
+    """
+    assert stage("write") is stage("build")
+
+
+def test_record_stages_collects_nested_events():
+    """
+    Verify chart helpers emit their stages with nesting and chart labels.
+    """
+    data = pd.Series(range(10_000), dtype="float64")
+
+    with record_stages() as events:
+        with stage("report", chart="weekly"):
+            line_chart(data, max_points=100)
+
+    stages = {event.stage: event for event in events}
+
+    assert {"downsample", "figure_build", "template_apply", "report"} <= set(stages)
+    assert stages["downsample"].parent == "report"
+    assert stages["downsample"].chart == "weekly"
+    assert stages["report"].wall >= stages["downsample"].wall
+    assert summarise(events)["downsample"]["count"] == 1
+
+
+def test_template_and_layout_stages():
+    """
+    Verify template merges are timed inside template_apply and layout updates inside figure_build.
+    """
+    data = pd.Series(range(100), dtype="float64")
+
+    with record_stages() as events:
+        fig = line_chart(data)
+        apply_fixed_margins(fig)
+        go.Figure(layout={"template": "afcharts+presentation"})
+
+    parents = [(event.stage, event.parent) for event in events]
+
+    assert ("layout", "figure_build") in parents
+    assert ("template_merge", "template_apply") in parents
+    assert ("template_merge", None) in parents
+    assert ("layout", None) in parents
+
+
+def test_record_stages_callback_and_failures():
+    """
+    Verify events go to the callback and a stage that raises is marked as failed.
+    """
+    received: list[StageEvent] = []
+
+    with record_stages(received.append) as events:
+        with pytest.raises(RuntimeError):
+            with stage("build"):
+                raise RuntimeError("no data")
+
+    assert events == []
+    assert received[0].stage == "build"
+    assert received[0].failed
+
+
+def test_export_charts_forwards_worker_stages(tmp_path):
+    """
+    Verify stages timed in the export workers reach the recorder with the job's path.
+    """
+    jobs = [ExportJob(tmp_path / f"chart_{n}.json", build_plotly_chart, args=(n,)) for n in range(2, 4)]
+
+    with record_stages() as events:
+        results = list(export_charts(jobs, max_workers=1))
+
+    totals = summarise(events)
+
+    assert all(result.ok for result in results)
+    assert totals["export"]["count"] == totals["build"]["count"] == totals["write"]["count"] == 2
+    assert {event.chart for event in events} == {str(job.path) for job in jobs}
@@ -0,0 +1,68 @@
+"""
+Tests for the lazy import behaviour of afcharts.
+
+Each test runs in a fresh interpreter so the modules loaded by other tests do
+not affect the result. They check that `import afcharts` stays cheap and that
+the plotly templates are registered when `afcharts.pio_template` is imported
+but only built the first time they are used.
+"""
+
+import subprocess
+import sys
+
+
+def run_python(code):
+    """
+    Run `code` in a fresh interpreter and return its standard output.
+    """
+    return subprocess.run([sys.executable, "-c", code], check=True, capture_output=True, text=True).stdout.strip()
+
+
+def test_import_afcharts_loads_no_plotting_libraries():
+    """
+    Verify importing the top-level package does not import plotly, matplotlib or PyYAML.
+    """
+    output = run_python(
+        "import sys, afcharts; print(sorted(m for m in ('plotly', 'matplotlib', 'yaml') if m in sys.modules))"
+    )
+    assert output == "[]"
+
+
+def test_submodules_load_on_attribute_access():
+    """
+    Verify submodules are available as attributes of the package without an explicit import.
+    """
+    output = run_python("import afcharts; print(afcharts.af_colours.get_af_colours('duo'))")
+    assert output == "('#12436D', '#F46A25')"
+
+
+def test_template_built_on_first_use():
+    """
+    Verify the afcharts templates are registered at import but only built when they are first used.
+    """
+    output = run_python(
+        "from afcharts.pio_template import build_afcharts_template, pio\n"
+        "print('afcharts' in pio.templates, 'afcharts-large' in list(pio.templates))\n"
+        "print(build_afcharts_template.cache_info().currsize)\n"
+        "pio.templates.default = 'afcharts'\n"
+        "print(build_afcharts_template.cache_info().currsize, pio.templates['afcharts'].layout.hovermode)\n"
+    )
+    assert output.splitlines() == ["True True", "0", "1 x unified"]
+
+
+def test_registered_templates_behave_like_plotly_templates():
+    """
+    Verify lazily registered templates work in figures and template lists, and can be replaced and removed.
+    """
+    output = run_python(
+        "import plotly.graph_objects as go\n"
+        "from afcharts.pio_template import pio\n"
+        "fig = go.Figure(layout={'template': 'afcharts+presentation'})\n"
+        "print(fig.layout.template.layout.hovermode)\n"
+        "print(sorted({type(template).__name__ for name, template in pio.templates.items() if 'afcharts' in name}))\n"
+        "pio.templates['afcharts-large'] = go.layout.Template(layout={'hovermode': 'closest'})\n"
+        "print(pio.templates['afcharts-large'].layout.hovermode)\n"
+        "del pio.templates['afcharts']\n"
+        "print('afcharts' in pio.templates, len(pio.templates) == len(list(pio.templates)))\n"
+    )
+    assert output.splitlines() == ["x unified", "['Template']", "closest", "False True"]
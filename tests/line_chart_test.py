@@ -0,0 +1,60 @@
+"""
+Tests for the `line_chart` helper in `charts`.
+
+These tests verify that long series are downsampled before they reach the
+plotting library and that both backends return a styled figure.
+"""
+
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+import pytest
+from matplotlib.figure import Figure
+
+from afcharts.charts import line_chart
+
+index = pd.date_range("2024-01-01", periods=50_000, freq="min")
+df = pd.DataFrame({"a": np.sin(np.arange(50_000) / 500), "b": np.cos(np.arange(50_000) / 500)}, index=index)
+
+
+def test_plotly_line_chart_downsampled():
+    """
+    Verify the plotly chart has one downsampled trace per column with the afcharts template.
+    """
+    fig = line_chart(df, max_points=1_000)
+
+    assert isinstance(fig, go.Figure)
+    assert len(fig.data) == 2
+    assert len(fig.data[0].x) <= 2_000
+    assert fig.layout.template.layout.hovermode == "x unified"
+
+
+def test_plotly_line_chart_without_downsampling():
+    """
+    Verify max_points=None plots every point.
+    """
+    fig = line_chart(df["a"], max_points=None)
+
+    assert len(fig.data[0].x) == len(df)
+
+
+def test_matplotlib_line_chart_styled():
+    """
+    Verify the matplotlib chart uses the afcharts style.
+    """
+    fig = line_chart(df, backend="matplotlib", max_points=1_000, title="Test")
+    ax = fig.axes[0]
+
+    assert isinstance(fig, Figure)
+    assert len(ax.lines) == 2
+    assert len(ax.lines[0].get_xdata()) <= 2_000
+    assert not ax.spines["top"].get_visible()
+    assert ax.lines[0].get_color().upper() == "#12436D"
+
+
+def test_invalid_backend():
+    """
+    Verify an unknown backend triggers a ValueError.
+    """
+    with pytest.raises(ValueError):
+        line_chart(df, backend="bokeh")
@@ -0,0 +1,150 @@
+"""
+Tests for the fixed margins computed in `margins`.
+
+These tests verify text widths from the Helvetica font metrics, that
+the predicted tick labels match plotly.js's automatic ticks, and that
+margins grow with the labels and titles of a figure, are applied to figures
+and dicts with `automargin` turned off, and are skipped for figures that
+cannot be estimated. Date labels follow the axis's tickformat.
+"""
+
+import numpy as np
+import plotly.graph_objects as go
+import pytest
+
+import afcharts.pio_template  # noqa: F401
+from afcharts.margins import (
+    UnsupportedFigure,
+    _date_tick_labels,
+    _linear_tick_labels,
+    apply_fixed_margins,
+    estimate_margins,
+    text_width,
+)
+
+
+def test_text_width():
+    """
+    Verify text widths add up the Helvetica widths of the characters, with unknown characters the width of a digit.
+    """
+    assert text_width("Hello", 10) == pytest.approx((722 + 556 + 222 + 222 + 556) / 100)
+    assert text_width("−1,000", 20) == pytest.approx((584 + 4 * 556 + 278) / 50)
+    assert text_width("中", 10) == text_width("0", 10)
+
+
+@pytest.mark.parametrize(
+    "low, high, length, letter, expected",
+    [
+        (0, 105, 400, "y", ["0", "20", "40", "60", "80", "100"]),
+        (-2e6, 5.3e6, 600, "x", ["−2M", "−1M", "0", "1M", "2M", "3M", "4M", "5M"]),
+        (0.5, 3.5, 300, "y", ["0.5", "1", "1.5", "2", "2.5", "3", "3.5"]),
+        (0, 0.034, 300, "y", ["0", "0.005", "0.01", "0.015", "0.02", "0.025", "0.03"]),
+    ],
+)
+def test_linear_tick_labels(low, high, length, letter, expected):
+    """
+    Verify tick labels follow plotly.js's spacing, rounding, minus sign and SI suffixes.
+    """
+    assert _linear_tick_labels(low, high, length, letter) == expected
+
+
+def test_estimate_margins_grows_with_labels_and_titles():
+    """
+    Verify the left margin grows with longer y tick labels and a y axis title.
+    """
+    small = go.Figure(go.Scatter(x=[1, 2, 3], y=[1, 2, 3]), layout={"template": "afcharts"})
+    large = go.Figure(go.Scatter(x=[1, 2, 3], y=[1000, 2000, 3000]), layout={"template": "afcharts"})
+    titled = go.Figure(large).update_layout(yaxis_title="Count")
+
+    small_margins = estimate_margins(small)
+    large_margins = estimate_margins(large)
+
+    assert small_margins["l"] < large_margins["l"] < estimate_margins(titled)["l"]
+    assert small_margins["xaxis_tickangle"] == 0
+    assert small_margins["t"] == small_margins["r"] == 10
+
+
+def test_estimate_margins_rotates_crowded_categories():
+    """
+    Verify long category labels on a narrow figure are rotated and give a deeper bottom margin.
+    """
+    names = [f"Local authority {index}" for index in range(12)]
+    wide = go.Figure(go.Bar(x=names[:3], y=[1, 2, 3]), layout={"template": "afcharts", "width": 900})
+    crowded = go.Figure(go.Bar(x=names, y=np.arange(12)), layout={"template": "afcharts", "width": 500})
+
+    wide_margins = estimate_margins(wide)
+    crowded_margins = estimate_margins(crowded)
+
+    assert wide_margins["xaxis_tickangle"] == 0
+    assert crowded_margins["xaxis_tickangle"] in (30, 90)
+    assert crowded_margins["b"] > wide_margins["b"]
+
+
+def test_estimate_margins_horizontal_bars():
+    """
+    Verify category labels of horizontal bars set the left margin.
+    """
+    fig = go.Figure(
+        go.Bar(x=[3, 5], y=["Scotland", "Northern Ireland"], orientation="h"), layout={"template": "afcharts"}
+    )
+    font_size = fig.layout.template.layout.yaxis.tickfont.size
+
+    assert estimate_margins(fig)["l"] > text_width("Northern Ireland", font_size)
+
+
+def test_estimate_margins_date_tick_format():
+    """
+    Verify date labels are written with the axis's tickformat, so a year-only format needs a shallower bottom margin.
+    """
+    dates = np.array(["2024-01-01", "2024-09-30"], dtype="datetime64[D]")
+    fig = go.Figure(go.Scatter(x=dates, y=[1, 2]), layout={"template": "afcharts"})
+    year_only = go.Figure(fig).update_layout(xaxis_tickformat="%Y")
+
+    assert _date_tick_labels([dates], "%d %B %Y") == ["01 January 2024", "30 September 2024"]
+    assert _date_tick_labels([dates], None) == _date_tick_labels([np.array(["not a date"])], "%Y")
+    assert estimate_margins(year_only)["b"] < estimate_margins(fig)["b"]
+
+
+def test_fixed_margins_for_bars_given_only_values():
+    """
+    Verify bars given only y values are placed at 0, 1, 2, ... and get fixed margins.
+    """
+    values_only = go.Figure(go.Bar(y=[3, 5, 1200]), layout={"template": "afcharts"})
+    explicit = go.Figure(go.Bar(x=[0, 1, 2], y=[3, 5, 1200]), layout={"template": "afcharts"})
+
+    assert estimate_margins(values_only) == estimate_margins(explicit)
+    apply_fixed_margins(values_only)
+    assert values_only.layout.yaxis.automargin is False
+
+
+def test_apply_fixed_margins_figure_and_dict():
+    """
+    Verify fixed margins are applied with automargin off, the same for a figure and a dict.
+    """
+    fig = go.Figure(go.Scatter(x=[1, 2, 3], y=[10, 20, 30]), layout={"template": "afcharts"})
+    figure_dict = fig.to_plotly_json()
+    expected = estimate_margins(fig)
+
+    assert apply_fixed_margins(fig) is fig
+    assert fig.layout.xaxis.automargin is False
+    assert fig.layout.yaxis.automargin is False
+    assert fig.layout.margin.l == expected["l"]
+    assert apply_fixed_margins(figure_dict)["layout"]["margin"] == fig.layout.margin.to_plotly_json()
+
+
+@pytest.mark.parametrize(
+    "layout",
+    [{"xaxis2": {"anchor": "y"}}, {"yaxis_type": "log"}, {"font_family": "Courier New"}],
+    ids=["several axes", "log axis", "unmeasured font"],
+)
+def test_apply_fixed_margins_skips_unsupported_figures(layout):
+    """
+    Verify figures with several axes, a log axis or a font without built-in metrics keep automargin.
+    """
+    fig = go.Figure(go.Scatter(x=[1, 2], y=[1, 2]), layout={"template": "afcharts", **layout})
+
+    with pytest.raises(UnsupportedFigure):
+        estimate_margins(fig)
+    apply_fixed_margins(fig)
+    assert fig.layout.xaxis.automargin is None
+    assert fig.layout.margin.l is None
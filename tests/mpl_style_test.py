@@ -0,0 +1,118 @@
+"""
+Tests for the precompiled matplotlib style in `mpl_style`.
+
+These tests verify that the precompiled parameters match afcharts.mplstyle,
+that afcharts_style() applies them to one block and restores the previous
+values as a context manager or decorator, that the styles are registered
+under their names, and that dense artists are rasterised for vector output.
+"""
+
+import io
+
+import matplotlib
+import matplotlib.style
+import numpy as np
+from matplotlib.figure import Figure
+
+from afcharts.mpl_style import (
+    afcharts_style,
+    get_afcharts_large_rc_params,
+    get_afcharts_rc_params,
+    large_style_name,
+    mplstyle_path,
+    rasterise_dense_artists,
+    register_afcharts_style,
+    style_name,
+)
+
+
+def test_rc_params_match_style_file():
+    """
+    Verify the precompiled parameters match those applied from the style file.
+    """
+    rc_params = get_afcharts_rc_params()
+
+    with matplotlib.style.context(mplstyle_path):
+        assert all(matplotlib.rcParams[key] == value for key, value in rc_params.items())
+    assert rc_params["axes.spines.top"] is False
+
+
+def test_afcharts_style_restores_previous_values():
+    """
+    Verify the style applies inside the block and the previous values are restored after it.
+    """
+    with matplotlib.rc_context({"axes.grid": False, "lines.linewidth": 5}):
+        with afcharts_style():
+            fig = Figure()
+            ax = fig.add_subplot()
+            assert matplotlib.rcParams["axes.grid"] is True
+            assert matplotlib.rcParams["lines.linewidth"] == 2
+
+        assert matplotlib.rcParams["axes.grid"] is False
+        assert matplotlib.rcParams["lines.linewidth"] == 5
+        assert not ax.spines["top"].get_visible()
+
+
+def test_afcharts_style_as_decorator():
+    """
+    Verify afcharts_style() styles the figures built by a decorated function.
+    """
+
+    @afcharts_style()
+    def build_chart():
+        fig = Figure()
+        line = fig.add_subplot().plot([1, 2, 3])[0]
+        return line
+
+    with matplotlib.rc_context({"axes.titlelocation": "center"}):
+        assert build_chart().get_color() == "#12436D"
+        assert matplotlib.rcParams["axes.titlelocation"] == "center"
+
+
+def test_register_afcharts_style():
+    """
+    Verify the style can be applied by name once registered.
+    """
+    register_afcharts_style()
+
+    assert style_name in matplotlib.style.available
+    with matplotlib.style.context(style_name):
+        assert matplotlib.rcParams["axes.titlelocation"] == "left"
+    with matplotlib.style.context(large_style_name):
+        assert matplotlib.rcParams["axes.titlelocation"] == "left"
+        assert matplotlib.rcParams["agg.path.chunksize"] == 10_000
+
+
+def test_afcharts_large_style():
+    """
+    Verify the large style keeps every afcharts parameter and adds path simplification and chunking.
+    """
+    large = get_afcharts_large_rc_params()
+
+    assert {key: large[key] for key in get_afcharts_rc_params()} == dict(get_afcharts_rc_params())
+    assert large["path.simplify"] is True
+    with afcharts_style(large=True):
+        assert matplotlib.rcParams["agg.path.chunksize"] == 10_000
+        assert matplotlib.rcParams["lines.linewidth"] == 2
+    assert matplotlib.rcParams["agg.path.chunksize"] == 0
+
+
+def test_rasterise_dense_artists():
+    """
+    Verify lines, scatters and meshes with many points are rasterised in SVG output and small artists are not.
+    """
+    x = np.arange(20_000)
+    fig = Figure()
+    ax = fig.add_subplot()
+    dense_line, small_line = ax.plot(x, x) + ax.plot([0, 1])
+    dense_scatter = ax.scatter(x, x)
+    mesh = ax.pcolormesh(np.zeros((150, 150)))
+
+    rasterised = rasterise_dense_artists(fig)
+
+    assert rasterised == [dense_line, dense_scatter, mesh]
+    assert not small_line.get_rasterized()
+    assert rasterise_dense_artists(fig, threshold=1) == [dense_line, small_line, dense_scatter, mesh]
+    buffer = io.BytesIO()
+    fig.savefig(buffer, format="svg")
+    assert b"<image" in buffer.getvalue()
@@ -0,0 +1,48 @@
+"""
+Tests for the "afcharts-large" plotly template and template selection.
+
+These tests verify that the large template keeps the afcharts look while
+styling WebGL scatter traces and using nearest-point hover, and that
+`apply_afcharts_template` only switches to it for traces above the threshold.
+"""
+
+import numpy as np
+import plotly.graph_objects as go
+
+from afcharts.pio_template import apply_afcharts_template, pio, select_afcharts_template
+
+
+def test_large_template_matches_afcharts_look():
+    """
+    Verify the large template shares the afcharts layout apart from the hover and text settings.
+    """
+    afcharts = pio.templates["afcharts"]
+    large = pio.templates["afcharts-large"]
+
+    assert large.layout.colorway == afcharts.layout.colorway
+    assert large.layout.font == afcharts.layout.font
+    assert large.layout.hovermode == "closest"
+    assert afcharts.layout.hovermode == "x unified"
+    assert large.layout.uniformtext.mode is False
+    assert large.data.scattergl[0].line.width == afcharts.data.scatter[0].line.width
+
+
+def test_template_selected_by_trace_size():
+    """
+    Verify the large template is only chosen once a trace passes the threshold.
+    """
+    small = go.Figure(go.Scatter(x=np.arange(10), y=np.arange(10)))
+    large = go.Figure(go.Scattergl(x=np.arange(1_000), y=np.arange(1_000)))
+
+    assert select_afcharts_template(small, threshold=100) == "afcharts"
+    assert select_afcharts_template(large, threshold=100) == "afcharts-large"
+    assert select_afcharts_template(large.to_dict(), threshold=100) == "afcharts-large"
+
+
+def test_apply_afcharts_template():
+    """
+    Verify apply_afcharts_template sets the chosen template on the figure.
+    """
+    fig = apply_afcharts_template(go.Figure(go.Scattergl(y=np.arange(1_000))), threshold=100)
+
+    assert fig.layout.template.layout.hovermode == "closest"
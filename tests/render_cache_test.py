@@ -0,0 +1,165 @@
+"""
+Tests for the content-addressed render cache in `render_cache`.
+
+These tests verify that cache keys follow the content of a chart, that
+cached files are restored instead of rendered, that the cache is trimmed
+to its size limit by least recent use, and that export_charts() skips
+charts already in the cache but renders again when a build function draws
+something new. They also verify the style fingerprint follows edits to the
+style files and the matplotlib version.
+"""
+
+import os
+import shutil
+
+import matplotlib
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+import pytest
+from matplotlib.figure import Figure
+
+from afcharts import render_cache
+from afcharts.export import ExportJob, export_charts
+from afcharts.render_cache import RenderCache, style_fingerprint
+
+
+def build_plotly_chart(n):
+    return go.Figure(go.Bar(x=list(range(n)), y=list(range(n))))
+
+
+def build_chart_from_file(path):
+    values = [float(value) for value in path.read_text().split()]
+    return go.Figure(go.Bar(y=values))
+
+
+def build_matplotlib_chart():
+    fig = Figure()
+    fig.add_subplot().plot([1, 2, 3])
+    return fig
+
+
+def test_key_follows_content(tmp_path):
+    """
+    Verify equal figures share a key while different data or output formats do not.
+    """
+    cache = RenderCache(tmp_path)
+    y = np.arange(1000, dtype="float64")
+
+    key = cache.key(go.Figure(go.Scatter(y=y)), ".png")
+
+    assert cache.key(go.Figure(go.Scatter(y=y.copy())), ".png") == key
+    assert cache.key(go.Figure(go.Scatter(y=y + 1)), ".png") != key
+    assert cache.key(go.Figure(go.Scatter(y=y)), ".svg") != key
+    assert cache.key(pd.Series(y)) != cache.key(pd.Series(y, index=y))
+
+
+def test_key_rejects_values_without_content(tmp_path):
+    """
+    Verify objects that cannot be hashed by value raise a TypeError rather than risking a false hit.
+    """
+    cache = RenderCache(tmp_path)
+
+    with pytest.raises(TypeError, match="cache key"):
+        cache.key(Figure())
+
+    with pytest.raises(TypeError, match="cache key"):
+        cache.key(lambda n: n)
+
+
+def test_restore_and_evict(tmp_path):
+    """
+    Verify stored files are restored and the least recently used files are evicted first.
+    """
+    cache = RenderCache(tmp_path / "cache", max_bytes=250)
+    output = tmp_path / "chart.svg"
+    for n, key in enumerate(["a", "b", "c"]):
+        output.write_bytes(b"x" * 100)
+        cache.store(key, output)
+        os.utime(cache.path(key, ".svg"), ns=(n, n))
+
+    assert cache.restore("a", tmp_path / "restored.svg")
+    assert not cache.restore("d", tmp_path / "missing.svg")
+    assert cache.evict() == 1
+    assert sorted(path.stem for path in cache.directory.iterdir()) == ["a", "c"]
+    assert (cache.stats.hits, cache.stats.misses, cache.stats.evictions) == (1, 1, 1)
+
+
+def test_export_charts_uses_cache(tmp_path):
+    """
+    Verify a second export of the same charts copies them from the cache.
+    """
+    cache = RenderCache(tmp_path / "cache")
+
+    def jobs(directory):
+        return [ExportJob(tmp_path / directory / f"chart_{n}.json", build_plotly_chart, args=(n,)) for n in range(2, 5)]
+
+    first = list(export_charts(jobs("first"), max_workers=1, cache=cache))
+    second = list(export_charts(jobs("second"), max_workers=1, cache=cache))
+
+    assert all(result.ok and not result.cached for result in first)
+    assert all(result.ok and result.cached for result in second)
+    assert (cache.stats.hits, cache.stats.misses) == (3, 3)
+    assert (tmp_path / "second" / "chart_2.json").read_bytes() == (tmp_path / "first" / "chart_2.json").read_bytes()
+
+
+def test_export_charts_renders_when_build_output_changes(tmp_path):
+    """
+    Verify a build function whose output changes between runs with the same arguments is rendered again.
+    """
+    cache = RenderCache(tmp_path / "cache")
+    data = tmp_path / "data.txt"
+
+    def export(directory):
+        job = ExportJob(tmp_path / directory / "chart.json", build_chart_from_file, args=(data,))
+        return list(export_charts([job], max_workers=1, cache=cache))[0]
+
+    data.write_text("1 2 3")
+    first = export("first")
+    data.write_text("1 2 4")
+    second = export("second")
+    third = export("third")
+
+    assert first.ok and second.ok and third.ok
+    assert not first.cached and not second.cached and third.cached
+    assert "4.0" in (tmp_path / "second" / "chart.json").read_text()
+
+
+def test_export_charts_renders_uncacheable_build_jobs(tmp_path):
+    """
+    Verify matplotlib figures from build functions without a cache key are rendered every time.
+    """
+    cache = RenderCache(tmp_path / "cache")
+
+    for _ in range(2):
+        job = ExportJob(tmp_path / "chart.png", build_matplotlib_chart)
+        [result] = export_charts([job], max_workers=1, cache=cache)
+        assert result.ok and not result.cached
+
+    assert not list((tmp_path / "cache").iterdir())
+
+
+def test_style_fingerprint_follows_style_files(tmp_path, monkeypatch):
+    """
+    Verify editing either mplstyle file or changing the matplotlib version changes the style fingerprint.
+    """
+    package_dir = tmp_path / "afcharts"
+    shutil.copytree(render_cache._PACKAGE_DIR / "config", package_dir / "config")
+    for style_file in render_cache._PACKAGE_DIR.glob("*.mplstyle"):
+        shutil.copy(style_file, package_dir)
+    monkeypatch.setattr(render_cache, "_PACKAGE_DIR", package_dir)
+    original = style_fingerprint()
+
+    style = package_dir / "afcharts.mplstyle"
+    style.write_text(style.read_text() + "\nlines.linewidth: 9\n")
+    os.utime(style, ns=(0, 0))
+    edited = style_fingerprint()
+
+    large_style = package_dir / "afcharts_large.mplstyle"
+    large_style.write_text(large_style.read_text() + "\nlines.linewidth: 9\n")
+    os.utime(large_style, ns=(0, 0))
+    edited_large = style_fingerprint()
+
+    monkeypatch.setattr(matplotlib, "__version__", "0.0.0")
+
+    assert len({original, edited, edited_large, style_fingerprint()}) == 4
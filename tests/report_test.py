@@ -0,0 +1,78 @@
+"""
+Tests for the HTML report writer in `report`.
+
+These tests verify that plotly.js and the afcharts templates are written
+once however many figures a report holds, that figure data is written
+safely inside the page, and that a closed report cannot be added to.
+"""
+
+import io
+import json
+import re
+
+import numpy as np
+import plotly.graph_objects as go
+import pytest
+from plotly.offline import get_plotlyjs
+
+from afcharts.pio_template import build_afcharts_template
+from afcharts.report import HTMLReport, write_html_report
+
+
+def build_figures(n):
+    template = build_afcharts_template()
+    for index in range(n):
+        yield go.Figure(go.Bar(y=np.arange(50) * index), layout={"template": template})
+
+
+def test_report_includes_plotlyjs_and_templates_once(tmp_path):
+    """
+    Verify plotly.js and the template appear once and each figure adds only its data.
+    """
+    small = tmp_path / "small.html"
+    large = tmp_path / "large.html"
+
+    assert write_html_report(build_figures(2), small) == 2
+    assert write_html_report(build_figures(50), large) == 50
+
+    page = large.read_text(encoding="utf-8")
+    per_figure = (large.stat().st_size - small.stat().st_size) / 48
+
+    assert page.count(get_plotlyjs()[:500]) == 1
+    assert page.count("var afchartsTemplates") == 1
+    assert page.count('afchartsRegister("afcharts-figure-') == 50
+    assert per_figure < 1000
+
+
+def test_figure_data_is_escaped_and_references_template():
+    """
+    Verify figure JSON cannot end its script element and refers to the template by name.
+    """
+    stream = io.StringIO()
+    fig = go.Figure(go.Scatter(y=[1, 2]), layout={"template": build_afcharts_template(), "title": "</script>"})
+
+    with HTMLReport(stream, include_plotlyjs=False, lazy=False) as report:
+        report.add_figure(fig, alt_text='Two "points"')
+
+    page = stream.getvalue()
+    data = re.search(r'<script type="application/json" id="afcharts-figure-1-data">(.*?)</script>', page, re.S)
+
+    assert data is not None
+    figure = json.loads(data.group(1))
+
+    assert figure["layout"]["title"]["text"] == "</script>"
+    assert figure["layout"]["template"] == "afcharts"
+    assert 'aria-label="Two &quot;points&quot;"' in page
+    assert "var lazy = false" in page
+    assert page.endswith("</html>\n")
+
+
+def test_closed_report_rejects_figures():
+    """
+    Verify adding to a closed report raises a ValueError.
+    """
+    report = HTMLReport(io.StringIO(), include_plotlyjs=False)
+    report.close()
+
+    with pytest.raises(ValueError, match="closed"):
+        report.add_figure(go.Figure())
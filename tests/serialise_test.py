@@ -0,0 +1,102 @@
+"""
+Tests for the compact figure serialiser in `serialise`.
+
+These tests verify that numeric arrays are packed in the smallest exact
+typed array dtype, that the afcharts template is written as a reference
+which plotly resolves again, and that figures are written in chunks rather
+than as one string.
+"""
+
+import base64
+import io
+import json
+
+import numpy as np
+import plotly.graph_objects as go
+import pytest
+
+from afcharts.fast_figure import build_figure_dict
+from afcharts.pio_template import build_afcharts_template
+from afcharts.serialise import compact_figure, smallest_typed_array, templates_json, write_compact_json
+
+
+def decode(spec):
+    return np.frombuffer(base64.b64decode(spec["bdata"]), dtype=f"<{spec['dtype']}")
+
+
+@pytest.mark.parametrize(
+    "values, dtype",
+    [
+        ([0, 1, 255], "u1"),
+        ([-1, 0, 127], "i1"),
+        ([0, 70_000], "u4"),
+        ([0.0, 2.0, 300.0], "u2"),
+        ([0.5, 1.25, np.nan], "f4"),
+        ([0.1, 0.2], "f8"),
+        ([0, 2**40], "f8"),
+    ],
+)
+def test_smallest_typed_array(values, dtype):
+    """
+    Verify values are packed in the smallest dtype holding them exactly.
+    """
+    packed = smallest_typed_array(values)
+
+    assert packed is not None
+    assert packed.dtype.str[1:] == dtype
+    np.testing.assert_array_equal(packed.astype("float64"), np.asarray(values, dtype="float64"))
+
+
+def test_smallest_typed_array_rejects_non_numeric():
+    """
+    Verify strings and integers too large for a float64 are left alone.
+    """
+    assert smallest_typed_array(["a", "b"]) is None
+    assert smallest_typed_array([0, 2**60]) is None
+
+
+def test_write_compact_json_round_trip():
+    """
+    Verify written figures keep their values, reference the template and load back into plotly.
+    """
+    y = np.arange(1000, dtype="float64") / 4
+    z = np.arange(20, dtype="int64").reshape(4, 5)
+    fig = go.Figure([go.Scatter(y=y), go.Heatmap(z=z)], layout={"template": build_afcharts_template()})
+    stream = io.StringIO()
+
+    write_compact_json(fig, stream)
+    figure = json.loads(stream.getvalue())
+
+    scatter, heatmap = figure["data"]
+
+    assert scatter["y"]["dtype"] == "f4"
+    np.testing.assert_array_equal(decode(scatter["y"]), y)
+    assert heatmap["z"]["shape"] == "4, 5"
+    np.testing.assert_array_equal(decode(heatmap["z"]).reshape(4, 5), z)
+    assert figure["layout"]["template"] == "afcharts"
+    assert go.Figure(figure).layout.template.layout.bargap == fig.layout.template.layout.bargap
+    assert "afcharts-large" in json.loads(templates_json())
+
+
+def test_write_compact_json_writes_in_chunks():
+    """
+    Verify a large array is written in chunks rather than as one string.
+    """
+    writes: list[str] = []
+    fig = go.Figure(go.Scatter(y=np.random.default_rng(0).standard_normal(500_000)))
+
+    write_compact_json(fig, type("Stream", (), {"write": staticmethod(writes.append)})())
+
+    assert max(len(chunk) for chunk in writes) <= 2**18
+    assert len(decode(json.loads("".join(writes))["data"][0]["y"])) == 500_000
+
+
+def test_compact_figure_dict_input():
+    """
+    Verify figure dicts keep short arrays as lists and a baked-in template as it is.
+    """
+    figure = compact_figure(build_figure_dict([{"x": [1, 2], "y": list(range(10))}]))
+
+    assert figure["data"][0]["x"] == [1, 2]
+    assert figure["data"][0]["y"]["dtype"] == "u1"
+    assert figure["layout"]["template"] == {}
@@ -0,0 +1,207 @@
+"""
+Tests for streaming chart updates in `streaming`.
+
+These tests verify that the rolling window keeps only the newest points,
+that plotly updates hold only the new points in the forms used by Dash and
+plotly.js, and that matplotlib updates redraw only the lines until the data
+leaves the axes, without stopping the figure being saved to vector formats.
+"""
+
+import io
+
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+import pytest
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+
+from afcharts.charts import line_chart
+from afcharts.streaming import MatplotlibStream, PlotlyStream, _RollingBuffer
+
+
+def test_rolling_buffer_keeps_window():
+    """
+    Verify the buffer keeps the newest values in order, reports dropped values and widens its dtype.
+    """
+    buffer = _RollingBuffer(5, np.arange(3))
+
+    assert buffer.extend([3, 4]) == 0
+    assert buffer.extend([5, 6, 7]) == 3
+    np.testing.assert_array_equal(buffer.view(), [3, 4, 5, 6, 7])
+    for start in range(8, 40, 2):
+        buffer.extend([start, start + 1])
+    np.testing.assert_array_equal(buffer.view(), [35, 36, 37, 38, 39])
+
+    buffer.extend([0.5])
+    assert buffer.view().dtype == np.float64
+    np.testing.assert_array_equal(buffer.view(), [36, 37, 38, 39, 0.5])
+
+
+def test_plotly_stream_update():
+    """
+    Verify an update holds only the new points and the figure keeps the rolling window.
+    """
+    fig = go.Figure([go.Scatter(x=np.arange(8.0), y=np.zeros(8)), go.Scatter(x=[0, 1], y=[1, 1])])
+    stream = PlotlyStream(fig, window=10)
+
+    update = stream.extend({0: ([8.0, 9.0, 10.0], [1.0, 2.0, 3.0])})
+    data, traces, max_points = update.extend_data()
+
+    np.testing.assert_array_equal(data["x"][0], [8, 9, 10])
+    assert traces == [0]
+    assert max_points == 10
+    assert update.dropped == {"x": [1], "y": [1]}
+    figure = stream.figure()
+    np.testing.assert_array_equal(figure["data"][0]["x"], np.arange(1.0, 11.0))
+    np.testing.assert_array_equal(figure["data"][1]["y"], [1, 1])
+    assert isinstance(go.Figure(figure), go.Figure)
+
+
+def test_plotly_stream_keeps_template_and_dates():
+    """
+    Verify a styled line chart with a datetime index streams dates and keeps its template.
+    """
+    index = pd.date_range("2024-01-01", periods=5, freq="D")
+    stream = PlotlyStream(line_chart(pd.Series(np.arange(5.0), index=index)), window=5)
+
+    stream.extend({0: (pd.date_range("2024-01-06", periods=2, freq="D"), [5.0, 6.0])})
+    figure = go.Figure(stream.figure())
+
+    assert list(figure.data[0].y) == [2, 3, 4, 5, 6]
+    assert pd.Timestamp(figure.data[0].x[-1]) == pd.Timestamp("2024-01-07")
+    assert figure.layout.template.layout.hovermode == "x unified"
+
+
+def test_plotly_stream_with_implicit_x():
+    """
+    Verify a trace given only y keeps x and y in step, with x filled from x0 and dx.
+    """
+    stream = PlotlyStream(go.Figure(go.Bar(y=[1.0, 2.0, 3.0], x0=10, dx=2)), window=4)
+
+    update = stream.extend({0: ([16, 18], [4.0, 5.0])})
+    figure = stream.figure()
+
+    assert update.dropped == {"x": [1], "y": [1]}
+    np.testing.assert_array_equal(figure["data"][0]["x"], [12, 14, 16, 18])
+    np.testing.assert_array_equal(figure["data"][0]["y"], [2, 3, 4, 5])
+    with pytest.raises(ValueError, match="x0 and dx must be numbers"):
+        PlotlyStream({"data": [{"y": [1], "x0": "2024-01-01"}], "layout": {}})
+
+
+def test_plotly_update_javascript():
+    """
+    Verify the update can be written as a Plotly.extendTraces call.
+    """
+    stream = PlotlyStream({"data": [{"type": "scatter", "x": [0], "y": [0]}], "layout": {}}, window=100)
+
+    script = stream.extend({0: ([1, 2], [3, 4])}).javascript("live-chart")
+
+    assert script == 'Plotly.extendTraces("live-chart", {"x": [[1, 2]], "y": [[3, 4]]}, [0], 100);'
+
+
+def test_plotly_update_patch():
+    """
+    Verify the update can be written as a Dash Patch.
+    """
+    pytest.importorskip("dash")
+    stream = PlotlyStream({"data": [{"x": [0, 1], "y": [0, 1]}], "layout": {}}, window=2)
+
+    patch = stream.extend({0: ([2], [2])}).patch()
+
+    assert patch.to_plotly_json()["operations"]
+
+
+def test_plotly_stream_errors():
+    """
+    Verify an empty window and mismatched x and y lengths trigger a ValueError.
+    """
+    with pytest.raises(ValueError, match="window"):
+        PlotlyStream(go.Figure(), window=0)
+    stream = PlotlyStream(go.Figure(go.Scatter(x=[0], y=[0])))
+    with pytest.raises(ValueError, match="different lengths"):
+        stream.extend({0: ([1, 2], [1])})
+
+
+def make_matplotlib_stream(window=100):
+    fig = Figure()
+    FigureCanvasAgg(fig)
+    ax = fig.add_subplot()
+    ax.plot(np.arange(50.0), np.zeros(50))
+    ax.set_xlim(0, 100)
+    ax.set_ylim(-1, 1)
+    return fig, MatplotlibStream(ax.lines, window=window)
+
+
+def test_matplotlib_stream_blits_inside_axes():
+    """
+    Verify points inside the axes redraw only the line, after one full draw.
+    """
+    fig, stream = make_matplotlib_stream()
+
+    assert stream.extend({0: ([50.0], [0.5])}) is True
+    assert stream.full_draws == 1
+    for x in range(51, 90):
+        assert stream.extend({0: ([float(x)], [0.5])}) is False
+    assert stream.full_draws == 1
+    assert len(fig.axes[0].lines[0].get_xdata()) == 90
+    assert fig.axes[0].get_xlim() == (0, 100)
+
+
+def test_matplotlib_stream_moves_axes():
+    """
+    Verify points beyond the x axis move it forward by a quarter of its span, and the window is kept.
+    """
+    fig, stream = make_matplotlib_stream(window=100)
+    stream.extend({0: ([50.0], [0.0])})
+
+    assert stream.extend({0: (np.arange(51.0, 121.0), np.zeros(70))}) is True
+    ax = fig.axes[0]
+    assert stream.full_draws == 2
+    assert ax.get_xlim() == (45, 145)
+    np.testing.assert_array_equal(ax.lines[0].get_xdata(), np.arange(21.0, 121.0))
+
+
+def test_matplotlib_stream_refits_y_axis():
+    """
+    Verify a point above the y axis refits it to the data.
+    """
+    fig, stream = make_matplotlib_stream()
+
+    stream.extend({0: ([50.0], [9.0])})
+
+    assert fig.axes[0].get_ylim()[1] > 9
+
+
+@pytest.mark.parametrize("format", ["svg", "pdf"])
+def test_matplotlib_stream_saves_to_vector_formats(format):
+    """
+    Verify a streamed figure saves to SVG and PDF with its lines, and keeps blitting afterwards.
+    """
+    fig, stream = make_matplotlib_stream()
+    fig.axes[0].lines[0].set_gid("streamed-line")
+    stream.extend({0: ([50.0], [0.5])})
+    output = io.BytesIO()
+
+    fig.savefig(output, format=format)
+
+    assert output.getvalue()
+    if format == "svg":
+        assert b'id="streamed-line"' in output.getvalue()
+    assert stream.extend({0: ([51.0], [0.5])}) is False
+    assert stream.full_draws == 1
+
+
+def test_matplotlib_stream_errors():
+    """
+    Verify invalid windows and jumps and lines from different figures trigger a ValueError.
+    """
+    first, second = Figure().add_subplot(), Figure().add_subplot()
+    lines = first.plot([0, 1]) + second.plot([0, 1])
+
+    with pytest.raises(ValueError, match="window"):
+        MatplotlibStream(lines[:1], window=0)
+    with pytest.raises(ValueError, match="jump"):
+        MatplotlibStream(lines[:1], jump=2)
+    with pytest.raises(ValueError, match="one figure"):
+        MatplotlibStream(lines)
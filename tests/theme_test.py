@@ -0,0 +1,124 @@
+"""
+Tests for per-request theming in `theme`.
+
+These tests verify that the theme set by use_theme() is seen only by its own
+thread, that plotly figures carry their template whatever the process-wide
+default is, and that matplotlib blocks in different threads each build
+figures in their own theme.
+"""
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import matplotlib
+import plotly.io as pio
+import pytest
+from matplotlib.figure import Figure
+
+from afcharts.mpl_style import afcharts_style
+from afcharts.theme import apply_theme, current_theme, matplotlib_theme, themed_figure, use_theme
+
+
+def test_use_theme_is_scoped_to_block():
+    """
+    Verify use_theme() sets the theme for the block and restores the previous one.
+    """
+    assert current_theme() is None
+    with use_theme():
+        assert current_theme() == "afcharts"
+        with use_theme("afcharts-large"):
+            assert current_theme() == "afcharts-large"
+        assert current_theme() == "afcharts"
+    assert current_theme() is None
+
+
+def test_use_theme_is_per_thread():
+    """
+    Verify threads see only their own theme while running at the same time.
+    """
+    barrier = threading.Barrier(2)
+
+    def theme_in_thread(theme):
+        with use_theme(theme):
+            barrier.wait()
+            return current_theme()
+
+    with ThreadPoolExecutor(2) as executor:
+        results = list(executor.map(theme_in_thread, ["afcharts", None]))
+
+    assert results == ["afcharts", None]
+
+
+def test_themed_figure_ignores_process_default():
+    """
+    Verify themed figures carry the theme's template even when another default template is set.
+    """
+    default = pio.templates.default
+    pio.templates.default = "plotly_dark"
+    try:
+        with use_theme():
+            afcharts_figure = themed_figure()
+        plain_figure = themed_figure()
+        large_figure = apply_theme(themed_figure(), "afcharts-large")
+    finally:
+        pio.templates.default = default
+
+    assert afcharts_figure.layout.template.layout.hovermode == "x unified"
+    assert afcharts_figure.layout.template.layout.paper_bgcolor != "rgb(17,17,17)"
+    assert plain_figure.layout.template.layout.paper_bgcolor is None
+    assert large_figure.layout.template.layout.hovermode == "closest"
+
+
+def test_matplotlib_theme_isolated_between_threads():
+    """
+    Verify figures built in threads with and without the afcharts theme each get their own style.
+    """
+
+    def build(theme):
+        with matplotlib_theme(theme):
+            fig = Figure()
+            ax = fig.add_subplot()
+            # Give the other thread a chance to change rcParams while this block is running
+            time.sleep(0.01)
+            (line,) = ax.plot([0, 1])
+        return line.get_linewidth(), ax.spines["top"].get_visible()
+
+    with ThreadPoolExecutor(8) as executor:
+        results = list(executor.map(build, ["afcharts", None] * 8))
+
+    default_width = matplotlib.rcParams["lines.linewidth"]
+    assert results == [(2.0, False), (default_width, True)] * 8
+
+
+def test_matplotlib_theme_restores_rc_params():
+    """
+    Verify rcParams changed inside the block are restored, and the lock is shared with afcharts_style().
+    """
+    with matplotlib_theme(None):
+        matplotlib.rcParams["lines.linewidth"] = 7
+        with afcharts_style():
+            assert matplotlib.rcParams["lines.linewidth"] == 2
+    assert matplotlib.rcParams["lines.linewidth"] != 7
+
+
+def test_matplotlib_theme_large():
+    """
+    Verify the afcharts-large theme adds chunked Agg drawing to the afcharts style.
+    """
+    with matplotlib_theme("afcharts-large"):
+        assert matplotlib.rcParams["agg.path.chunksize"] == 10_000
+        assert matplotlib.rcParams["lines.linewidth"] == 2
+    with matplotlib_theme("afcharts"):
+        assert matplotlib.rcParams["agg.path.chunksize"] == 0
+
+
+def test_unknown_theme():
+    """
+    Verify an unknown theme triggers a ValueError.
+    """
+    with pytest.raises(ValueError, match="theme must be one of"):
+        with use_theme("dark"):
+            pass
+    with pytest.raises(ValueError, match="theme must be one of"):
+        themed_figure(theme="dark")